@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Modules whose import cost matters: the server entry points and the modules
+# every CLI run loads. Budgets are import times in seconds.
+BUDGETS = {
+    "main": 1.0,
+    "routers.image_processing": 1.0,
+    "scripts.operations": 0.4,
+    "scripts.batch_cli": 0.4,
+    "scripts.stack_ops": 0.4,
+    "scripts.video_cli": 0.4,
+    "scripts.Transformations": 0.4,
+    "scripts.fourier_transform": 0.4,
+    "scripts.canny_edge": 0.4,
+    "scripts.pyramids": 0.4,
+}
+
+# Modules that must not be loaded just by importing the modules above
+LAZY_MODULES = ["matplotlib", "PIL"]
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+def parse_importtime(stderr, top=5):
+    """Return the modules with the largest self import time from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us) / 1e6, name.strip()))
+    rows.sort(reverse=True)
+    return [{"module": name, "seconds": seconds} for seconds, name in rows[:top]]
+
+def measure(module, runs=3):
+    """
+    Import a module in fresh interpreters and time it
+
+    Returns:
+        Dictionary with the median import time, the median wall time of the
+        whole interpreter run, the heaviest imported modules and any of
+        LAZY_MODULES that were loaded
+    """
+    imports, walls = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module, lazy=LAZY_MODULES)],
+            cwd=BACKEND_DIR, capture_output=True, text=True
+        )
+        walls.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        imports.append(result["seconds"])
+    return {
+        "seconds": statistics.median(imports),
+        "wall": statistics.median(walls),
+        "heaviest": parse_importtime(proc.stderr),
+        "lazyLoaded": result["loaded"]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time per module and check it against a budget.")
+    parser.add_argument("modules", nargs="*", help=f"modules to measure (default: {', '.join(BUDGETS)})")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per module (median is reported)")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="budget in seconds for every module (default: per-module budgets)")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiply the budgets, e.g. 2 on slow CI machines")
+    parser.add_argument("-o", "--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    modules = args.modules or list(BUDGETS)
+    report = {}
+    failures = []
+    print(f"{'module':<30} {'import ms':>10} {'wall ms':>9} {'budget ms':>10}  heaviest imports")
+    for module in modules:
+        result = measure(module, args.runs)
+        budget = (args.budget or BUDGETS.get(module, 0.4)) * args.scale
+        result["budget"] = budget
+        report[module] = result
+
+        heaviest = ", ".join(f"{row['module']} {row['seconds'] * 1e3:.0f}" for row in result["heaviest"][:3])
+        over = result["seconds"] > budget
+        print(f"{module:<30} {result['seconds'] * 1e3:>10.1f} {result['wall'] * 1e3:>9.1f} "
+              f"{budget * 1e3:>10.0f}  {heaviest}{'  OVER BUDGET' if over else ''}")
+        if over:
+            failures.append(f"{module} took {result['seconds'] * 1e3:.0f} ms (budget {budget * 1e3:.0f} ms)")
+        if result["lazyLoaded"]:
+            failures.append(f"{module} loads {', '.join(result['lazyLoaded'])} at import")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if failures:
+        print("\n" + "\n".join(failures))
+        return 1
+    print("\nAll modules within budget")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+
+import numpy as np
+
+from benchmarks.bench_scripts import _script, environment, time_callable
+from benchmarks.synthetic import SIZES, CONTENT_TYPES, make_image
+from scripts.precision import PRECISIONS, precision
+
+# Operations covered by the precision policy: name -> (setup, deterministic).
+# setup(image) returns a zero-argument callable returning the output image(s).
+# Random outputs (gaussian noise) are compared by their noise level instead,
+# since float32 and float64 draws are different random streams. Binary
+# outputs (Canny) differ by 255 wherever an edge pixel flips, so the share
+# of changed pixels is reported next to the largest difference.
+CASES = {}
+
+def case(name, deterministic=True):
+    def register(setup):
+        CASES[name] = (setup, deterministic)
+        return setup
+    return register
+
+@case("canny_edge.apply_canny_edge")
+def _(img):
+    return lambda: _script("canny_edge").apply_canny_edge(img, 50, 150, 1.4)
+
+@case("ContrastStretching.apply_contrast_stretching")
+def _(img):
+    return lambda: _script("ContrastStretching").apply_contrast_stretching(img, 1.5)
+
+@case("operations.contrast")
+def _(img):
+    return lambda: _script("operations").contrast(img, 1.2)
+
+@case("operations.gamma")
+def _(img):
+    return lambda: _script("operations").gamma(img, 0.45)
+
+@case("noise.add_noise[gaussian]", deterministic=False)
+def _(img):
+    module = _script("noise")
+    return lambda: module.add_noise(img, "gaussian", 20, np.random.default_rng(0))
+
+@case("fourier_transform.apply_fourier_transform")
+def _(img):
+    return lambda: _script("fourier_transform").apply_fourier_transform(img, True, True)
+
+@case("fourier_filters.apply_fourier_filter[low_pass]")
+def _(img):
+    module = _script("fourier_filters")
+    params = {"radius": 30, "gaussian": True, "add_dc": False}
+    return lambda: module.apply_fourier_filter(img, "low_pass", params)
+
+@case("blending.multi_band_blending[half]")
+def _(img):
+    module = _script("blending")
+    other = 255 - img
+
+    def run():
+        # multi_band_blending prints level adjustments; keep the report clean
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                return module.multi_band_blending(img, other, 4, 0.5, "half")["result"]
+            finally:
+                sys.stdout = stdout
+    return run
+
+def _outputs(result):
+    return list(result) if isinstance(result, tuple) else [result]
+
+def difference(reference, result, deterministic):
+    """
+    Compare two outputs of a case
+
+    Returns:
+        (largest absolute pixel difference, fraction of pixels that differ);
+        for random outputs, (difference of the noise levels, None)
+    """
+    worst, changed, total = 0.0, 0, 0
+    for ref, out in zip(_outputs(reference), _outputs(result)):
+        ref, out = np.asarray(ref, dtype=np.float64), np.asarray(out, dtype=np.float64)
+        if deterministic:
+            worst = max(worst, float(np.abs(ref - out).max()))
+            changed += int(np.count_nonzero(ref != out))
+            total += ref.size
+        else:
+            worst = max(worst, abs(float(ref.std()) - float(out.std())))
+    return worst, (changed / total if deterministic else None)
+
+def run_benchmarks(names, sizes, contents, min_time=0.2):
+    """Time every case under each precision and compare the outputs to float64"""
+    results = {}
+    for size in sizes:
+        for content in contents:
+            img = make_image(size, content)
+            for name in names:
+                setup, deterministic = CASES[name]
+                entry = {}
+                outputs = {}
+                for name_precision in PRECISIONS:
+                    with precision(name_precision):
+                        fn = setup(img)
+                        outputs[name_precision] = fn()
+                        entry[name_precision] = statistics.median(time_callable(fn, min_time=min_time))
+                entry["speedup"] = entry["float64"] / entry["float32"]
+                entry["maxDiff"], entry["changed"] = difference(
+                    outputs["float64"], outputs["float32"], deterministic
+                )
+                key = f"{name}[{size}-{content}]"
+                results[key] = entry
+                if deterministic:
+                    diff = f"{entry['maxDiff']:6.2f} ({entry['changed']:.4%} of pixels)"
+                else:
+                    diff = f"{entry['maxDiff']:6.2f} in noise std"
+                print(f"{key:<62} {entry['float64'] * 1e3:9.3f} -> {entry['float32'] * 1e3:9.3f} ms "
+                      f"({entry['speedup']:4.2f}x)  max diff {diff}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare float32 and float64 precision for the numeric operations."
+    )
+    parser.add_argument("--sizes", default="512,2048",
+                        help=f"comma separated sizes from {', '.join(SIZES)} or 'all'")
+    parser.add_argument("--content", default="photo",
+                        help=f"comma separated content types from {', '.join(CONTENT_TYPES)} or 'all'")
+    parser.add_argument("-k", "--filter", default="", help="only run cases whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds spent per case")
+    parser.add_argument("-o", "--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    sizes = list(SIZES) if args.sizes == "all" else args.sizes.split(",")
+    contents = list(CONTENT_TYPES) if args.content == "all" else args.content.split(",")
+    names = [name for name in CASES if args.filter in name]
+
+    results = run_benchmarks(names, sizes, contents, args.min_time)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
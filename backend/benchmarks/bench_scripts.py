@@ -0,0 +1,345 @@
+import argparse
+import importlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import SIZES, CONTENT_TYPES, DEFAULT_SIZES, DEFAULT_CONTENT, make_image
+
+def _script(name):
+    # Module names such as 2PointerAlgo are not valid identifiers
+    return importlib.import_module(f"scripts.{name}")
+
+# Registry of benchmark cases: name -> (setup, max_pixels). setup(image)
+# returns a zero-argument callable that runs the function once.
+CASES = {}
+
+def case(name, max_pixels=None):
+    """Register a benchmark case; max_pixels skips sizes that would take minutes"""
+    def register(setup):
+        CASES[name] = (setup, max_pixels)
+        return setup
+    return register
+
+# Point operations and histograms
+
+@case("BrightnessAdjustment.apply_brightness_adjustment")
+def _(img):
+    return lambda: _script("BrightnessAdjustment").apply_brightness_adjustment(img, 40)
+
+@case("BrightnessAdjustment.compute_histograms")
+def _(img):
+    return lambda: _script("BrightnessAdjustment").compute_histograms(img)
+
+@case("ContrastStretching.apply_contrast_stretching")
+def _(img):
+    return lambda: _script("ContrastStretching").apply_contrast_stretching(img, 1.5)
+
+@case("ContrastStretching.compute_histograms")
+def _(img):
+    return lambda: _script("ContrastStretching").compute_histograms(img)
+
+@case("HistogramEqualization.apply_histogram_equalization")
+def _(img):
+    return lambda: _script("HistogramEqualization").apply_histogram_equalization(img)
+
+@case("2PointerAlgo.compute_histograms")
+def _(img):
+    return lambda: _script("2PointerAlgo").compute_histograms(img)
+
+@case("2PointerAlgo.find_monotonic_mapping")
+def _(img):
+    module = _script("2PointerAlgo")
+    _, _, cum_a = module.compute_histograms(img)
+    _, _, cum_b = module.compute_histograms(255 - img)
+    return lambda: module.find_monotonic_mapping(cum_a, cum_b)
+
+# Geometric transformations
+
+@case("Transformations.get_rotation_matrix")
+def _(img):
+    return lambda: _script("Transformations").get_rotation_matrix(30, (img.shape[1] // 2, img.shape[0] // 2), img.shape[::-1])
+
+@case("Transformations.get_translation_matrix")
+def _(img):
+    return lambda: _script("Transformations").get_translation_matrix(40, -25)
+
+@case("Transformations.get_scaling_matrix")
+def _(img):
+    return lambda: _script("Transformations").get_scaling_matrix(1.5, 0.75, (img.shape[1] // 2, img.shape[0] // 2))
+
+@case("Transformations.get_shear_matrix")
+def _(img):
+    return lambda: _script("Transformations").get_shear_matrix(0.2, 0.1, (img.shape[1] // 2, img.shape[0] // 2))
+
+@case("Transformations.apply_transformation")
+def _(img):
+    module = _script("Transformations")
+    matrix = module.get_rotation_matrix(30, (img.shape[1] // 2, img.shape[0] // 2), img.shape[::-1])
+    return lambda: module.apply_transformation(img, matrix)
+
+# Neighborhood filters
+
+@case("filters.apply_min_filter")
+def _(img):
+    return lambda: _script("filters").apply_min_filter(img)
+
+@case("filters.apply_max_filter")
+def _(img):
+    return lambda: _script("filters").apply_max_filter(img)
+
+@case("filters.compute_histograms")
+def _(img):
+    return lambda: _script("filters").compute_histograms(img)
+
+@case("median_filter.apply_median_filter")
+def _(img):
+    return lambda: _script("median_filter").apply_median_filter(img, 5)
+
+@case("median_filter.compute_histograms")
+def _(img):
+    return lambda: _script("median_filter").compute_histograms(img)
+
+@case("mean_filter.apply_mean_filter")
+def _(img):
+    return lambda: _script("mean_filter").apply_mean_filter(img, 5)
+
+@case("mean_filter.compute_histograms")
+def _(img):
+    return lambda: _script("mean_filter").compute_histograms(img)
+
+@case("bilateral_filter.apply_bilateral_filter", max_pixels=4096 * 4096)
+def _(img):
+    return lambda: _script("bilateral_filter").apply_bilateral_filter(img, 9, 75, 75)
+
+@case("convolution_masks.get_default_mask")
+def _(img):
+    return lambda: _script("convolution_masks").get_default_mask("gaussian", 7)
+
+@case("convolution_masks.apply_convolution")
+def _(img):
+    module = _script("convolution_masks")
+    mask = module.get_default_mask("sharpen", 3)
+    return lambda: module.apply_convolution(img, mask, add_128=True)
+
+@case("convolution_masks.compute_histograms")
+def _(img):
+    return lambda: _script("convolution_masks").compute_histograms(img)
+
+@case("canny_edge.apply_canny_edge")
+def _(img):
+    return lambda: _script("canny_edge").apply_canny_edge(img, 50, 150, 1.4)
+
+@case("noise.add_noise[gaussian]")
+def _(img):
+    rng = np.random.default_rng(0)
+    return lambda: _script("noise").add_noise(img, "gaussian", 15, rng)
+
+@case("noise.add_noise[salt-pepper]")
+def _(img):
+    rng = np.random.default_rng(0)
+    return lambda: _script("noise").add_noise(img, "salt-pepper", 0.05, rng)
+
+# Frequency domain
+
+@case("fourier_transform.apply_fourier_transform")
+def _(img):
+    return lambda: _script("fourier_transform").apply_fourier_transform(img, True, True)
+
+@case("fourier_filters.apply_fourier_filter")
+def _(img):
+    params = {"radius": 30, "gaussian": True, "add_dc": False}
+    return lambda: _script("fourier_filters").apply_fourier_filter(img, "low_pass", params)
+
+# Pyramids and blending
+
+@case("pyramids.build_gaussian_pyramid")
+def _(img):
+    return lambda: _script("pyramids").build_gaussian_pyramid(img, 5)
+
+@case("pyramids.build_laplacian_pyramid")
+def _(img):
+    gaussian = _script("pyramids").build_gaussian_pyramid(img, 5)
+    return lambda: _script("pyramids").build_laplacian_pyramid(gaussian)
+
+@case("pyramids.reconstruct_from_laplacian")
+def _(img):
+    module = _script("pyramids")
+    laplacian, _ = module.build_laplacian_pyramid(module.build_gaussian_pyramid(img, 5))
+    return lambda: module.reconstruct_from_laplacian(laplacian)
+
+@case("blending.build_gaussian_pyramid")
+def _(img):
+    return lambda: _script("blending").build_gaussian_pyramid(img, 4)
+
+@case("blending.build_laplacian_pyramid")
+def _(img):
+    gaussian = _script("blending").build_gaussian_pyramid(img, 4)
+    return lambda: _script("blending").build_laplacian_pyramid(gaussian)
+
+@case("blending.reconstruct_from_laplacian")
+def _(img):
+    module = _script("blending")
+    laplacian, _ = module.build_laplacian_pyramid(module.build_gaussian_pyramid(img, 4))
+    return lambda: module.reconstruct_from_laplacian(laplacian)
+
+@case("blending.create_blend_mask[half]")
+def _(img):
+    return lambda: _script("blending").create_blend_mask(img.shape, "half", 0.5)
+
+@case("blending.create_blend_mask[full]", max_pixels=1024 * 1024)
+def _(img):
+    return lambda: _script("blending").create_blend_mask(img.shape, "full", 0.5)
+
+@case("blending.blend_pyramids")
+def _(img):
+    module = _script("blending")
+    lap1, _ = module.build_laplacian_pyramid(module.build_gaussian_pyramid(img, 4))
+    lap2, _ = module.build_laplacian_pyramid(module.build_gaussian_pyramid(255 - img, 4))
+    masks = module.build_gaussian_pyramid(module.create_blend_mask(img.shape, "half", 0.5), 4)
+    return lambda: module.blend_pyramids(lap1, lap2, masks)
+
+@case("blending.multi_band_blending[half]")
+def _(img):
+    module = _script("blending")
+    other = 255 - img
+
+    def run():
+        # multi_band_blending prints level adjustments; keep the report clean
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                return module.multi_band_blending(img, other, 4, 0.5, "half")
+            finally:
+                sys.stdout = stdout
+    return run
+
+# Registries used by the API, batch and CLI paths
+
+@case("operations.IMAGE_OPERATIONS[gamma]")
+def _(img):
+    return lambda: _script("operations").gamma(img, 0.45)
+
+@case("stack_ops.gamma_stack[x8]")
+def _(img):
+    stack = np.stack([img] * 8)
+    return lambda: _script("stack_ops").gamma_stack(stack, 0.45)
+
+@case("stack_ops.histograms_stack[x8]")
+def _(img):
+    stack = np.stack([img] * 8)
+    return lambda: _script("stack_ops").histograms_stack(stack)
+
+def time_callable(fn, min_time=0.2, max_runs=50, min_runs=3):
+    """Time fn after one warm-up call; returns a list of per-call seconds"""
+    fn()
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max_runs:
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+        if len(timings) >= min_runs and time.perf_counter() - started >= min_time:
+            break
+    return timings
+
+def run_benchmarks(names, sizes, contents, min_time=0.2):
+    """Run the selected cases over every size/content combination"""
+    results = {}
+    for size in sizes:
+        width, height = SIZES[size]
+        for content in contents:
+            img = make_image(size, content)
+            for name in names:
+                setup, max_pixels = CASES[name]
+                if max_pixels is not None and width * height > max_pixels:
+                    continue
+                timings = time_callable(setup(img), min_time=min_time)
+                key = f"{name}[{size}-{content}]"
+                results[key] = {
+                    "median": statistics.median(timings),
+                    "min": min(timings),
+                    "runs": len(timings),
+                    "pixels": width * height
+                }
+                print(f"{key:<70} {results[key]['median'] * 1e3:10.3f} ms")
+    return results
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": datetime.now().isoformat(timespec="seconds")
+    }
+
+def compare(results, baseline, threshold):
+    """
+    Compare median timings against a baseline
+
+    Returns:
+        List of (case, baseline seconds, current seconds, ratio) regressions
+    """
+    regressions = []
+    for key, current in sorted(results.items()):
+        previous = baseline.get("results", {}).get(key)
+        if previous is None:
+            continue
+        ratio = current["median"] / previous["median"]
+        marker = "REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{key:<70} {previous['median'] * 1e3:9.3f} -> {current['median'] * 1e3:9.3f} ms "
+              f"({ratio:5.2f}x) {marker}")
+        if ratio > 1 + threshold:
+            regressions.append((key, previous["median"], current["median"], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for backend/scripts functions.")
+    parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES),
+                        help=f"comma separated sizes from {', '.join(SIZES)} or 'all'")
+    parser.add_argument("--content", default=",".join(DEFAULT_CONTENT),
+                        help=f"comma separated content types from {', '.join(CONTENT_TYPES)} or 'all'")
+    parser.add_argument("-k", "--filter", default="", help="only run cases whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds spent per case")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="where to write results")
+    parser.add_argument("--baseline", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="allowed slowdown before a case counts as a regression (0.15 = 15%%)")
+    parser.add_argument("--list", action="store_true", help="list the benchmark cases and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(CASES))
+        return 0
+
+    sizes = list(SIZES) if args.sizes == "all" else args.sizes.split(",")
+    contents = list(CONTENT_TYPES) if args.content == "all" else args.content.split(",")
+    names = [name for name in CASES if args.filter in name]
+
+    results = run_benchmarks(names, sizes, contents, args.min_time)
+    with open(args.output, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nComparison against {args.baseline} (threshold {args.threshold:.0%})")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above threshold")
+            return 1
+        print("\nNo regressions above threshold")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
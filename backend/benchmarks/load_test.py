@@ -0,0 +1,193 @@
+import argparse
+import asyncio
+import importlib
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+
+import cv2
+import httpx
+import numpy as np
+
+from benchmarks.synthetic import SIZES, make_image
+
+# Endpoint profiles: path, image field names and a sampler returning random
+# form parameters drawn from a realistic distribution for that endpoint
+ENDPOINTS = {
+    "brightness": ("/image/brightness", ["image"],
+                   lambda r: {"value": r.randint(-100, 100)}),
+    "contrast": ("/image/contrast", ["image"],
+                 lambda r: {"factor": round(r.uniform(0.1, 3.0), 1)}),
+    "compute-histogram": ("/image/compute-histogram", ["image"], lambda r: {}),
+    "equalize": ("/image/equalize", ["image"], lambda r: {}),
+    "gamma": ("/image/gamma", ["image"], lambda r: {"gamma": round(r.uniform(0.1, 5.0), 1)}),
+    "2pointer": ("/image/2pointer", ["image_a", "image_b"], lambda r: {}),
+    "transform": ("/image/transform", ["image"],
+                  lambda r: {"type": "rotation", "angle": r.choice([0, 15, 30, 45, 90])}),
+    "add-noise": ("/image/add-noise", ["image"],
+                  lambda r: r.choice([{"noise_type": "gaussian", "intensity": r.randint(1, 50)},
+                                      {"noise_type": "salt-pepper", "intensity": round(r.uniform(0, 0.2), 2)}])),
+    "apply-filter": ("/image/apply-filter", ["image"],
+                     lambda r: {"filter_sequence": ",".join(r.choices(["min", "max"], k=r.randint(1, 4)))}),
+    "median-filter": ("/image/median-filter", ["image"],
+                      lambda r: {"kernel_size": r.choice([3, 5, 7, 9])}),
+    "mean-filter": ("/image/mean-filter", ["image"],
+                    lambda r: {"kernel_size": r.choice([3, 5, 7, 9])}),
+    "convolution": ("/image/convolution", ["image"],
+                    lambda r: {"kernel_size": r.choice([3, 5]), "mask_type": r.choice(["gaussian", "sharpen", "identity"])}),
+    "bilateral": ("/image/bilateral", ["image"],
+                  lambda r: {"d": r.choice([5, 9, 15]), "sigma_color": 75, "sigma_space": 75}),
+    "fourier": ("/image/fourier", ["image"],
+                lambda r: {"center_spectrum": True, "apply_log": r.choice([True, False])}),
+    "fourier-filter": ("/image/fourier-filter", ["image"],
+                       lambda r: {"filter_type": r.choice(["low_pass", "high_pass"]),
+                                  "gaussian": r.choice([True, False]), "radius": r.choice([10, 30, 60])}),
+    "pyramids": ("/image/pyramids", ["image"], lambda r: {"levels": r.randint(3, 6)}),
+    "canny-edge": ("/image/canny-edge", ["image"],
+                   lambda r: {"low_threshold": r.randint(20, 80), "high_threshold": r.randint(100, 200),
+                              "sigma": round(r.uniform(0.5, 3.0), 1)}),
+}
+
+# 2pointer applies its mapping with a per-pixel Python loop, so it is opt-in
+DEFAULT_ENDPOINTS = [name for name in ENDPOINTS if name != "2pointer"]
+
+def build_app(spec):
+    """Import 'module:attr' or, by default, mount the image router on a fresh app"""
+    if spec:
+        module_name, attr = spec.split(":")
+        return getattr(importlib.import_module(module_name), attr)
+    from fastapi import FastAPI
+    from routers.image_processing import router
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else float("nan")
+
+async def run_level(client, endpoints, images, concurrency, duration, seed):
+    """Drive the endpoints at a fixed concurrency for duration seconds"""
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    deadline = time.perf_counter() + duration
+
+    async def worker(index):
+        r = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            name = r.choice(endpoints)
+            path, fields, sampler = ENDPOINTS[name]
+            files = [(field, (f"{field}.png", r.choice(images), "image/png")) for field in fields]
+            data = {k: str(v) for k, v in sampler(r).items()}
+            t0 = time.perf_counter()
+            try:
+                response = await client.post(path, data=data, files=files)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            elapsed = time.perf_counter() - t0
+            if ok:
+                latencies[name].append(elapsed)
+            else:
+                errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    report = {}
+    for name in endpoints:
+        values = latencies.get(name, [])
+        report[name] = {
+            "requests": len(values),
+            "errors": errors.get(name, 0),
+            "throughput": len(values) / wall,
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+        }
+    all_values = [v for values in latencies.values() for v in values]
+    report["_all"] = {
+        "requests": len(all_values),
+        "errors": sum(errors.values()),
+        "throughput": len(all_values) / wall,
+        "p50": percentile(all_values, 50),
+        "p95": percentile(all_values, 95),
+        "p99": percentile(all_values, 99),
+    }
+    return report
+
+def print_level(concurrency, report):
+    print(f"\nConcurrency {concurrency}")
+    print(f"{'endpoint':<20} {'req':>6} {'err':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in report.items():
+        label = "ALL" if name == "_all" else name
+        print(f"{label:<20} {row['requests']:>6} {row['errors']:>5} {row['throughput']:>8.1f} "
+              f"{row['p50'] * 1e3:>9.1f} {row['p95'] * 1e3:>9.1f} {row['p99'] * 1e3:>9.1f}")
+
+def print_saturation(levels):
+    print("\nSaturation curve")
+    print(f"{'concurrency':>11} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    peak = max(report["_all"]["throughput"] for report in levels.values()) or 1
+    for concurrency, report in levels.items():
+        row = report["_all"]
+        bar = "#" * int(40 * row["throughput"] / peak)
+        print(f"{concurrency:>11} {row['throughput']:>8.1f} {row['p50'] * 1e3:>9.1f} "
+              f"{row['p95'] * 1e3:>9.1f} {row['p99'] * 1e3:>9.1f} {bar}")
+
+async def main_async(args):
+    sizes = args.sizes.split(",")
+    images = []
+    for size in sizes:
+        for seed in range(args.distinct_images):
+            _, buf = cv2.imencode(".png", make_image(size, args.content, seed))
+            images.append(buf.tobytes())
+
+    endpoints = args.endpoints.split(",") if args.endpoints else DEFAULT_ENDPOINTS
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        raise SystemExit(f"Unknown endpoints: {', '.join(unknown)}")
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        transport = httpx.ASGITransport(app=build_app(args.app))
+        client = httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout)
+
+    levels = {}
+    async with client:
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            report = await run_level(client, endpoints, images, concurrency, args.duration, args.seed)
+            levels[concurrency] = report
+            print_level(concurrency, report)
+    print_saturation(levels)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "config": vars(args),
+                "levels": {str(c): report for c, report in levels.items()}
+            }, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the image API and report latency percentiles.")
+    parser.add_argument("--url", help="base URL of a running server (default: drive the app in-process)")
+    parser.add_argument("--app", help="ASGI app as module:attr for in-process runs (default: image router)")
+    parser.add_argument("--endpoints", help=f"comma separated subset of: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    parser.add_argument("--sizes", default="512", help=f"image sizes from {', '.join(SIZES)}")
+    parser.add_argument("--content", default="photo", help="synthetic image content type")
+    parser.add_argument("--distinct-images", type=int, default=4,
+                        help="distinct images per size (more images lowers the result cache hit rate)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="seed for parameter sampling")
+    parser.add_argument("-o", "--output", help="write the JSON report here")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
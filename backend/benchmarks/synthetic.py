@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+
+# Square sizes plus 4K/8K UHD frames, as (width, height)
+SIZES = {
+    "256": (256, 256),
+    "512": (512, 512),
+    "1024": (1024, 1024),
+    "2048": (2048, 2048),
+    "4k": (3840, 2160),
+    "8k": (7680, 4320),
+}
+
+DEFAULT_SIZES = ["256", "512", "1024", "2048"]
+
+def _noise(rng, width, height):
+    """Uniform random pixels: worst case for compression and median filters"""
+    return rng.integers(0, 256, (height, width), dtype=np.uint8)
+
+def _gradient(rng, width, height):
+    """Smooth diagonal ramp"""
+    x = np.linspace(0, 1, width, dtype=np.float32)
+    y = np.linspace(0, 1, height, dtype=np.float32)
+    return ((x[None, :] + y[:, None]) * 127.5).astype(np.uint8)
+
+def _checker(rng, width, height, cell=32):
+    """Hard-edged checkerboard: many edges for Canny and bilateral filters"""
+    yy, xx = np.indices((height, width))
+    return (((xx // cell) + (yy // cell)) % 2 * 255).astype(np.uint8)
+
+def _photo(rng, width, height):
+    """Photo-like content: blurred blobs with edges, texture and a little noise"""
+    small = rng.integers(0, 256, (max(height // 32, 2), max(width // 32, 2)), dtype=np.uint8)
+    base = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+    for _ in range(8):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        radius = int(rng.integers(min(width, height) // 20 + 1, min(width, height) // 5 + 2))
+        cv2.circle(base, center, radius, int(rng.integers(0, 256)), -1)
+    texture = rng.normal(0, 6, (height, width))
+    return np.clip(base + texture, 0, 255).astype(np.uint8)
+
+def _flat(rng, width, height):
+    """Constant mid-gray image (degenerate histograms)"""
+    return np.full((height, width), 128, dtype=np.uint8)
+
+CONTENT_TYPES = {
+    "noise": _noise,
+    "gradient": _gradient,
+    "checker": _checker,
+    "photo": _photo,
+    "flat": _flat,
+}
+
+DEFAULT_CONTENT = ["photo", "noise"]
+
+def make_image(size, content="photo", seed=0):
+    """
+    Generate a deterministic synthetic grayscale test image
+
+    Args:
+        size: Key of SIZES (e.g. '512', '4k') or a (width, height) tuple
+        content: Key of CONTENT_TYPES
+        seed: Random seed, so repeated runs benchmark identical pixels
+    """
+    width, height = SIZES[size] if isinstance(size, str) else size
+    rng = np.random.default_rng(seed)
+    return CONTENT_TYPES[content](rng, width, height)
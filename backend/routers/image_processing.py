@@ -1,384 +1,1270 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 import cv2
 import numpy as np
 import os
-from tempfile import NamedTemporaryFile
 from pathlib import Path
-import shutil
-from datetime import datetime, timedelta
 import base64
-import io
-import matplotlib.pyplot as plt
 # Import the transformation functions
-from scripts.Transformations import (
-    get_rotation_matrix,
-    get_translation_matrix,
-    get_scaling_matrix,
-    get_shear_matrix,
-    apply_transformation
-)
-from scripts.noise import add_noise  # Add this import at the top with other imports
-from scripts.filters import apply_min_filter, apply_max_filter  # Add this import
-from scripts.median_filter import apply_median_filter  # Add this import
-from scripts.mean_filter import apply_mean_filter  # Add this import
+from scripts.Transformations import apply_transformation
 from scripts.convolution_masks import get_default_mask, apply_convolution  # Add this import
 import json
+import hashlib
+import asyncio
+import contextvars
+import tarfile
+import zipfile
+from typing import List
 from scripts.fourier_transform import apply_fourier_transform
 from scripts.fourier_filters import apply_fourier_filter  # Add this import at the top
 from scripts.pyramids import build_gaussian_pyramid, build_laplacian_pyramid, reconstruct_from_laplacian
-from scripts.canny_edge import apply_canny_edge
+from scripts import operations as image_ops
+from utils.result_cache import result_cache, make_cache_key, etag_matches
+from utils.shared_store import EntryTooLarge, shared_store
+from utils.spill_store import spill_store
+from utils.single_flight import single_flight
+from utils.worker_pool import run_in_pool, pool_stats, MAX_WORKERS
+from utils.job_queue import JobQueueFull, job_queue
+from utils.admission import Overloaded, admission, estimate_cost
+from utils.roi import ROI_HALOS, parse_roi, roi_bounds
+from utils.tiles import (
+    TILE_SIZE, ORIGINAL, parse_op_spec, max_zoom, zoom_size, tile_grid, tile_key, render_tile, tile_cache
+)
+from utils.metrics import (
+    StageTimer, current_timer, stage, observe_request, render_metrics, render_gauge, render_counter,
+    IMAGE_PIXELS, UPLOAD_BYTES, PEAK_MEMORY, ESTIMATED_MEMORY, IMAGE_BUDGET
+)
+from utils.image_io import (
+    PixelBudgetExceeded, check_pixel_budget, decode_image_bytes, estimate_peak_bytes, traced_call,
+    map_file, release_upload, read_image_size, MMAP_MIN_BYTES
+)
+from utils.profiling import profile_authorized, profile_requested, profile_call, profile_store
+from utils.histogram_render import render_histogram_png
+from utils import fast_json
+from utils.color import COLOR_MODES, COLOR_OPERATIONS, LuminancePlanes, luminance
+from utils.pyramid_cache import KINDS as PYRAMID_KINDS, pyramid_cache, max_levels, default_levels, level_size
+
+# Render matplotlib figures off-screen; pyplot itself is imported on first use
+os.environ["MPLBACKEND"] = "Agg"
 
 router = APIRouter(
     prefix="/image",  # Make sure this matches your frontend URL
     tags=["image"]
 )
 
-TEMP_DIR = "temp"
-if not os.path.exists(TEMP_DIR):
-    os.makedirs(TEMP_DIR)
+# Encoded images larger than this many bytes are written to the spill store
+# and returned as a URL instead of a data URL (None: always inline). Set per
+# request from the inline_max query parameter.
+INLINE_MAX_BYTES = os.environ.get("RESULT_INLINE_MAX_BYTES")
+INLINE_MAX_BYTES = int(INLINE_MAX_BYTES) if INLINE_MAX_BYTES else None
+inline_limit = contextvars.ContextVar("inline_limit", default=INLINE_MAX_BYTES)
+
+# "base64" sends 1-D arrays (histograms, mappings) as base64 typed arrays
+# instead of number lists. Set per request from the arrays query parameter.
+array_encoding = contextvars.ContextVar("array_encoding", default="list")
+
+# How color uploads are processed (see utils.color). Set per request from the
+# color query parameter; in the luminance modes the planes of the image being
+# processed are kept here so its processed luminance can be recombined.
+color_mode = contextvars.ContextVar("color_mode", default="gray")
+color_planes = contextvars.ContextVar("color_planes", default=None)
 
-# Add this function to periodically clean up old files
-def cleanup_temp_files():
-    """Remove files older than 1 hour from the temp directory"""
-    current_time = datetime.now()
-    for filename in os.listdir(TEMP_DIR):
-        filepath = os.path.join(TEMP_DIR, filename)
-        file_modified = datetime.fromtimestamp(os.path.getmtime(filepath))
-        if current_time - file_modified > timedelta(hours=1):
-            os.remove(filepath)
+# Names of the spill store entries referenced by the result being computed
+spilled_entries = contextvars.ContextVar("spilled_entries", default=None)
+
+# Region of interest (x, y, w, h) requested with the roi query parameter. The
+# operation runs on the region plus its halo; the window selects the region
+# inside that processed patch for histograms and encoding.
+roi_request = contextvars.ContextVar("roi_request", default=None)
+roi_window = contextvars.ContextVar("roi_window", default=None)
+
+def roi_view(image):
+    """The requested region of a processed patch (the image itself without a roi)"""
+    window = roi_window.get()
+    return image if window is None else image[window]
 
 def compute_histogram_data(image):
-    """Compute histogram data and return as base64 encoded image"""
+    """Compute histogram data and return the chart as a base64 encoded PNG"""
     # Compute histograms
-    hist = cv2.calcHist([image], [0], None, [256], [0, 256]).flatten()
-    hist_norm = hist / hist.sum()
-    hist_cum = hist_norm.cumsum()
-    
-    # Create histogram plot
-    plt.figure(figsize=(8, 4))
-    
-    # Plot regular histogram as bars
-    plt.subplot(1, 2, 1)
-    plt.bar(range(256), hist, color='blue', alpha=0.7, width=1)
-    plt.title('Histogram')
-    plt.xlabel('Intensity')
-    plt.ylabel('Count')
-    
-    # Plot cumulative histogram as bars
-    plt.subplot(1, 2, 2)
-    plt.bar(range(256), hist_cum * hist.max(), color='red', alpha=0.7, width=1)
-    plt.title('Cumulative Histogram')
-    plt.xlabel('Intensity')
-    plt.ylabel('Cumulative')
-    
-    # Save plot to bytes buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight')
-    plt.close()
-    buf.seek(0)
-    
+    with stage("hist"):
+        hist = cv2.calcHist([image], [0], None, [256], [0, 256]).flatten()
+        hist_norm = hist / hist.sum()
+        hist_cum = hist_norm.cumsum()
+
+    # Draw the histogram and cumulative bar charts straight into a pixel buffer
+    with stage("encode"):
+        png = render_histogram_png(hist, hist_cum * hist.max())
+
     # Also return the raw histogram data for interactive display
-    return {
-        "image": base64.b64encode(buf.getvalue()).decode(),
-        "data": {
-            "histogram": hist.tolist(),
-            "cumulative": (hist_cum * hist.max()).tolist()
+    with stage("base64"):
+        return {
+            "image": base64.b64encode(png).decode(),
+            "data": {
+                "histogram": hist.astype(np.uint32),
+                "cumulative": hist_cum * hist.max()
+            }
         }
+
+def decode_image(contents, max_side=None):
+    """Decode uploaded image bytes within the pixel budget (None if invalid), in color for color modes"""
+    with stage("decode"):
+        return decode_image_bytes(contents, max_side=max_side, color=color_mode.get() != "gray")
+
+def encode_image(image):
+    """Encode an image as a base64 PNG data URL, or a spill store URL when it is too large to inline"""
+    with stage("encode"):
+        _, buf = cv2.imencode('.png', image)
+    limit = inline_limit.get()
+    if limit is not None and buf.nbytes > limit:
+        with stage("spill"):
+            name = spill_store.put(buf.tobytes(), ".png")
+        spilled = spilled_entries.get()
+        if spilled is not None:
+            spilled.append(name)
+        return f"{router.prefix}/temp/{name}"
+    with stage("base64"):
+        return f"data:image/png;base64,{base64.b64encode(buf.tobytes()).decode('utf-8')}"
+
+def compute_histograms(image):
+    """Compute the histogram and the cumulative histogram scaled to the histogram peak"""
+    with stage("hist"):
+        hist = cv2.calcHist([luminance(image)], [0], None, [256], [0, 256]).flatten()
+        hist_norm = hist / hist.sum()
+        cum = hist_norm.cumsum() * hist.max()
+        return hist, cum
+
+def histogram_response(img, processed, **extra):
+    """Build the standard processed image + original/processed histograms response"""
+    hist_original, cum_original = compute_histograms(roi_view(img))
+    hist_processed, cum_processed = compute_histograms(roi_view(processed))
+    planes = color_planes.get()
+    if planes is not None:
+        # Only the luminance was processed; put the chroma back for display
+        with stage("color"):
+            processed = planes.merge(processed)
+    response = {
+        "processedImage": encode_image(roi_view(processed)),
+        "originalHistogram": hist_original.astype(np.uint32),
+        "originalCumulative": cum_original,
+        "processedHistogram": hist_processed.astype(np.uint32),
+        "processedCumulative": cum_processed
     }
+    response.update(extra)
+    return response
+
+# Operation handlers: take decoded grayscale images plus the endpoint
+# parameters and return the JSON content (or an error JSONResponse)
+
+def respond_brightness(img, value):
+    return histogram_response(img, image_ops.brightness(img, value))
+
+def respond_contrast(img, factor):
+    return histogram_response(img, image_ops.contrast(img, factor))
+
+def respond_compute_histogram(img):
+    return compute_histogram_data(roi_view(img))
+
+def respond_equalize(img):
+    return histogram_response(img, image_ops.equalize(img))
+
+def respond_gamma(img, gamma):
+    return histogram_response(img, image_ops.gamma(img, gamma))
+
+def respond_two_pointer(img_a, img_b):
+    # Compute histograms and normalize them
+    with stage("hist"):
+        hist_a = cv2.calcHist([img_a], [0], None, [256], [0, 256]).flatten()
+        hist_b = cv2.calcHist([img_b], [0], None, [256], [0, 256]).flatten()
 
-@router.post("/image/brightness")
-async def adjust_brightness(image: UploadFile = File(...), value: int = Form(...)):
+    # Normalize histograms
+    norm_hist_a = hist_a / hist_a.sum()
+    norm_hist_b = hist_b / hist_b.sum()
+
+    # Compute cumulative histograms
+    cum_hist_a = norm_hist_a.cumsum()
+    cum_hist_b = norm_hist_b.cumsum()
+
+    # Find monotonic mapping using two-pointer technique
+    mapping = np.full(256, -1, dtype=int)  # -1 indicates no mapping
+    ptr_b = 0
+
+    for intensity_a in range(256):
+        target_cum = cum_hist_a[intensity_a]
+
+        # Move pointer B until we find a matching or greater cumulative value
+        while ptr_b < 256 and cum_hist_b[ptr_b] < target_cum:
+            ptr_b += 1
+
+        if ptr_b < 256:
+            mapping[intensity_a] = ptr_b
+        else:
+            break
+
+    # Apply mapping to create transformed image
+    transformed = np.zeros_like(img_a)
+    for i in range(img_a.shape[0]):
+        for j in range(img_a.shape[1]):
+            val = mapping[img_a[i, j]]
+            transformed[i, j] = 0 if val == -1 else val
+
+    return {
+        "imageA": encode_image(img_a),
+        "imageB": encode_image(img_b),
+        "transformedImage": encode_image(transformed),
+        "histogramA": hist_a.astype(np.uint32),
+        "histogramB": hist_b.astype(np.uint32),
+        "cumulativeA": cum_hist_a * hist_a.max(),
+        "cumulativeB": cum_hist_b * hist_b.max(),
+        "mapping": mapping
+    }
+
+def respond_transform(img, type, **params):
+    # Get transformation matrix based on type
     try:
-        # Read image
-        contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-        
-        if img is None:
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid image file"}
-            )
+        matrix = image_ops.get_transform_matrix(img, type, **params)
+    except ValueError:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Invalid transformation type"}
+        )
 
-        # Apply brightness adjustment
-        adjusted = np.clip(img.astype(np.int16) + value, 0, 255).astype(np.uint8)
-        
-        # Compute histograms for original image
-        hist_original = cv2.calcHist([img], [0], None, [256], [0, 256]).flatten()
-        hist_original_norm = hist_original / hist_original.sum()
-        cum_original = hist_original_norm.cumsum() * hist_original.max()
-        
-        # Compute histograms for processed image
-        hist_processed = cv2.calcHist([adjusted], [0], None, [256], [0, 256]).flatten()
-        hist_processed_norm = hist_processed / hist_processed.sum()
-        cum_processed = hist_processed_norm.cumsum() * hist_processed.max()
-        
-        # Encode processed image to base64
-        _, processed_img = cv2.imencode('.png', adjusted)
-        processed_base64 = base64.b64encode(processed_img.tobytes()).decode('utf-8')
-        
-        return JSONResponse({
-            "processedImage": f"data:image/png;base64,{processed_base64}",
-            "originalHistogram": hist_original.tolist(),
-            "originalCumulative": cum_original.tolist(),
-            "processedHistogram": hist_processed.tolist(),
-            "processedCumulative": cum_processed.tolist()
-        })
-        
+    # Apply transformation
+    transformed = apply_transformation(img, matrix)
+
+    return {
+        "processedImage": encode_image(transformed),
+        "transformationMatrix": matrix.tolist()
+    }
+
+def respond_add_noise(img, noise_type, intensity):
+    return histogram_response(img, image_ops.noise(img, noise_type, intensity))
+
+def respond_apply_filter(img, filter_sequence):
+    processed = image_ops.filter_sequence(img, filter_sequence)
+    return histogram_response(img, processed, appliedFilters=filter_sequence.split(','))
+
+def respond_median_filter(img, kernel_size):
+    # Ensure kernel size is odd
+    if kernel_size % 2 == 0:
+        kernel_size += 1
+    return histogram_response(img, image_ops.median(img, kernel_size), kernelSize=kernel_size)
+
+def respond_mean_filter(img, kernel_size):
+    # Ensure kernel size is odd
+    if kernel_size % 2 == 0:
+        kernel_size += 1
+    return histogram_response(img, image_ops.mean(img, kernel_size), kernelSize=kernel_size)
+
+def respond_convolution(img, kernel_size, mask_type, custom_mask=None, add_128=False):
+    # Create mask
+    try:
+        mask = image_ops.get_convolution_mask(kernel_size, mask_type, custom_mask)
     except Exception as e:
-        print(f"Error processing image: {str(e)}")
+        if not custom_mask:
+            raise
+        print(f"Error parsing custom mask: {str(e)}")  # Debug log
         return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to process image: {str(e)}"}
+            status_code=400,
+            content={"error": f"Invalid custom mask: {str(e)}"}
         )
 
-@router.post("/image/contrast")
-async def process_contrast(image: UploadFile = File(...), factor: float = Form(...)):
-    try:
-        # Read image
-        contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-        
-        if img is None:
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid image file"}
-            )
+    # Apply convolution with add_128 parameter
+    processed = apply_convolution(img, mask, add_128=add_128)
+    return histogram_response(img, processed, mask=mask.tolist())
 
-        # Apply contrast stretching
-        min_val = float(img.min())
-        max_val = float(img.max())
-        stretched = ((img - min_val) * factor) / (max_val - min_val)
-        stretched = np.clip(stretched * 255, 0, 255).astype(np.uint8)
-        
-        # Compute histograms for original image
-        hist_original = cv2.calcHist([img], [0], None, [256], [0, 256]).flatten()
-        hist_original_norm = hist_original / hist_original.sum()
-        cum_original = hist_original_norm.cumsum() * hist_original.max()
-        
-        # Compute histograms for processed image
-        hist_processed = cv2.calcHist([stretched], [0], None, [256], [0, 256]).flatten()
-        hist_processed_norm = hist_processed / hist_processed.sum()
-        cum_processed = hist_processed_norm.cumsum() * hist_processed.max()
-        
-        # Encode processed image to base64
-        _, processed_img = cv2.imencode('.png', stretched)
-        processed_base64 = base64.b64encode(processed_img.tobytes()).decode('utf-8')
-        
-        return JSONResponse({
-            "processedImage": f"data:image/png;base64,{processed_base64}",
-            "originalHistogram": hist_original.tolist(),
-            "originalCumulative": cum_original.tolist(),
-            "processedHistogram": hist_processed.tolist(),
-            "processedCumulative": cum_processed.tolist()
-        })
-        
-    except Exception as e:
-        print(f"Error processing image: {str(e)}")
+def respond_bilateral(img, d, sigma_color, sigma_space):
+    return histogram_response(img, image_ops.bilateral(img, d, sigma_color, sigma_space))
+
+def respond_fourier(img, center_spectrum=False, apply_log=False):
+    # Apply Fourier transform
+    magnitude_spectrum, reconstructed = apply_fourier_transform(
+        img, center_spectrum, apply_log
+    )
+
+    # Compute histograms for original image and magnitude spectrum
+    hist_original, cum_original = compute_histograms(img)
+    hist_spectrum, cum_spectrum = compute_histograms(magnitude_spectrum)
+
+    return {
+        "magnitudeSpectrum": encode_image(magnitude_spectrum),
+        "originalHistogram": hist_original.astype(np.uint32),
+        "originalCumulative": cum_original,
+        "spectrumHistogram": hist_spectrum / hist_spectrum.sum(),
+        "spectrumCumulative": cum_spectrum
+    }
+
+def respond_fourier_filter(img, filter_type, **params):
+    # Apply filter
+    filtered_img, original_spectrum, filtered_spectrum = apply_fourier_filter(
+        img, filter_type, image_ops.get_fourier_filter_params(filter_type, **params)
+    )
+
+    return {
+        "filteredImage": encode_image(filtered_img),
+        "originalSpectrum": encode_image(original_spectrum),
+        "filteredSpectrum": encode_image(filtered_spectrum)
+    }
+
+def respond_pyramids(img, levels):
+    # Build pyramids
+    gaussian_pyramid = build_gaussian_pyramid(img, levels)
+    laplacian_pyramid, laplacian_display = build_laplacian_pyramid(gaussian_pyramid)
+    reconstructed = reconstruct_from_laplacian(laplacian_pyramid)
+
+    return {
+        "gaussianPyramid": [encode_image(g_img) for g_img in gaussian_pyramid],
+        # Use display version for frontend
+        "laplacianPyramid": [encode_image(l_img) for l_img in laplacian_display],
+        "reconstructedImage": encode_image(reconstructed)
+    }
+
+def respond_canny_edge(img, low_threshold, high_threshold, sigma):
+    edges = image_ops.canny(img, low_threshold, high_threshold, sigma)
+    return {"processedImage": encode_image(roi_view(edges))}
+
+# Registry of router operations by name, shared by every image endpoint
+OPERATIONS = {
+    "brightness": respond_brightness,
+    "contrast": respond_contrast,
+    "compute-histogram": respond_compute_histogram,
+    "equalize": respond_equalize,
+    "gamma": respond_gamma,
+    "2pointer": respond_two_pointer,
+    "transform": respond_transform,
+    "add-noise": respond_add_noise,
+    "apply-filter": respond_apply_filter,
+    "median-filter": respond_median_filter,
+    "mean-filter": respond_mean_filter,
+    "convolution": respond_convolution,
+    "bilateral": respond_bilateral,
+    "fourier": respond_fourier,
+    "fourier-filter": respond_fourier_filter,
+    "pyramids": respond_pyramids,
+    "canny-edge": respond_canny_edge,
+}
+
+def compute_operation(operation, contents, params, key, max_side=None):
+    """Decode the images, run the operation and cache the encoded JSON body"""
+    # Jobs run in a copy of the request context, so this list is private to the job
+    spilled = []
+    spilled_entries.set(spilled)
+    body, peak = traced_call(render_operation, operation, contents, params, max_side)
+    if peak is not None:
+        PEAK_MEMORY.observe(peak, operation=operation)
+    if isinstance(body, Response):
+        # Parameter errors are returned as-is and never cached
+        return body
+
+    # Bodies referencing spilled files are not cached: the janitor may
+    # evict the files while the body is still in the cache
+    if not spilled:
+        result_cache.put(key, body)
+    return body
+
+def compute_stored_operation(operation, image_ids, params, key):
+    """Run an operation on images from the shared store (404 if any was evicted)"""
+    with stage("load"):
+        images = [shared_store.get_array(image_id) for image_id in image_ids]
+    if any(img is None for img in images):
+        return JSONResponse(status_code=404, content={"error": "Image not found; upload it again"})
+    return compute_operation(operation, images, params, key)
+
+def render_operation(operation, contents, params, max_side=None):
+    """Decode the images and run the operation, returning the JSON body or an error response"""
+    # Images loaded from the shared store arrive already decoded
+    images = [data if isinstance(data, np.ndarray) else decode_image(data, max_side) for data in contents]
+    # Release the compressed uploads before processing starts
+    for data in contents:
+        release_upload(data)
+    if any(img is None for img in images):
         return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to process image: {str(e)}"}
+            status_code=400,
+            content={"error": f"Invalid image file{'(s)' if len(images) > 1 else ''}"}
         )
+    for img in images:
+        IMAGE_PIXELS.observe(img.shape[0] * img.shape[1], operation=operation)
+    roi = roi_request.get()
+    if roi is not None:
+        # Process only the region plus the context the operation needs around it
+        height, width = images[0].shape[:2]
+        try:
+            (x0, y0, x1, y1), (px0, py0, px1, py1) = roi_bounds(
+                roi, ROI_HALOS[operation](params), width, height
+            )
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+        images = [images[0][py0:py1, px0:px1]]
+        roi_window.set((slice(y0 - py0, y1 - py0), slice(x0 - px0, x1 - px0)))
+    if color_mode.get() in ("luma", "lab"):
+        # Convert once; the operation sees only the luminance channel
+        with stage("color"):
+            planes = LuminancePlanes(images[0], color_mode.get())
+        color_planes.set(planes)
+        images = [planes.luma]
+    ESTIMATED_MEMORY.observe(
+        estimate_peak_bytes(operation, sum(img.size for img in images)), operation=operation
+    )
 
-@router.get("/temp/{filename}")
-async def get_temp_file(filename: str):
-    file_path = os.path.join(TEMP_DIR, filename)
-    return FileResponse(file_path, media_type="image/png")
+    with stage("process"):
+        content = OPERATIONS[operation](*images, **params)
+    if isinstance(content, Response):
+        return content
+    if roi is not None:
+        content["roi"] = {
+            "x": x0, "y": y0, "width": x1 - x0, "height": y1 - y0,
+            "imageWidth": width, "imageHeight": height
+        }
 
-@router.post("/compute-histogram")
-async def compute_image_histogram(
-    image: UploadFile = File(...)
-):
-    """Compute histogram for uploaded image without processing"""
-    contents = await image.read()
-    nparr = np.frombuffer(contents, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-    
-    # Compute histogram
-    histogram_data = compute_histogram_data(img)
-    
-    return JSONResponse(histogram_data)
+    with stage("json"):
+        return fast_json.dumps(content, compact=array_encoding.get() == "base64")
 
-@router.post("/equalize")
-async def equalize_histogram(image: UploadFile = File(...)):
+async def read_upload(upload):
+    """
+    Return an upload's contents: bytes, or for large uploads a read-only
+    memory map of the file Starlette spooled them to
+
+    Mapping avoids holding a private copy of every large compressed upload
+    for the whole request; the map is released once the image is decoded.
+    """
+    if upload.size is not None and upload.size >= MMAP_MIN_BYTES:
+        return await asyncio.to_thread(map_file, upload.file)
+    return await upload.read()
+
+def decoded_pixels(width, height, max_side=None):
+    """Pixel count of an image once decoded, for cost estimates"""
+    if max_side and max(width, height) > max_side:
+        scale = max_side / max(width, height)
+        return int(width * scale) * int(height * scale)
+    return width * height
+
+def upload_cost(operation, contents, params, options):
+    """Estimated worker milliseconds of an operation on uploads, from their headers"""
+    sizes = [read_image_size(data) or (0, 0) for data in contents]
+    pixels = max(decoded_pixels(width, height, options["max_side"]) for width, height in sizes)
+    if options["roi"] is not None:
+        pixels = min(pixels, options["roi"][2] * options["roi"][3])
+    return estimate_cost(operation, pixels, params, options["color"])
+
+def stored_cost(operation, info, params, roi=None):
+    """Estimated worker milliseconds of an operation on a stored image from its array_info (0 if it was evicted)"""
+    if info is None:
+        return 0
+    pixels = info["shape"][0] * info["shape"][1]
+    if roi is not None:
+        pixels = min(pixels, roi[2] * roi[3])
+    return estimate_cost(operation, pixels, params)
+
+async def cached_result(key):
+    """Cached body for key, or None; shared-store lookups run on the worker pool"""
+    body = result_cache.get(key, shared=False)
+    if body is None and result_cache.shared is not None:
+        body = await run_in_pool(result_cache.get, key)
+    return body
+
+async def run_admitted(cost, fn, *args, shed=True):
+    """
+    Run fn on the worker pool once the admission controller admits its cost
+
+    Raises:
+        Overloaded: If shed and the request would wait too long
+    """
+    with stage("queue"):
+        ticket = await admission.acquire(cost, shed)
     try:
-        # Read image
-        contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-        
-        if img is None:
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid image file"}
-            )
+        return await run_in_pool(fn, *args)
+    finally:
+        admission.release(ticket)
+
+def overloaded_response(error):
+    return JSONResponse(
+        status_code=503, content={"error": str(error)}, headers={"Retry-After": str(error.retry_after)}
+    )
+
+# Response options and their defaults; options that differ from the default
+# are part of the result cache key
+RESPONSE_DEFAULTS = {"max_side": None, "inline_max": None, "arrays": "list", "color": "gray", "roi": None}
+
+def response_options(request):
+    """
+    Read the optional max_side, inline_max, arrays, color and roi query parameters
+
+    Returns:
+        Dictionary with a value for every key of RESPONSE_DEFAULTS; inline_max
+        falls back to the server default
+
+    Raises:
+        ValueError: If a parameter is not valid
+    """
+    try:
+        max_side = int(request.query_params.get("max_side") or 0) or None
+        if max_side is not None and max_side < 1:
+            raise ValueError
+    except ValueError:
+        raise ValueError("max_side must be a positive integer")
+    arrays = request.query_params.get("arrays", "list")
+    if arrays not in ("list", "base64"):
+        raise ValueError("arrays must be 'list' or 'base64'")
+    color = request.query_params.get("color", "gray")
+    if color not in COLOR_MODES:
+        raise ValueError(f"color must be one of: {', '.join(COLOR_MODES)}")
+    roi = request.query_params.get("roi")
+    if roi is not None:
+        roi = parse_roi(roi)
+    inline_max = request.query_params.get("inline_max")
+    if inline_max is None:
+        inline_max = INLINE_MAX_BYTES
+    else:
+        try:
+            inline_max = int(inline_max)
+            if inline_max < 0:
+                raise ValueError
+        except ValueError:
+            raise ValueError("inline_max must be a non-negative integer")
+    return {"max_side": max_side, "inline_max": inline_max, "arrays": arrays, "color": color, "roi": roi}
+
+def unsupported_option(operation, options):
+    """Return why an operation cannot honour the response options, or None if it can"""
+    if options["color"] != "gray" and operation not in COLOR_OPERATIONS:
+        return f"{operation} does not support color={options['color']}"
+    if options["roi"] is not None:
+        if operation not in ROI_HALOS:
+            return f"{operation} does not support roi"
+        if options["max_side"]:
+            return "roi cannot be combined with max_side"
+    return None
+
+def use_response_options(options):
+    """Apply response options to the current request and return the ones that belong in the cache key"""
+    inline_limit.set(options["inline_max"])
+    array_encoding.set(options["arrays"])
+    color_mode.set(options["color"])
+    roi_request.set(options["roi"])
+    return {name: value for name, value in options.items() if value != RESPONSE_DEFAULTS[name]}
+
+async def run_operation(request, operation, uploads, params):
+    """
+    Run a router operation behind the content-addressed result cache
+
+    Each stage of the request is timed; the durations are returned in a
+    Server-Timing header and aggregated for the /metrics endpoint. An
+    optional max_side query parameter decodes the inputs at reduced
+    resolution, for previews that do not need every pixel, and inline_max
+    returns encoded images larger than that many bytes as /image/temp URLs
+    instead of data URLs (inline_max=0 returns every image by reference).
+    arrays=base64 sends histograms and other 1-D arrays as base64 typed
+    arrays, which are smaller and need no number parsing on the client.
+    color=luma or color=lab processes color uploads on their luminance
+    channel only, and color=channels processes every channel. roi=x,y,w,h
+    processes and returns only that region (plus the halo the operation
+    needs as context), with histograms of the region.
+
+    Args:
+        request: Incoming request (used for conditional headers)
+        operation: Name of the operation in OPERATIONS
+        uploads: List of uploaded image files
+        params: Dictionary of operation parameters
+    """
+    return await timed_operation(
+        operation, lambda timer: cached_operation(request, operation, uploads, params, timer)
+    )
+
+async def timed_operation(operation, handler):
+    """Await handler(timer) with stage timing, adding the Server-Timing header and metrics"""
+    # Started on the first request, as the router does not own the app's lifespan
+    spill_store.start()
+    timer = StageTimer()
+    token = current_timer.set(timer)
+    try:
+        response = await handler(timer)
+    finally:
+        current_timer.reset(token)
+    observe_request(operation, timer, response.status_code)
+    response.headers["Server-Timing"] = timer.server_timing()
+    return response
+
+async def cached_operation(request, operation, uploads, params, timer):
+    """Serve an operation from the result cache, computing it on a miss"""
+    plural = "s" if len(uploads) > 1 else ""
+    try:
+        options = response_options(request)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    error = unsupported_option(operation, options)
+    if error is not None:
+        return JSONResponse(status_code=400, content={"error": error})
+    key_options = use_response_options(options)
+    max_side = options["max_side"]
+
+    try:
+        # Read uploads and derive the cache key from content + parameters
+        with stage("read"):
+            contents = [await read_upload(upload) for upload in uploads]
+        for data in contents:
+            UPLOAD_BYTES.observe(len(data), operation=operation)
+
+        # Refuse oversized images from their header, before any decoding
+        try:
+            for data in contents:
+                check_pixel_budget(data, policy="downscale" if max_side else None)
+        except PixelBudgetExceeded as e:
+            IMAGE_BUDGET.inc(action="rejected")
+            return JSONResponse(status_code=e.status_code, content={"error": str(e)})
+        key = make_cache_key(operation, contents, {**params, **key_options})
+        meta = {"operation": operation, "params": params, "uploadBytes": [len(data) for data in contents]}
+        return await serve_cached(
+            request, key, meta, timer, compute_operation, operation, contents, params, key, max_side,
+            cost=upload_cost(operation, contents, params, options)
+        )
 
-        # Apply histogram equalization
-        equalized = cv2.equalizeHist(img)
-        
-        # Compute histograms for original image
-        hist_original = cv2.calcHist([img], [0], None, [256], [0, 256]).flatten()
-        hist_original_norm = hist_original / hist_original.sum()
-        cum_original = hist_original_norm.cumsum() * hist_original.max()
-        
-        # Compute histograms for processed image
-        hist_processed = cv2.calcHist([equalized], [0], None, [256], [0, 256]).flatten()
-        hist_processed_norm = hist_processed / hist_processed.sum()
-        cum_processed = hist_processed_norm.cumsum() * hist_processed.max()
-        
-        # Encode processed image to base64
-        _, processed_img = cv2.imencode('.png', equalized)
-        processed_base64 = base64.b64encode(processed_img.tobytes()).decode('utf-8')
-        
-        return JSONResponse({
-            "processedImage": f"data:image/png;base64,{processed_base64}",
-            "originalHistogram": hist_original.tolist(),
-            "originalCumulative": cum_original.tolist(),
-            "processedHistogram": hist_processed.tolist(),
-            "processedCumulative": cum_processed.tolist()
-        })
-        
     except Exception as e:
-        print(f"Error processing image: {str(e)}")
+        print(f"Error processing image{plural}: {str(e)}")
         return JSONResponse(
             status_code=500,
-            content={"error": f"Failed to process image: {str(e)}"}
+            content={"error": f"Failed to process image{plural}: {str(e)}"}
         )
 
-@router.post("/gamma")
-async def adjust_gamma(image: UploadFile = File(...), gamma: float = Form(...)):
-    try:
-        # Read image
-        contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-        
+async def serve_cached(request, key, meta, timer, compute, *args, cost=0):
+    """
+    Serve the result for key, running compute(*args) on the worker pool on a miss
+
+    Handles conditional requests, profiling, the result cache, single-flight
+    and admission control: a miss waits until its estimated cost (worker
+    milliseconds) fits the budget, or gets 503 with Retry-After when the
+    server is over capacity. compute must cache its own successful results.
+    """
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if profile_requested(request.headers):
+        # Profiled requests always recompute, bypassing the cache and
+        # single-flight so the profile covers the real work
+        try:
+            body, profile_id = await run_admitted(cost, profile_call, meta, compute, *args)
+        except Overloaded as e:
+            timer.cache = "shed"
+            return overloaded_response(e)
+        if profile_id:
+            headers["X-Profile-Id"] = profile_id
+        if isinstance(body, Response):
+            body.headers.update(headers)
+            return body
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    # The key is content-addressed, so a matching ETag needs no work at all
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        timer.cache = "not_modified"
+        return Response(status_code=304, headers=headers)
+
+    body = await cached_result(key)
+    if body is None:
+        # Concurrent identical requests wait on one computation in the pool
+        timer.cache = "shared"
+
+        def run():
+            timer.cache = "miss"
+            return run_admitted(cost, compute, *args)
+
+        try:
+            body = await single_flight.do(key, run)
+        except Overloaded as e:
+            timer.cache = "shed"
+            return overloaded_response(e)
+        if isinstance(body, Response):
+            return body
+    else:
+        timer.cache = "hit"
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def store_upload(contents):
+    """
+    Decode an upload and keep it in the shared store under its content hash
+
+    Raises:
+        EntryTooLarge: If the decoded image is larger than the whole store
+    """
+    image_id = hashlib.sha256(contents).hexdigest()
+    info = shared_store.array_info(image_id)
+    if info is None:
+        img = decode_image(contents)
+        release_upload(contents)
         if img is None:
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid image file"}
-            )
+            return None
+        shared_store.put_array(image_id, img)
+        info = {"shape": list(img.shape)}
+    return {"imageId": image_id, "height": info["shape"][0], "width": info["shape"][1]}
+
+@router.post("/images")
+async def upload_image(image: UploadFile = File(...)):
+    """
+    Upload an image once and process it by ID afterwards
+
+    The decoded image is kept in the cross-process shared store, so any
+    worker can serve operations on it until it is evicted (then 404). An
+    image larger than the whole store is refused with 507.
+    """
+    contents = await read_upload(image)
+    try:
+        check_pixel_budget(contents)
+    except PixelBudgetExceeded as e:
+        IMAGE_BUDGET.inc(action="rejected")
+        return JSONResponse(status_code=e.status_code, content={"error": str(e)})
+    try:
+        stored = await run_in_pool(store_upload, contents)
+    except EntryTooLarge as e:
+        return JSONResponse(status_code=507, content={"error": f"Image cannot be stored: {str(e)}"})
+    if stored is None:
+        return JSONResponse(status_code=400, content={"error": "Invalid image file"})
+    return JSONResponse(stored)
 
-        # Apply gamma correction
-        # First normalize the image to 0-1
-        normalized = img / 255.0
-        # Apply gamma correction
-        corrected = np.power(normalized, gamma)
-        # Scale back to 0-255 and convert to uint8
-        corrected = np.clip(corrected * 255, 0, 255).astype(np.uint8)
-        
-        # Compute histograms for original image
-        hist_original = cv2.calcHist([img], [0], None, [256], [0, 256]).flatten()
-        hist_original_norm = hist_original / hist_original.sum()
-        cum_original = hist_original_norm.cumsum() * hist_original.max()
-        
-        # Compute histograms for processed image
-        hist_processed = cv2.calcHist([corrected], [0], None, [256], [0, 256]).flatten()
-        hist_processed_norm = hist_processed / hist_processed.sum()
-        cum_processed = hist_processed_norm.cumsum() * hist_processed.max()
-        
-        # Encode processed image to base64
-        _, processed_img = cv2.imencode('.png', corrected)
-        processed_base64 = base64.b64encode(processed_img.tobytes()).decode('utf-8')
-        
-        return JSONResponse({
-            "processedImage": f"data:image/png;base64,{processed_base64}",
-            "originalHistogram": hist_original.tolist(),
-            "originalCumulative": cum_original.tolist(),
-            "processedHistogram": hist_processed.tolist(),
-            "processedCumulative": cum_processed.tolist()
+@router.get("/images/{image_id}")
+async def get_image_info(image_id: str):
+    """Report whether an uploaded image is still stored, and its size"""
+    info = await run_in_pool(shared_store.array_info, image_id)
+    if info is None:
+        return JSONResponse(status_code=404, content={"error": "Image not found"})
+    return JSONResponse({"imageId": image_id, "height": info["shape"][0], "width": info["shape"][1]})
+
+def pyramid_metadata(image_id, width, height, levels):
+    """List the levels of a stored image's pyramid with the URL of each level's image"""
+    base = f"{router.prefix}/images/{image_id}/pyramid"
+    entries = []
+    for level in range(levels):
+        level_width, level_height = level_size(width, height, level)
+        entries.append({
+            "level": level,
+            "width": level_width,
+            "height": level_height,
+            "gaussian": f"{base}/gaussian/{level}",
+            # The last level of a Laplacian pyramid is its Gaussian level
+            "laplacian": f"{base}/{'gaussian' if level == levels - 1 else 'laplacian'}/{level}"
         })
-        
-    except Exception as e:
-        print(f"Error processing image: {str(e)}")
-        return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to process image: {str(e)}"}
-        )
+    return {
+        "imageId": image_id,
+        "width": width,
+        "height": height,
+        "levels": entries,
+        "reconstructed": f"{base}/reconstructed/{levels - 1}"
+    }
 
-@router.post("/2pointer")
-async def analyze_two_images(image_a: UploadFile = File(...), image_b: UploadFile = File(...)):
+@router.get("/images/{image_id}/pyramid")
+async def get_pyramid(image_id: str, levels: int = None):
+    """
+    Describe the Gaussian and Laplacian pyramid of an uploaded image
+
+    Nothing is computed here: each level's image is built and encoded when
+    its URL is first requested, then cached. By default levels go down to
+    the first one under 8 pixels on its shorter side.
+    """
+    info = await run_in_pool(shared_store.array_info, image_id)
+    if info is None:
+        return JSONResponse(status_code=404, content={"error": "Image not found"})
+    height, width = info["shape"][:2]
+    limit = max_levels(width, height)
+    if levels is None:
+        levels = default_levels(width, height)
+    if not 1 <= levels <= limit:
+        return JSONResponse(status_code=400, content={"error": f"levels must be between 1 and {limit}"})
+    return JSONResponse(pyramid_metadata(image_id, width, height, levels))
+
+@router.get("/images/{image_id}/pyramid/{kind}/{level}")
+async def get_pyramid_level(request: Request, image_id: str, kind: str, level: int):
+    """Return one pyramid level of an uploaded image as PNG, building and encoding it on first access"""
+    if kind not in PYRAMID_KINDS:
+        return JSONResponse(status_code=404, content={"error": f"Unknown pyramid kind: {kind}"})
+    info = await run_in_pool(shared_store.array_info, image_id)
+    if info is None:
+        return JSONResponse(status_code=404, content={"error": "Image not found"})
+    height, width = info["shape"][:2]
+    last = max_levels(width, height) - 1
+    if not 0 <= level <= last:
+        return JSONResponse(status_code=404, content={"error": f"Level must be between 0 and {last}"})
+
+    async def handler(timer):
+        # Levels are derived from a content-addressed image, so they never change
+        key = pyramid_cache.key(image_id, kind, level, encoded=True)
+        headers = {"ETag": f'"{key}"', "Cache-Control": "public, max-age=31536000, immutable"}
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            timer.cache = "not_modified"
+            return Response(status_code=304, headers=headers)
+        data = await run_in_pool(shared_store.get_bytes, key)
+        if data is not None:
+            timer.cache = "hit"
+        else:
+            # Building a level may downsample the whole image; charge a cold build
+            timer.cache = "miss"
+            cost = stored_cost("pyramids", info, {})
+            try:
+                data = await single_flight.do(
+                    key, lambda: run_admitted(cost, pyramid_cache.png, image_id, kind, level, last)
+                )
+            except Overloaded as e:
+                timer.cache = "shed"
+                return overloaded_response(e)
+        if data is None:
+            return JSONResponse(status_code=404, content={"error": "Image not found; upload it again"})
+        return Response(content=data, media_type="image/png", headers=headers)
+
+    return await timed_operation("pyramid-level", handler)
+
+@router.get("/tiles/{image_id}/{op_spec}")
+async def get_tiles_info(image_id: str, op_spec: str):
+    """
+    Describe the tile pyramid of an uploaded image under an operation spec
+
+    The spec is an operation name with ;name=value parameters (for example
+    median-filter;kernel_size=5), or "original". Zoom levels follow Deep
+    Zoom: the image is one pixel at zoom 0 and full size at maxZoom.
+    """
     try:
-        # Read both images
-        contents_a = await image_a.read()
-        contents_b = await image_b.read()
-        
-        # Convert to numpy arrays
-        nparr_a = np.frombuffer(contents_a, np.uint8)
-        nparr_b = np.frombuffer(contents_b, np.uint8)
-        
-        # Decode images
-        img_a = cv2.imdecode(nparr_a, cv2.IMREAD_GRAYSCALE)
-        img_b = cv2.imdecode(nparr_b, cv2.IMREAD_GRAYSCALE)
-        
-        if img_a is None or img_b is None:
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid image file(s)"}
+        parse_op_spec(op_spec)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    info = await run_in_pool(shared_store.array_info, image_id)
+    if info is None:
+        return JSONResponse(status_code=404, content={"error": "Image not found"})
+    height, width = info["shape"][:2]
+    levels = []
+    for zoom in range(max_zoom(width, height) + 1):
+        level_width, level_height = zoom_size(width, height, zoom)
+        columns, rows = tile_grid(level_width, level_height)
+        levels.append({"zoom": zoom, "width": level_width, "height": level_height,
+                       "columns": columns, "rows": rows})
+    return JSONResponse({
+        "imageId": image_id,
+        "width": width,
+        "height": height,
+        "tileSize": TILE_SIZE,
+        "maxZoom": max_zoom(width, height),
+        "levels": levels,
+        "urlTemplate": f"{router.prefix}/tiles/{image_id}/{op_spec}/{{z}}/{{x}}/{{y}}.png"
+    })
+
+@router.get("/tiles/{image_id}/{op_spec}/{z}/{x}/{y}")
+async def get_tile(request: Request, image_id: str, op_spec: str, z: int, x: int, y: str):
+    """
+    Return one processed tile of an uploaded image as PNG, computing it on first access
+
+    Only the tile and the halo its operation needs are processed, from the
+    pyramid level of the zoom, so a viewer can pan and zoom a processed
+    gigapixel image without it ever being processed or sent whole.
+    """
+    try:
+        operation, params = parse_op_spec(op_spec)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    info = await run_in_pool(shared_store.array_info, image_id)
+    if info is None:
+        return JSONResponse(status_code=404, content={"error": "Image not found"})
+    height, width = info["shape"][:2]
+    try:
+        y = int(y[:-len(".png")] if y.endswith(".png") else y)
+    except ValueError:
+        return JSONResponse(status_code=404, content={"error": "Tile not found"})
+    if not 0 <= z <= max_zoom(width, height):
+        return JSONResponse(status_code=404, content={"error": f"Zoom must be between 0 and {max_zoom(width, height)}"})
+    columns, rows = tile_grid(*zoom_size(width, height, z))
+    if not (0 <= x < columns and 0 <= y < rows):
+        return JSONResponse(status_code=404, content={"error": "Tile not found"})
+
+    async def handler(timer):
+        # Tiles are derived from a content-addressed image, so they never change
+        key = tile_key(image_id, operation, params, z, x, y)
+        headers = {"ETag": f'"{key}"', "Cache-Control": "public, max-age=31536000, immutable"}
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            timer.cache = "not_modified"
+            return Response(status_code=304, headers=headers)
+
+        data = tile_cache.get(key)
+        if data is None:
+            timer.cache = "shared"
+            cost = 0 if operation == ORIGINAL else estimate_cost(operation, TILE_SIZE * TILE_SIZE, params)
+
+            def run():
+                timer.cache = "miss"
+                return run_admitted(cost, render_tile, image_id, operation, params, z, x, y)
+
+            try:
+                data = await single_flight.do(key, run)
+            except Overloaded as e:
+                timer.cache = "shed"
+                return overloaded_response(e)
+            except (TypeError, ValueError) as e:
+                return JSONResponse(status_code=400, content={"error": f"Invalid parameters for {operation}: {e}"})
+            if data is None:
+                return JSONResponse(status_code=404, content={"error": "Image not found; upload it again"})
+            tile_cache.put(key, data)
+        else:
+            timer.cache = "hit"
+        return Response(content=data, media_type="image/png", headers=headers)
+
+    return await timed_operation("tile", handler)
+
+@router.post("/images/{image_id}/{operation}")
+async def process_stored_image(
+    request: Request,
+    image_id: str,
+    operation: str,
+    params: str = Form("{}")  # JSON object of operation parameters
+):
+    """Run any single-image operation on a previously uploaded image"""
+    if operation not in OPERATIONS or operation == "2pointer":
+        return JSONResponse(status_code=404, content={"error": f"Unknown operation: {operation}"})
+    try:
+        params = json.loads(params)
+        if not isinstance(params, dict):
+            raise ValueError("params must be a JSON object")
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+    try:
+        options = response_options(request)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    if options["color"] != "gray":
+        # Stored images are kept decoded to grayscale
+        return JSONResponse(status_code=400, content={"error": "Stored images only support color=gray"})
+    # Stored images are processed at the size they were stored at
+    options["max_side"] = None
+    error = unsupported_option(operation, options)
+    if error is not None:
+        return JSONResponse(status_code=400, content={"error": error})
+    key_options = use_response_options(options)
+
+    async def handler(timer):
+        try:
+            key = make_cache_key(operation, [image_id.encode()], {**params, **key_options})
+            meta = {"operation": operation, "params": params, "imageId": image_id}
+            info = await run_in_pool(shared_store.array_info, image_id)
+            return await serve_cached(
+                request, key, meta, timer, compute_stored_operation, operation, [image_id], params, key,
+                cost=stored_cost(operation, info, params, options["roi"])
             )
+        except TypeError as e:
+            # Missing or unknown keyword parameters for the operation
+            return JSONResponse(status_code=400, content={"error": f"Invalid parameters: {str(e)}"})
+        except Exception as e:
+            print(f"Error processing image: {str(e)}")
+            return JSONResponse(status_code=500, content={"error": f"Failed to process image: {str(e)}"})
 
-        # Compute histograms and normalize them
-        hist_a = cv2.calcHist([img_a], [0], None, [256], [0, 256]).flatten()
-        hist_b = cv2.calcHist([img_b], [0], None, [256], [0, 256]).flatten()
-        
-        # Normalize histograms
-        norm_hist_a = hist_a / hist_a.sum()
-        norm_hist_b = hist_b / hist_b.sum()
-        
-        # Compute cumulative histograms
-        cum_hist_a = norm_hist_a.cumsum()
-        cum_hist_b = norm_hist_b.cumsum()
-        
-        # Find monotonic mapping using two-pointer technique
-        mapping = np.full(256, -1, dtype=int)  # -1 indicates no mapping
-        ptr_b = 0
-        
-        for intensity_a in range(256):
-            target_cum = cum_hist_a[intensity_a]
-            
-            # Move pointer B until we find a matching or greater cumulative value
-            while ptr_b < 256 and cum_hist_b[ptr_b] < target_cum:
-                ptr_b += 1
-            
-            if ptr_b < 256:
-                mapping[intensity_a] = ptr_b
-            else:
-                break
-        
-        # Apply mapping to create transformed image
-        transformed = np.zeros_like(img_a)
-        for i in range(img_a.shape[0]):
-            for j in range(img_a.shape[1]):
-                val = mapping[img_a[i, j]]
-                transformed[i, j] = 0 if val == -1 else val
-        
-        # Encode images to base64
-        _, img_a_encoded = cv2.imencode('.png', img_a)
-        _, img_b_encoded = cv2.imencode('.png', img_b)
-        _, transformed_encoded = cv2.imencode('.png', transformed)
-        
-        return JSONResponse({
-            "imageA": f"data:image/png;base64,{base64.b64encode(img_a_encoded.tobytes()).decode('utf-8')}",
-            "imageB": f"data:image/png;base64,{base64.b64encode(img_b_encoded.tobytes()).decode('utf-8')}",
-            "transformedImage": f"data:image/png;base64,{base64.b64encode(transformed_encoded.tobytes()).decode('utf-8')}",
-            "histogramA": hist_a.tolist(),
-            "histogramB": hist_b.tolist(),
-            "cumulativeA": (cum_hist_a * hist_a.max()).tolist(),
-            "cumulativeB": (cum_hist_b * hist_b.max()).tolist(),
-            "mapping": mapping.tolist()
-        })
-        
-    except Exception as e:
-        print(f"Error processing images: {str(e)}")
+    return await timed_operation(operation, handler)
+
+def job_status(job):
+    """Status of a job as returned by the job endpoints"""
+    base = f"{router.prefix}/jobs/{job.id}"
+    status = {
+        "jobId": job.id,
+        "operation": job.operation,
+        "status": job.status,
+        "priority": job.priority,
+        "progress": round(job.progress, 3),
+        "stage": job.stage,
+        "createdAt": job.created,
+        "startedAt": job.started,
+        "finishedAt": job.finished,
+        "statusUrl": base,
+        "eventsUrl": f"{base}/events",
+        "resultUrl": f"{base}/result"
+    }
+    if job.status == "queued":
+        status["position"] = job_queue.position(job)
+    if job.done:
+        status["expiresAt"] = job.finished + job_queue.ttl
+    if job.error is not None:
+        status["error"] = job.error
+    return status
+
+def job_not_found():
+    return JSONResponse(status_code=404, content={"error": "Job not found or its result expired"})
+
+@router.post("/jobs/{operation}")
+async def submit_job(
+    request: Request,
+    operation: str,
+    params: str = Form("{}"),  # JSON object of operation parameters
+    images: List[UploadFile] = File(None),  # one image, or image_a and image_b for 2pointer
+    image_id: str = Form(None),  # or a previously uploaded image
+    priority: int = Form(0)  # higher runs first
+):
+    """
+    Queue any router operation and return a job ID immediately
+
+    Long operations no longer hold the HTTP connection open: poll
+    GET /jobs/{job_id} or follow GET /jobs/{job_id}/events (Server-Sent
+    Events) for status and progress, then fetch GET /jobs/{job_id}/result.
+    Jobs are run on the worker pool by priority, and finished results are
+    kept for JOB_RESULT_TTL_SECONDS. The response options of the image
+    endpoints (max_side, inline_max, arrays, color, roi) apply as query parameters.
+    """
+    if operation not in OPERATIONS:
+        return JSONResponse(status_code=404, content={"error": f"Unknown operation: {operation}"})
+    try:
+        params = json.loads(params)
+        if not isinstance(params, dict):
+            raise ValueError("params must be a JSON object")
+        options = response_options(request)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    expected = 2 if operation == "2pointer" else 1
+    if image_id is not None:
+        if expected != 1 or images:
+            return JSONResponse(status_code=400, content={"error": "image_id replaces the upload of a single image"})
+        if options["color"] != "gray":
+            return JSONResponse(status_code=400, content={"error": "Stored images only support color=gray"})
+        options["max_side"] = None
+    elif len(images or []) != expected:
         return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to process images: {str(e)}"}
+            status_code=400,
+            content={"error": f"{operation} takes {expected} image{'s' if expected > 1 else ''}"}
         )
+    error = unsupported_option(operation, options)
+    if error is not None:
+        return JSONResponse(status_code=400, content={"error": error})
+    key_options = use_response_options(options)
+
+    if image_id is not None:
+        info = await run_in_pool(shared_store.array_info, image_id)
+        if info is None:
+            return JSONResponse(status_code=404, content={"error": "Image not found"})
+        key = make_cache_key(operation, [image_id.encode()], {**params, **key_options})
+        compute = (compute_stored_operation, operation, [image_id], params, key)
+        cost = stored_cost(operation, info, params, options["roi"])
+        size = 0
+    else:
+        # Large uploads are memory-mapped; the map stays valid after the request ends
+        contents = [await read_upload(upload) for upload in images]
+        try:
+            for data in contents:
+                check_pixel_budget(data, policy="downscale" if options["max_side"] else None)
+        except PixelBudgetExceeded as e:
+            IMAGE_BUDGET.inc(action="rejected")
+            return JSONResponse(status_code=e.status_code, content={"error": str(e)})
+        key = make_cache_key(operation, contents, {**params, **key_options})
+        compute = (compute_operation, operation, contents, params, key, options["max_side"])
+        cost = upload_cost(operation, contents, params, options)
+        size = sum(len(data) for data in contents)
+
+    async def run():
+        timer = current_timer.get()
+        try:
+            body = await cached_result(key)
+            if body is None:
+                # Shares the computation with identical requests and jobs in flight;
+                # queued jobs are never shed, they wait for the admission budget
+                body = await single_flight.do(key, lambda: run_admitted(cost, *compute, shed=False))
+            else:
+                timer.cache = "hit"
+        except Overloaded:
+            # Shared the flight of a request that was shed; compute it without shedding
+            body = await run_admitted(cost, *compute, shed=False)
+        except TypeError as e:
+            # Missing or unknown keyword parameters for the operation
+            body = JSONResponse(status_code=400, content={"error": f"Invalid parameters: {str(e)}"})
+        observe_request(operation, timer, body.status_code if isinstance(body, Response) else 200)
+        return body
+
+    try:
+        job = job_queue.submit(operation, run, priority, size)
+    except JobQueueFull as e:
+        return JSONResponse(status_code=503, content={"error": str(e)}, headers={"Retry-After": "5"})
+    status = job_status(job)
+    return JSONResponse(status_code=202, content=status, headers={"Location": status["statusUrl"]})
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Report a job's status, queue position and progress"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return job_not_found()
+    return JSONResponse(job_status(job))
+
+@router.get("/jobs/{job_id}/events")
+async def get_job_events(job_id: str):
+    """
+    Stream a job's status as Server-Sent Events until it finishes
+
+    Every change is sent as a "status" event with the same content as
+    GET /jobs/{job_id}; the last event is named "done" or "failed".
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return job_not_found()
+
+    async def events():
+        version = None
+        while True:
+            if job.version != version:
+                version = job.version
+                name = job.status if job.done else "status"
+                yield f"event: {name}\ndata: {json.dumps(job_status(job))}\n\n"
+                if job.done:
+                    return
+            else:
+                # Comment line keeping proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+            await job.wait(version, 15)
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """
+    Return a finished job's response body, exactly as the operation's endpoint would
+
+    A job that has not finished yet returns 202 with its status.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return job_not_found()
+    if not job.done:
+        return JSONResponse(status_code=202, content=job_status(job), headers={"Retry-After": "1"})
+    result = job.result
+    if result is None:
+        # Evicted from the shared store before the job's TTL ran out
+        return job_not_found()
+    return Response(content=result, status_code=job.status_code, media_type=job.media_type)
+
+@router.get("/stats")
+async def get_stats():
+    """Report result cache, request deduplication and worker pool counters"""
+    return JSONResponse({
+        "cache": result_cache.stats(),
+        "sharedStore": await run_in_pool(shared_store.stats),
+        "pyramids": pyramid_cache.stats(),
+        "tiles": tile_cache.stats(),
+        "spillStore": spill_store.stats(),
+        "singleFlight": single_flight.stats(),
+        "workerPool": pool_stats(),
+        "jobs": job_queue.stats(),
+        "admission": admission.stats()
+    })
+
+@router.get("/metrics")
+async def get_metrics():
+    """Expose stage timings, cache, pool and image size metrics in Prometheus text format"""
+    cache = result_cache.stats()
+    flights = single_flight.stats()
+    pool = pool_stats()
+    store = await run_in_pool(shared_store.stats)
+    spill = spill_store.stats()
+    jobs = job_queue.stats()
+    admitted = admission.stats()
+    body = render_metrics(
+        render_counter("result_cache_hits", "Result cache hits", cache["hits"]),
+        render_counter("result_cache_misses", "Result cache misses", cache["misses"]),
+        render_gauge("result_cache_hit_ratio", "Fraction of result cache lookups that hit", cache["hitRate"]),
+        render_counter("result_cache_evictions", "Result cache evictions", cache["evictions"]),
+        render_counter("result_cache_shared_failures", "Result cache writes to the shared store that failed",
+                       cache["sharedFailures"]),
+        render_gauge("result_cache_entries", "Entries held in the result cache", cache["entries"]),
+        render_gauge("result_cache_bytes", "Bytes held in the result cache", cache["bytes"]),
+        render_gauge("shared_store_entries", "Entries in the cross-process shared store", store["entries"]),
+        render_gauge("shared_store_bytes", "Bytes held in the cross-process shared store", store["bytes"]),
+        render_gauge("shared_store_hit_ratio", "Fraction of this worker's shared store lookups that hit",
+                     store["hitRate"]),
+        render_gauge("spill_store_bytes", "Bytes of results held on disk for serving by reference", spill["bytes"]),
+        render_counter("spill_store_evictions", "Spill store files removed by the janitor", spill["evictions"]),
+        render_gauge("single_flight_in_flight", "Distinct computations in progress", flights["inFlight"]),
+        render_gauge("single_flight_waiters", "Requests waiting on an in-progress computation", flights["waiters"]),
+        render_counter("single_flight_deduplicated", "Requests served by another request's computation",
+                       flights["deduplicated"]),
+        render_gauge("worker_pool_workers", "Threads in the image worker pool", pool["workers"]),
+        render_gauge("worker_pool_queue_depth", "Jobs waiting for a pool worker", pool["queued"]),
+        render_gauge("worker_pool_running", "Jobs running on the pool", pool["running"]),
+        render_gauge("job_queue_queued", "Submitted jobs waiting to run", jobs["queued"]),
+        render_gauge("job_queue_running", "Submitted jobs running", jobs["running"]),
+        render_gauge("job_queue_finished", "Finished jobs whose result is still kept", jobs["finished"]),
+        render_gauge("job_queue_bytes", "Upload bytes held by queued and running jobs", jobs["bytes"]),
+        render_gauge("admission_in_flight_ms", "Estimated worker milliseconds of admitted work in flight",
+                     admitted["inFlightMs"]),
+        render_gauge("admission_capacity_ms", "Admission budget of estimated worker milliseconds",
+                     admitted["capacityMs"]),
+        render_gauge("admission_waiting", "Requests waiting for admission", admitted["waiting"]),
+        render_counter("admission_admitted", "Requests admitted by class",
+                       {(("class", name),): count for name, count in admitted["admitted"].items()}),
+        render_counter("admission_shed", "Requests shed with 503", admitted["shed"]),
+        render_gauge("admission_cost_correction", "Ratio of measured to estimated operation time",
+                     admitted["costCorrection"]),
+    )
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+def profiles_forbidden():
+    return JSONResponse(status_code=403, content={"error": "Profiles need the X-Profile token"})
+
+@router.get("/profiles")
+async def list_profiles(request: Request):
+    """List the stored request profiles, newest first (needs the X-Profile token)"""
+    if not profile_authorized(request.headers):
+        return profiles_forbidden()
+    return JSONResponse({"profiles": profile_store.list()})
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(request: Request, profile_id: str, format: str = "txt"):
+    """Download a stored profile as a call tree summary (txt) or pstats data (prof); needs the X-Profile token"""
+    if not profile_authorized(request.headers):
+        return profiles_forbidden()
+    path = profile_store.path(profile_id, format)
+    if path is None or not os.path.exists(path):
+        return JSONResponse(status_code=404, content={"error": "Profile not found"})
+    if format == "prof":
+        return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+    return FileResponse(path, media_type="text/plain" if format == "txt" else "application/json")
+
+@router.post("/brightness")
+async def adjust_brightness(request: Request, image: UploadFile = File(...), value: int = Form(...)):
+    return await run_operation(request, "brightness", [image], {"value": value})
+
+@router.post("/contrast")
+async def process_contrast(request: Request, image: UploadFile = File(...), factor: float = Form(...)):
+    return await run_operation(request, "contrast", [image], {"factor": factor})
+
+@router.get("/temp/{filename}")
+async def get_temp_file(filename: str):
+    """
+    Serve a result returned by reference from the spill store
+
+    Entries are content-addressed and never change, so clients may cache
+    them indefinitely; range requests are supported and the server may use
+    zero-copy file sending.
+    """
+    path = spill_store.path(filename)
+    if path is None:
+        return JSONResponse(status_code=404, content={"error": "File not found or expired"})
+    return FileResponse(
+        path, media_type=spill_store.media_type(filename),
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+@router.post("/compute-histogram")
+async def compute_image_histogram(
+    request: Request,
+    image: UploadFile = File(...)
+):
+    """Compute histogram for uploaded image without processing"""
+    return await run_operation(request, "compute-histogram", [image], {})
+
+@router.post("/equalize")
+async def equalize_histogram(request: Request, image: UploadFile = File(...)):
+    return await run_operation(request, "equalize", [image], {})
+
+@router.post("/gamma")
+async def adjust_gamma(request: Request, image: UploadFile = File(...), gamma: float = Form(...)):
+    return await run_operation(request, "gamma", [image], {"gamma": gamma})
+
+@router.post("/2pointer")
+async def analyze_two_images(
+    request: Request,
+    image_a: UploadFile = File(...),
+    image_b: UploadFile = File(...)
+):
+    return await run_operation(request, "2pointer", [image_a, image_b], {})
 
 @router.post("/transform")
 async def transform_image(
+    request: Request,
     image: UploadFile = File(...),
     type: str = Form(...),
     angle: float = Form(0.0),
@@ -389,352 +1275,77 @@ async def transform_image(
     shear_x: float = Form(0.0),
     shear_y: float = Form(0.0)
 ):
-    try:
-        # Read and decode image
-        contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-        
-        if img is None:
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid image file"}
-            )
-
-        height, width = img.shape
-        center = (width // 2, height // 2)
-
-        # Get transformation matrix based on type
-        if type == "rotation":
-            matrix = get_rotation_matrix(angle, center, (width, height))
-        elif type == "translation":
-            matrix = get_translation_matrix(tx, ty)
-        elif type == "scaling":
-            matrix = get_scaling_matrix(scale_x, scale_y, center)
-        elif type == "shearing":
-            matrix = get_shear_matrix(shear_x, shear_y, center)
-        else:
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid transformation type"}
-            )
-
-        # Apply transformation
-        transformed = apply_transformation(img, matrix)
-        
-        # Encode the transformed image
-        _, img_encoded = cv2.imencode('.png', transformed)
-        
-        return JSONResponse({
-            "processedImage": f"data:image/png;base64,{base64.b64encode(img_encoded.tobytes()).decode('utf-8')}",
-            "transformationMatrix": matrix.tolist()
-        })
-
-    except Exception as e:
-        print(f"Error processing image: {str(e)}")
-        return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to process image: {str(e)}"}
-        )
+    return await run_operation(request, "transform", [image], {
+        "type": type,
+        "angle": angle,
+        "tx": tx,
+        "ty": ty,
+        "scale_x": scale_x,
+        "scale_y": scale_y,
+        "shear_x": shear_x,
+        "shear_y": shear_y
+    })
 
 @router.post("/add-noise")
 async def process_noise(
+    request: Request,
     image: UploadFile = File(...),
     noise_type: str = Form(...),
     intensity: float = Form(...),
 ):
-    try:
-        # Read image
-        contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-        
-        if img is None:
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid image file"}
-            )
-
-        # Apply noise
-        noise_img = add_noise(img, noise_type, float(intensity))
-        
-        # Compute histograms for original image
-        hist_original = cv2.calcHist([img], [0], None, [256], [0, 256]).flatten()
-        hist_original_norm = hist_original / hist_original.sum()
-        cum_original = hist_original_norm.cumsum() * hist_original.max()
-        
-        # Compute histograms for processed image
-        hist_processed = cv2.calcHist([noise_img], [0], None, [256], [0, 256]).flatten()
-        hist_processed_norm = hist_processed / hist_processed.sum()
-        cum_processed = hist_processed_norm.cumsum() * hist_processed.max()
-        
-        # Encode processed image to base64
-        _, processed_img = cv2.imencode('.png', noise_img)
-        processed_base64 = base64.b64encode(processed_img.tobytes()).decode('utf-8')
-        
-        return JSONResponse({
-            "processedImage": f"data:image/png;base64,{processed_base64}",
-            "originalHistogram": hist_original.tolist(),
-            "originalCumulative": cum_original.tolist(),
-            "processedHistogram": hist_processed.tolist(),
-            "processedCumulative": cum_processed.tolist()
-        })
-        
-    except Exception as e:
-        print(f"Error processing image: {str(e)}")
-        return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to process image: {str(e)}"}
-        )
+    return await run_operation(request, "add-noise", [image], {
+        "noise_type": noise_type,
+        "intensity": intensity
+    })
 
 @router.post("/apply-filter")
 async def process_filter(
+    request: Request,
     image: UploadFile = File(...),
     filter_sequence: str = Form(...)  # Will receive something like "min,max,min"
 ):
-    try:
-        # Read image
-        contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-        
-        if img is None:
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid image file"}
-            )
-
-        # Process the filter sequence
-        processed = img.copy()
-        filter_list = filter_sequence.split(',')
-        
-        for filter_type in filter_list:
-            if filter_type == 'min':
-                processed = apply_min_filter(processed)
-            elif filter_type == 'max':
-                processed = apply_max_filter(processed)
-        
-        # Compute histograms for original image
-        hist_original = cv2.calcHist([img], [0], None, [256], [0, 256]).flatten()
-        hist_original_norm = hist_original / hist_original.sum()
-        cum_original = hist_original_norm.cumsum() * hist_original.max()
-        
-        # Compute histograms for processed image
-        hist_processed = cv2.calcHist([processed], [0], None, [256], [0, 256]).flatten()
-        hist_processed_norm = hist_processed / hist_processed.sum()
-        cum_processed = hist_processed_norm.cumsum() * hist_processed.max()
-        
-        # Encode processed image to base64
-        _, processed_img = cv2.imencode('.png', processed)
-        processed_base64 = base64.b64encode(processed_img.tobytes()).decode('utf-8')
-        
-        return JSONResponse({
-            "processedImage": f"data:image/png;base64,{processed_base64}",
-            "originalHistogram": hist_original.tolist(),
-            "originalCumulative": cum_original.tolist(),
-            "processedHistogram": hist_processed.tolist(),
-            "processedCumulative": cum_processed.tolist(),
-            "appliedFilters": filter_list
-        })
-        
-    except Exception as e:
-        print(f"Error processing image: {str(e)}")
-        return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to process image: {str(e)}"}
-        )
+    return await run_operation(request, "apply-filter", [image], {
+        "filter_sequence": filter_sequence
+    })
 
 @router.post("/median-filter")
 async def process_median_filter(
+    request: Request,
     image: UploadFile = File(...),
     kernel_size: int = Form(...)
 ):
-    try:
-        # Read image
-        contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-        
-        if img is None:
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid image file"}
-            )
-
-        # Ensure kernel size is odd
-        if kernel_size % 2 == 0:
-            kernel_size += 1
-
-        # Apply median filter
-        processed = apply_median_filter(img, kernel_size)
-        
-        # Compute histograms for original image
-        hist_original = cv2.calcHist([img], [0], None, [256], [0, 256]).flatten()
-        hist_original_norm = hist_original / hist_original.sum()
-        cum_original = hist_original_norm.cumsum() * hist_original.max()
-        
-        # Compute histograms for processed image
-        hist_processed = cv2.calcHist([processed], [0], None, [256], [0, 256]).flatten()
-        hist_processed_norm = hist_processed / hist_processed.sum()
-        cum_processed = hist_processed_norm.cumsum() * hist_processed.max()
-        
-        # Encode processed image to base64
-        _, processed_img = cv2.imencode('.png', processed)
-        processed_base64 = base64.b64encode(processed_img.tobytes()).decode('utf-8')
-        
-        return JSONResponse({
-            "processedImage": f"data:image/png;base64,{processed_base64}",
-            "originalHistogram": hist_original.tolist(),
-            "originalCumulative": cum_original.tolist(),
-            "processedHistogram": hist_processed.tolist(),
-            "processedCumulative": cum_processed.tolist(),
-            "kernelSize": kernel_size
-        })
-        
-    except Exception as e:
-        print(f"Error processing image: {str(e)}")
-        return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to process image: {str(e)}"}
-        )
+    return await run_operation(request, "median-filter", [image], {"kernel_size": kernel_size})
 
 @router.post("/mean-filter")
 async def process_mean_filter(
+    request: Request,
     image: UploadFile = File(...),
     kernel_size: int = Form(...)
 ):
-    try:
-        # Read image
-        contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-        
-        if img is None:
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid image file"}
-            )
-
-        # Ensure kernel size is odd
-        if kernel_size % 2 == 0:
-            kernel_size += 1
-
-        # Apply mean filter
-        processed = apply_mean_filter(img, kernel_size)
-        
-        # Compute histograms for original image
-        hist_original = cv2.calcHist([img], [0], None, [256], [0, 256]).flatten()
-        hist_original_norm = hist_original / hist_original.sum()
-        cum_original = hist_original_norm.cumsum() * hist_original.max()
-        
-        # Compute histograms for processed image
-        hist_processed = cv2.calcHist([processed], [0], None, [256], [0, 256]).flatten()
-        hist_processed_norm = hist_processed / hist_processed.sum()
-        cum_processed = hist_processed_norm.cumsum() * hist_processed.max()
-        
-        # Encode processed image to base64
-        _, processed_img = cv2.imencode('.png', processed)
-        processed_base64 = base64.b64encode(processed_img.tobytes()).decode('utf-8')
-        
-        return JSONResponse({
-            "processedImage": f"data:image/png;base64,{processed_base64}",
-            "originalHistogram": hist_original.tolist(),
-            "originalCumulative": cum_original.tolist(),
-            "processedHistogram": hist_processed.tolist(),
-            "processedCumulative": cum_processed.tolist(),
-            "kernelSize": kernel_size
-        })
-        
-    except Exception as e:
-        print(f"Error processing image: {str(e)}")
-        return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to process image: {str(e)}"}
-        )
+    return await run_operation(request, "mean-filter", [image], {"kernel_size": kernel_size})
 
 @router.post("/convolution")
 async def process_convolution(
+    request: Request,
     image: UploadFile = File(...),
     kernel_size: int = Form(...),
     mask_type: str = Form(...),
     custom_mask: str = Form(None),
     add_128: bool = Form(False)  # Add this parameter
 ):
-    try:
-        # Read image
-        contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-        
-        if img is None:
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid image file"}
-            )
-
-        # Ensure kernel size is odd
-        if kernel_size % 2 == 0:
-            kernel_size += 1
-
-        # Create mask
-        if custom_mask:
-            try:
-                # Parse custom mask JSON string to numpy array
-                mask_data = json.loads(custom_mask)
-                mask = np.array(mask_data, dtype=np.float32)
-                
-                # Verify mask dimensions
-                if mask.shape != (kernel_size, kernel_size):
-                    raise ValueError(f"Mask dimensions must be {kernel_size}x{kernel_size}")
-                
-            except Exception as e:
-                print(f"Error parsing custom mask: {str(e)}")  # Debug log
-                return JSONResponse(
-                    status_code=400,
-                    content={"error": f"Invalid custom mask: {str(e)}"}
-                )
-        else:
-            mask = get_default_mask(mask_type, kernel_size)
-
-        # Apply convolution with add_128 parameter
-        processed = apply_convolution(img, mask, add_128=add_128)
-        
-        # Compute histograms for original image
-        hist_original = cv2.calcHist([img], [0], None, [256], [0, 256]).flatten()
-        hist_original_norm = hist_original / hist_original.sum()
-        cum_original = hist_original_norm.cumsum() * hist_original.max()
-        
-        # Compute histograms for processed image
-        hist_processed = cv2.calcHist([processed], [0], None, [256], [0, 256]).flatten()
-        hist_processed_norm = hist_processed / hist_processed.sum()
-        cum_processed = hist_processed_norm.cumsum() * hist_processed.max()
-        
-        # Encode processed image to base64
-        _, processed_img = cv2.imencode('.png', processed)
-        processed_base64 = base64.b64encode(processed_img.tobytes()).decode('utf-8')
-        
-        return JSONResponse({
-            "processedImage": f"data:image/png;base64,{processed_base64}",
-            "originalHistogram": hist_original.tolist(),
-            "originalCumulative": cum_original.tolist(),
-            "processedHistogram": hist_processed.tolist(),
-            "processedCumulative": cum_processed.tolist(),
-            "mask": mask.tolist()
-        })
-        
-    except Exception as e:
-        print(f"Error processing image: {str(e)}")
-        return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to process image: {str(e)}"}
-        )
+    return await run_operation(request, "convolution", [image], {
+        "kernel_size": kernel_size,
+        "mask_type": mask_type,
+        "custom_mask": custom_mask,
+        "add_128": add_128
+    })
 
 @router.get("/get-mask")
 async def get_mask(type: str, size: int):
     try:
         mask = get_default_mask(type, int(size))
-        return JSONResponse({
-            "mask": mask.tolist()
+        return fast_json.NumpyJSONResponse({
+            "mask": mask
         })
     except Exception as e:
         return JSONResponse(
@@ -742,111 +1353,35 @@ async def get_mask(type: str, size: int):
             content={"error": f"Failed to get mask: {str(e)}"}
         )
 
-@router.post("/image/bilateral")
+@router.post("/bilateral")
 async def process_bilateral(
+    request: Request,
     image: UploadFile = File(...),
     d: int = Form(...),
     sigma_color: float = Form(...),
     sigma_space: float = Form(...)
 ):
-    try:
-        # Read image
-        contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-        
-        if img is None:
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid image file"}
-            )
-
-        # Apply bilateral filter
-        filtered = cv2.bilateralFilter(img, d, sigma_color, sigma_space)
-        
-        # Compute histograms for original image
-        hist_original = cv2.calcHist([img], [0], None, [256], [0, 256]).flatten()
-        hist_original_norm = hist_original / hist_original.sum()
-        cum_original = hist_original_norm.cumsum() * hist_original.max()
-        
-        # Compute histograms for processed image
-        hist_processed = cv2.calcHist([filtered], [0], None, [256], [0, 256]).flatten()
-        hist_processed_norm = hist_processed / hist_processed.sum()
-        cum_processed = hist_processed_norm.cumsum() * hist_processed.max()
-        
-        # Encode processed image to base64
-        _, processed_img = cv2.imencode('.png', filtered)
-        processed_base64 = base64.b64encode(processed_img.tobytes()).decode('utf-8')
-        
-        return JSONResponse({
-            "processedImage": f"data:image/png;base64,{processed_base64}",
-            "originalHistogram": hist_original.tolist(),
-            "originalCumulative": cum_original.tolist(),
-            "processedHistogram": hist_processed.tolist(),
-            "processedCumulative": cum_processed.tolist()
-        })
-        
-    except Exception as e:
-        print(f"Error processing image: {str(e)}")
-        return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to process image: {str(e)}"}
-        )
+    return await run_operation(request, "bilateral", [image], {
+        "d": d,
+        "sigma_color": sigma_color,
+        "sigma_space": sigma_space
+    })
 
 @router.post("/fourier")
 async def process_fourier(
+    request: Request,
     image: UploadFile = File(...),
     center_spectrum: bool = Form(False),
     apply_log: bool = Form(False)
 ):
-    try:
-        # Read image
-        contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-        
-        if img is None:
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid image file"}
-            )
-
-        # Apply Fourier transform
-        magnitude_spectrum, reconstructed = apply_fourier_transform(
-            img, center_spectrum, apply_log
-        )
-        
-        # Compute histograms for original image
-        hist_original = cv2.calcHist([img], [0], None, [256], [0, 256]).flatten()
-        hist_original_norm = hist_original / hist_original.sum()
-        cum_original = hist_original_norm.cumsum() * hist_original.max()
-        
-        # Compute histograms for magnitude spectrum
-        hist_spectrum = cv2.calcHist([magnitude_spectrum], [0], None, [256], [0, 256]).flatten()
-        hist_spectrum_norm = hist_spectrum / hist_spectrum.sum()
-        cum_spectrum = hist_spectrum_norm.cumsum() * hist_spectrum.max()
-        
-        # Encode images to base64
-        _, magnitude_img = cv2.imencode('.png', magnitude_spectrum)
-        magnitude_base64 = base64.b64encode(magnitude_img.tobytes()).decode('utf-8')
-        
-        return JSONResponse({
-            "magnitudeSpectrum": f"data:image/png;base64,{magnitude_base64}",
-            "originalHistogram": hist_original.tolist(),
-            "originalCumulative": cum_original.tolist(),
-            "spectrumHistogram": hist_spectrum_norm.tolist(),
-            "spectrumCumulative": cum_spectrum.tolist()
-        })
-        
-    except Exception as e:
-        print(f"Error processing image: {str(e)}")
-        return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to process image: {str(e)}"}
-        )
+    return await run_operation(request, "fourier", [image], {
+        "center_spectrum": center_spectrum,
+        "apply_log": apply_log
+    })
 
 @router.post("/fourier-filter")
 async def process_fourier_filter(
+    request: Request,
     image: UploadFile = File(...),
     filter_type: str = Form(...),
     gaussian: bool = Form(...),
@@ -855,142 +1390,283 @@ async def process_fourier_filter(
     outer_radius: int = Form(None),
     add_dc: bool = Form(False)
 ):
-    try:
-        # Read image
-        contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-        
-        if img is None:
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid image file"}
-            )
-
-        # Prepare parameters
-        params = {
-            'gaussian': gaussian,
-            'add_dc': add_dc
-        }
-        if filter_type == 'band_pass':
-            params.update({
-                'inner_radius': inner_radius,
-                'outer_radius': outer_radius
-            })
-        else:
-            params['radius'] = radius
-
-        # Apply filter
-        filtered_img, original_spectrum, filtered_spectrum = apply_fourier_filter(
-            img, filter_type, params
-        )
-        
-        # Encode images to base64
-        _, filtered_buf = cv2.imencode('.png', filtered_img)
-        _, orig_spectrum_buf = cv2.imencode('.png', original_spectrum)
-        _, filtered_spectrum_buf = cv2.imencode('.png', filtered_spectrum)
-        
-        return JSONResponse({
-            "filteredImage": f"data:image/png;base64,{base64.b64encode(filtered_buf).decode('utf-8')}",
-            "originalSpectrum": f"data:image/png;base64,{base64.b64encode(orig_spectrum_buf).decode('utf-8')}",
-            "filteredSpectrum": f"data:image/png;base64,{base64.b64encode(filtered_spectrum_buf).decode('utf-8')}"
-        })
-        
-    except Exception as e:
-        print(f"Error processing image: {str(e)}")
-        return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to process image: {str(e)}"}
-        )
+    return await run_operation(request, "fourier-filter", [image], {
+        "filter_type": filter_type,
+        "gaussian": gaussian,
+        "radius": radius,
+        "inner_radius": inner_radius,
+        "outer_radius": outer_radius,
+        "add_dc": add_dc
+    })
 
 @router.post("/pyramids")
 async def process_pyramids(
+    request: Request,
     image: UploadFile = File(...),
     levels: int = Form(...)
 ):
-    try:
-        # Read image
-        contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-        
-        if img is None:
+    """
+    Build the Gaussian and Laplacian pyramids and return every level encoded
+
+    With ?lazy=1 the image is stored instead and the pyramid metadata of
+    GET /images/{image_id}/pyramid is returned, so only the levels the
+    client actually shows are built and encoded.
+    """
+    if request.query_params.get("lazy") in ("1", "true"):
+        contents = await read_upload(image)
+        try:
+            check_pixel_budget(contents)
+        except PixelBudgetExceeded as e:
+            IMAGE_BUDGET.inc(action="rejected")
+            return JSONResponse(status_code=e.status_code, content={"error": str(e)})
+        try:
+            stored = await run_in_pool(store_upload, contents)
+        except EntryTooLarge as e:
+            return JSONResponse(status_code=507, content={"error": f"Image cannot be stored: {str(e)}"})
+        if stored is None:
+            return JSONResponse(status_code=400, content={"error": "Invalid image file"})
+        width, height = stored["width"], stored["height"]
+        if not 1 <= levels <= max_levels(width, height):
             return JSONResponse(
                 status_code=400,
-                content={"error": "Invalid image file"}
-            )
-
-        # Build pyramids
-        gaussian_pyramid = build_gaussian_pyramid(img, levels)
-        laplacian_pyramid, laplacian_display = build_laplacian_pyramid(gaussian_pyramid)
-        reconstructed = reconstruct_from_laplacian(laplacian_pyramid)
-
-        # Encode all images to base64
-        gaussian_images = []
-        laplacian_images = []
-        
-        for g_img in gaussian_pyramid:
-            _, buf = cv2.imencode('.png', g_img)
-            gaussian_images.append(
-                f"data:image/png;base64,{base64.b64encode(buf).decode('utf-8')}"
-            )
-            
-        for l_img in laplacian_display:  # Use display version for frontend
-            _, buf = cv2.imencode('.png', l_img)
-            laplacian_images.append(
-                f"data:image/png;base64,{base64.b64encode(buf).decode('utf-8')}"
+                content={"error": f"levels must be between 1 and {max_levels(width, height)}"}
             )
-            
-        _, reconstructed_buf = cv2.imencode('.png', reconstructed)
-        
-        return JSONResponse({
-            "gaussianPyramid": gaussian_images,
-            "laplacianPyramid": laplacian_images,
-            "reconstructedImage": f"data:image/png;base64,{base64.b64encode(reconstructed_buf).decode('utf-8')}"
-        })
-        
-    except Exception as e:
-        print(f"Error processing image: {str(e)}")
-        return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to process image: {str(e)}"}
-        )
+        return JSONResponse(pyramid_metadata(stored["imageId"], width, height, levels))
+    return await run_operation(request, "pyramids", [image], {"levels": levels})
 
 @router.post("/canny-edge")
 async def process_canny_edge(
+    request: Request,
     image: UploadFile = File(...),
     low_threshold: int = Form(...),
     high_threshold: int = Form(...),
     sigma: float = Form(...)
 ):
+    return await run_operation(request, "canny-edge", [image], {
+        "low_threshold": low_threshold,
+        "high_threshold": high_threshold,
+        "sigma": sigma
+    })
+
+class _ZipSink:
+    """Write-only stream that collects zip output so it can be yielded in chunks"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+# Largest batch entry read into memory, and the largest ratio of a zip
+# member's uncompressed to compressed size; entries above either are
+# reported as failed without being read (zip bomb guard). Decoded sizes are
+# limited by the pixel budget.
+BATCH_ENTRY_MAX_BYTES = int(os.environ.get("BATCH_ENTRY_MAX_BYTES", 256 * 1024 * 1024))
+BATCH_MAX_COMPRESSION_RATIO = float(os.environ.get("BATCH_MAX_COMPRESSION_RATIO", 100))
+
+def entry_too_large(size):
+    return f"Entry is {size} bytes, above the limit of {BATCH_ENTRY_MAX_BYTES} bytes"
+
+def iter_archive_entries(path):
+    """
+    Yield (name, bytes, error) for every file in a zip or tar archive, one at a time
+
+    Oversized or overly compressed members get an error instead of their bytes.
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                if info.file_size > BATCH_ENTRY_MAX_BYTES:
+                    yield info.filename, None, entry_too_large(info.file_size)
+                elif info.file_size > BATCH_MAX_COMPRESSION_RATIO * max(info.compress_size, 1):
+                    yield info.filename, None, "Entry is compressed too much to be an image"
+                else:
+                    # Reads stop at the declared size, whatever the compressed data holds
+                    with archive.open(info) as member:
+                        yield info.filename, member.read(BATCH_ENTRY_MAX_BYTES), None
+    elif tarfile.is_tarfile(path):
+        with tarfile.open(path, "r:*") as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                if member.size > BATCH_ENTRY_MAX_BYTES:
+                    yield member.name, None, entry_too_large(member.size)
+                else:
+                    yield member.name, archive.extractfile(member).read(), None
+    else:
+        raise ValueError("Archive must be a zip or tar file")
+
+def iter_file_entries(files):
+    """Yield (name, bytes, error) for a list of (name, spooled path) uploads"""
+    for name, path in files:
+        size = os.path.getsize(path)
+        if size > BATCH_ENTRY_MAX_BYTES:
+            yield name, None, entry_too_large(size)
+            continue
+        with open(path, "rb") as f:
+            yield name, f.read(), None
+
+def batch_output_name(name):
+    """PNG name of a batch result: the entry's file name without any directories"""
+    # Archives made on Windows separate directories with backslashes
+    base = os.path.basename(name.replace("\\", "/"))
+    base = os.path.splitext(base)[0].lstrip(".")
+    return (base or "image") + ".png"
+
+def unique_name(name, used):
+    """name, or name with a _<n> suffix if it is already in used; adds the result to used"""
+    stem, ext = os.path.splitext(name)
+    candidate, n = name, 1
+    while candidate in used:
+        candidate = f"{stem}_{n}{ext}"
+        n += 1
+    used.add(candidate)
+    return candidate
+
+def batch_entry_cost(operation_name, data, params):
+    """Estimated worker milliseconds of one batch entry, from its image header"""
+    width, height = (read_image_size(data) if data is not None else None) or (0, 0)
+    return estimate_cost(operation_name, width * height, params)
+
+def process_batch_entry(data, operation, params, error=None):
+    """Decode, process and PNG-encode one batch entry; returns (png, error)"""
+    if error is not None:
+        return None, error
     try:
-        # Read image
-        contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-        
+        img = decode_image(data)
         if img is None:
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid image file"}
-            )
-
-        # Apply Canny edge detection
-        edges = apply_canny_edge(img, low_threshold, high_threshold, sigma)
-        
-        # Encode processed image to base64
-        _, processed_img = cv2.imencode('.png', edges)
-        processed_base64 = base64.b64encode(processed_img.tobytes()).decode('utf-8')
-        
-        return JSONResponse({
-            "processedImage": f"data:image/png;base64,{processed_base64}"
-        })
-        
+            return None, "Invalid image file"
+        processed = operation(img, **params)
+        _, buf = cv2.imencode('.png', processed)
+        return buf.tobytes(), None
     except Exception as e:
-        print(f"Error processing image: {str(e)}")
+        return None, str(e)
+
+async def stream_batch(entries, operation_name, params, temp_paths):
+    """
+    Process archive entries on the worker pool and stream a zip of the results.
+
+    At most a small multiple of the pool size is read and in flight at any
+    time, and each finished entry is written out immediately, so memory stays
+    bounded regardless of the number of images. Entries share the admission
+    budget; the response has started, so they wait for it instead of being shed.
+    Output names are reserved and the manifest lists entries in archive order,
+    whatever order they finish in.
+    """
+    operation = image_ops.get_operation(operation_name)
+    max_pending = MAX_WORKERS * 2
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)
+    manifest = []
+    used_names = {"manifest.json"}
+    pending = {}
+    exhausted = False
+    try:
+        while True:
+            # Keep the pool busy while bounding the number of decoded inputs held
+            while not exhausted and len(pending) < max_pending:
+                entry = await run_in_pool(next, entries, None)
+                if entry is None:
+                    exhausted = True
+                    break
+                name, data, error = entry
+                # Entries from different directories may share a file name
+                record = {"source": name, "name": unique_name(batch_output_name(name), used_names), "error": None}
+                manifest.append(record)
+                cost = batch_entry_cost(operation_name, data, params)
+                task = asyncio.ensure_future(run_admitted(
+                    cost, process_batch_entry, data, operation, params, error, shed=False
+                ))
+                pending[task] = record
+            if not pending:
+                break
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                record = pending.pop(task)
+                png, record["error"] = task.result()
+                if png is not None:
+                    archive.writestr(record["name"], png)
+            yield sink.drain()
+
+        archive.writestr("manifest.json", json.dumps({
+            "operation": operation_name,
+            "params": params,
+            "entries": manifest
+        }, indent=2))
+        archive.close()
+        yield sink.drain()
+    finally:
+        for task in pending:
+            task.cancel()
+        entries.close()
+        for path in temp_paths:
+            os.remove(path)
+
+def spool_upload(upload):
+    """Copy an upload to a spill store file that outlives the request"""
+    return spill_store.spool(upload.file)
+
+@router.post("/batch")
+async def process_batch(
+    operation: str = Form(...),
+    params: str = Form("{}"),  # JSON object of operation parameters
+    archive: UploadFile = File(None),  # zip or tar of images
+    images: List[UploadFile] = File(None)  # or several image files
+):
+    """Apply one operation to many images and stream back a zip of PNG results"""
+    try:
+        image_ops.get_operation(operation)
+        params = json.loads(params)
+        if not isinstance(params, dict):
+            raise ValueError("params must be a JSON object")
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+    if archive is None and not images:
         return JSONResponse(
-            status_code=500,
-            content={"error": f"Failed to process image: {str(e)}"}
+            status_code=400,
+            content={"error": "Upload an archive or one or more images"}
         )
 
+    spill_store.start()
+    # Uploads are closed once the handler returns, so spool them to our own files
+    temp_paths = []
+    try:
+        if archive is not None:
+            archive_path = await asyncio.to_thread(spool_upload, archive)
+            temp_paths.append(archive_path)
+            entries = iter_archive_entries(archive_path)
+            # Fail fast on unsupported archives instead of mid-stream
+            if not (zipfile.is_zipfile(archive_path) or tarfile.is_tarfile(archive_path)):
+                raise ValueError("Archive must be a zip or tar file")
+        else:
+            files = []
+            for upload in images:
+                path = await asyncio.to_thread(spool_upload, upload)
+                temp_paths.append(path)
+                files.append((upload.filename or os.path.basename(path), path))
+            entries = iter_file_entries(files)
+    except ValueError as e:
+        for path in temp_paths:
+            os.remove(path)
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+    return StreamingResponse(
+        stream_batch(entries, operation, params, temp_paths),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{operation}_results.zip"'}
+    )
+
 # Add similar endpoints for other operations...
@@ -1,6 +1,5 @@
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 
 def load_and_validate_images(path_a, path_b):
@@ -49,6 +48,7 @@ def find_monotonic_mapping(cum_hist_a, cum_hist_b):
 
 def plot_analysis(img_a, img_b):
     """Plot comprehensive analysis of the two images."""
+    import matplotlib.pyplot as plt
     # Compute histograms
     hist_a, norm_a, cum_a = compute_histograms(img_a)
     hist_b, norm_b, cum_b = compute_histograms(img_b)
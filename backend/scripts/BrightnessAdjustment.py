@@ -1,6 +1,5 @@
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 
 def compute_histograms(image):
@@ -20,6 +19,7 @@ def apply_brightness_adjustment(image, value):
 
 def plot_analysis(image_path, brightness_value):
     """Plot analysis of the image before and after brightness adjustment."""
+    import matplotlib.pyplot as plt
     # Check if file exists
     if not os.path.exists(image_path):
         print(f"Error: File '{image_path}' not found.")
@@ -1,8 +1,9 @@
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 
+from scripts.precision import as_float
+
 def compute_histograms(image):
     """Compute regular and cumulative histograms."""
     hist = cv2.calcHist([image], [0], None, [256], [0, 256]).flatten()
@@ -12,13 +13,14 @@ def compute_histograms(image):
 
 def apply_contrast_stretching(image, factor):
     """Apply contrast stretching around the mean intensity."""
-    f_image = image.astype(float)
+    f_image = as_float(image)
     mean = np.mean(f_image)
     adjusted = mean + factor * (f_image - mean)
     return np.clip(adjusted, 0, 255).astype(np.uint8)
 
 def plot_analysis(image_path, contrast_factor):
     """Plot analysis of the image before and after contrast adjustment."""
+    import matplotlib.pyplot as plt
     # Check if file exists
     if not os.path.exists(image_path):
         print(f"Error: File '{image_path}' not found.")
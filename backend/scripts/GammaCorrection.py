@@ -1,9 +1,9 @@
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 
 def apply_gamma_correction(image_path, gamma):
+    import matplotlib.pyplot as plt
     # Check if file exists
     if not os.path.exists(image_path):
         print(f"Error: File '{image_path}' not found.")
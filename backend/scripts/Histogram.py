@@ -1,9 +1,9 @@
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 
 def plot_histograms(image_path):
+    import matplotlib.pyplot as plt
     # Check if file exists
     if not os.path.exists(image_path):
         print(f"Error: File '{image_path}' not found.")
@@ -1,7 +1,5 @@
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.widgets import Cursor
 import os
 
 def compute_histograms(image):
@@ -17,6 +15,8 @@ def apply_histogram_equalization(image):
 
 def plot_analysis(image_path):
     """Plot analysis of the image before and after equalization."""
+    import matplotlib.pyplot as plt
+    from matplotlib.widgets import Cursor
     # Check if file exists
     if not os.path.exists(image_path):
         print(f"Error: File '{image_path}' not found.")
@@ -1,6 +1,5 @@
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 
 def get_rotation_matrix(angle_degrees, center, size):
@@ -131,6 +130,7 @@ def show_transformation_example():
 
 def plot_result(original, transformed, matrix, title, transformation_info):
     """Plot original image, transformed image, and matrix info."""
+    import matplotlib.pyplot as plt
     fig = plt.figure(figsize=(15, 5))
 
     ax1 = fig.add_subplot(131)
@@ -0,0 +1,243 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from scripts.operations import IMAGE_OPERATIONS, check_params, get_operation
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp'}
+
+def collect_inputs(patterns):
+    """Expand files, directories and glob patterns into a sorted list of image paths"""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for name in sorted(os.listdir(pattern)):
+                path = os.path.join(pattern, name)
+                if os.path.isfile(path) and os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                    paths.append(path)
+        elif os.path.isfile(pattern):
+            paths.append(pattern)
+        else:
+            paths.extend(sorted(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p)))
+    # Keep the first occurrence of each path
+    return list(dict.fromkeys(paths))
+
+def parse_params(items):
+    """Parse KEY=VALUE pairs, decoding values as JSON when possible"""
+    params = {}
+    for item in items:
+        if '=' not in item:
+            raise ValueError(f"Parameter '{item}' must be KEY=VALUE")
+        key, value = item.split('=', 1)
+        try:
+            params[key] = json.loads(value)
+        except json.JSONDecodeError:
+            params[key] = value
+    return params
+
+def input_root(paths):
+    """Deepest directory containing every input"""
+    return os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+
+def default_output_dir(paths, operation):
+    """<operation>_results in the inputs' common directory"""
+    return os.path.join(input_root(paths), f"{operation}_results")
+
+def exclude_directory(paths, directory):
+    """Drop the paths inside directory, so earlier results are not processed again"""
+    directory = os.path.abspath(directory)
+    return [path for path in paths
+            if os.path.commonpath([os.path.abspath(path), directory]) != directory]
+
+def output_paths(paths, operation, output_dir):
+    """
+    Name each result like the interactive tools, <name>_<operation>.png, in
+    output_dir under the input's directory relative to the inputs' common
+    directory, so inputs with the same name in different directories keep
+    separate results. Inputs that differ only in extension get it in the name.
+
+    Returns:
+        Dictionary of input path to output path
+    """
+    root = input_root(paths)
+    outputs = {}
+    for path in paths:
+        subdirectory = os.path.relpath(os.path.dirname(os.path.abspath(path)), root)
+        base = os.path.splitext(os.path.basename(path))[0]
+        outputs[path] = os.path.normpath(os.path.join(output_dir, subdirectory, f"{base}_{operation}.png"))
+    counts = Counter(outputs.values())
+    for path, output in outputs.items():
+        if counts[output] > 1:
+            base, extension = os.path.splitext(os.path.basename(path))
+            outputs[path] = os.path.join(
+                os.path.dirname(output), f"{base}_{extension.lstrip('.')}_{operation}.png"
+            )
+    return outputs
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def process_image(data, operation, params):
+    """
+    Decode, process and PNG-encode one image (runs in a worker process)
+
+    Returns:
+        (encoded PNG bytes or None, pixel count, error message or None)
+    """
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return None, 0, "Could not decode image"
+    try:
+        processed = get_operation(operation)(image, **params)
+        _, buf = cv2.imencode('.png', processed)
+        return buf.tobytes(), image.size, None
+    except Exception as e:
+        return None, image.size, str(e)
+
+def run_batch(paths, operation, params, output_dir=None, workers=None, prefetch=None):
+    """
+    Process images across a process pool with prefetched reads and overlapped writes
+
+    Args:
+        paths: List of input image paths
+        operation: Name of the operation in IMAGE_OPERATIONS
+        params: Dictionary of operation parameters
+        output_dir: Directory for results (default: default_output_dir)
+        workers: Number of worker processes (default: CPU count)
+        prefetch: Maximum number of images read ahead / in flight
+    """
+    workers = workers or os.cpu_count() or 1
+    prefetch = prefetch or workers * 2
+    outputs = output_paths(paths, operation, output_dir or default_output_dir(paths, operation))
+
+    stats = {"processed": 0, "failed": 0, "bytesIn": 0, "bytesOut": 0, "pixels": 0}
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix="reader") as readers, \
+            ThreadPoolExecutor(max_workers=4, thread_name_prefix="writer") as writers, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        remaining = deque(paths)
+        reads = deque()
+        in_flight = deque()
+        writes = deque()
+
+        def collect_writes(wait=False):
+            # A failed write turns a processed image into a failed one
+            while writes and (wait or writes[0][1].done()):
+                path, future, size = writes.popleft()
+                try:
+                    future.result()
+                except OSError as e:
+                    print(f"Error writing {path}: {e}", file=sys.stderr)
+                    stats["processed"] -= 1
+                    stats["bytesOut"] -= size
+                    stats["failed"] += 1
+
+        def fill_reads():
+            # Read ahead so workers never wait on disk
+            while remaining and len(reads) + len(in_flight) < prefetch:
+                path = remaining.popleft()
+                reads.append((path, readers.submit(read_file, path)))
+
+        fill_reads()
+        while reads or in_flight:
+            # Hand finished reads to the process pool
+            while reads and reads[0][1].done():
+                path, future = reads.popleft()
+                try:
+                    data = future.result()
+                except OSError as e:
+                    print(f"Error reading {path}: {e}", file=sys.stderr)
+                    stats["failed"] += 1
+                    continue
+                stats["bytesIn"] += len(data)
+                in_flight.append((path, pool.submit(process_image, data, operation, params)))
+            fill_reads()
+
+            if in_flight and (in_flight[0][1].done() or not reads):
+                # Collect results in submission order and queue the writes
+                path, future = in_flight.popleft()
+                encoded, pixels, error = future.result()
+                stats["pixels"] += pixels
+                if error:
+                    print(f"Error processing {path}: {error}", file=sys.stderr)
+                    stats["failed"] += 1
+                else:
+                    stats["processed"] += 1
+                    stats["bytesOut"] += len(encoded)
+                    output = outputs[path]
+                    writes.append((output, writers.submit(write_file, output, encoded), len(encoded)))
+                collect_writes()
+                fill_reads()
+            elif reads:
+                reads[0][1].result()
+
+        collect_writes(wait=True)
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+def print_stats(stats):
+    seconds = max(stats["seconds"], 1e-9)
+    print("\nBatch complete")
+    print("--------------")
+    print(f"Processed:   {stats['processed']} images ({stats['failed']} failed)")
+    print(f"Elapsed:     {stats['seconds']:.2f} s")
+    print(f"Throughput:  {stats['processed'] / seconds:.1f} images/s, "
+          f"{stats['pixels'] / seconds / 1e6:.1f} Mpx/s")
+    print(f"I/O:         {stats['bytesIn'] / seconds / 1e6:.1f} MB/s read, "
+          f"{stats['bytesOut'] / seconds / 1e6:.1f} MB/s written")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Apply one image operation to many files in parallel.",
+        epilog="Example: python -m scripts.batch_cli median-filter 'images/*.jpg' "
+               "-p kernel_size=5 -o out"
+    )
+    parser.add_argument("operation", choices=sorted(IMAGE_OPERATIONS),
+                        help="operation to apply (same names as the API endpoints)")
+    parser.add_argument("inputs", nargs="+", help="image files, directories or glob patterns")
+    parser.add_argument("-p", "--param", action="append", default=[], metavar="KEY=VALUE",
+                        help="operation parameter, e.g. kernel_size=5 (repeatable)")
+    parser.add_argument("-o", "--output-dir",
+                        help="directory for results (default: <operation>_results next to the inputs)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("--prefetch", type=int, default=None,
+                        help="images read ahead / in flight (default: 2 x workers)")
+    args = parser.parse_args()
+
+    try:
+        params = parse_params(args.param)
+        check_params(args.operation, params)
+    except ValueError as e:
+        parser.error(str(e))
+
+    paths = collect_inputs(args.inputs)
+    output_dir = args.output_dir or (default_output_dir(paths, args.operation) if paths else None)
+    if paths:
+        paths = exclude_directory(paths, output_dir)
+    if not paths:
+        parser.error("No input images found")
+
+    print(f"Applying {args.operation} to {len(paths)} images...")
+    stats = run_batch(paths, args.operation, params, output_dir, args.workers, args.prefetch)
+    print_stats(stats)
+    return 1 if stats["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
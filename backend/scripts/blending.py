@@ -2,6 +2,8 @@ import cv2
 import numpy as np
 import os
 
+from scripts.precision import float_dtype
+
 def build_gaussian_pyramid(img, levels):
     """Build Gaussian pyramid up to specified levels."""
     pyramid = [img.copy()]
@@ -61,7 +63,7 @@ def create_blend_mask(size, blend_type="full", blend_position=0.5):
         blend_position: Position of the blend (0.0-1.0)
     """
     height, width = size
-    mask = np.zeros((height, width), dtype=np.float32)
+    mask = np.zeros((height, width), dtype=float_dtype())
     
     if blend_type == "full":
         # Create gaussian blend mask
@@ -87,8 +89,9 @@ def blend_pyramids(lpyr1, lpyr2, mask_pyr):
     blended_display = []  # New list for display values
     
     for la, lb, mask in zip(lpyr1, lpyr2, mask_pyr):
-        # Blend each level
-        blended = la * mask + lb * (1.0 - mask)
+        # Blend each level in the working precision
+        mask = mask.astype(float_dtype(), copy=False)
+        blended = la * mask + lb * (1 - mask)
         blended_pyr.append(blended)
         
         # Create display version by adding 128 (like we do for other Laplacian levels)
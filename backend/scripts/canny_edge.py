@@ -1,7 +1,8 @@
 import cv2
 import numpy as np
 import os
-import matplotlib.pyplot as plt
+
+from scripts.precision import as_float
 
 def apply_canny_edge(image, low_threshold, high_threshold, sigma):
     """
@@ -14,8 +15,8 @@ def apply_canny_edge(image, low_threshold, high_threshold, sigma):
         sigma: standard deviation for Gaussian blur
     """
     try:
-        # Convert to float for proper processing
-        img_float = image.astype(float)
+        # Convert to float (the configured precision) for proper processing
+        img_float = as_float(image)
         
         # Apply Gaussian blur
         kernel_size = int(2 * round(3 * sigma) + 1)  # Ensure odd kernel size
@@ -33,6 +34,7 @@ def apply_canny_edge(image, low_threshold, high_threshold, sigma):
 
 def plot_analysis(image_path, low_threshold, high_threshold, sigma):
     """Plot analysis of the image before and after edge detection."""
+    import matplotlib.pyplot as plt
     # Check if file exists
     if not os.path.exists(image_path):
         print(f"Error: File '{image_path}' not found.")
@@ -1,8 +1,9 @@
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 
+from scripts.precision import as_float, float_dtype
+
 def apply_fourier_filter(image, filter_type, params):
     """
     Apply frequency domain filtering using Fourier transform.
@@ -17,15 +18,17 @@ def apply_fourier_filter(image, filter_type, params):
             - add_dc: boolean for adding 128 to result
     """
     # Apply FFT
-    f_transform = np.fft.fft2(image)
+    f_transform = np.fft.fft2(as_float(image))
     f_shift = np.fft.fftshift(f_transform)
     
     rows, cols = image.shape
     center_row, center_col = rows // 2, cols // 2
     
     # Create mask based on filter type
-    mask = np.zeros((rows, cols), np.float32)
+    mask = np.zeros((rows, cols), float_dtype())
     y, x = np.ogrid[-center_row:rows-center_row, -center_col:cols-center_col]
+    # Keep the mask in the working precision so the spectrum is not promoted
+    y, x = y.astype(float_dtype()), x.astype(float_dtype())
     distances = np.sqrt(x*x + y*y)
     
     if filter_type == "low_pass":
@@ -72,6 +75,7 @@ def apply_fourier_filter(image, filter_type, params):
     return img_filtered, magnitude_spectrum, filtered_spectrum
 
 def main():
+    import matplotlib.pyplot as plt
     print("\nFourier Domain Filtering Tool")
     print("---------------------------")
     
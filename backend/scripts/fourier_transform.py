@@ -1,8 +1,9 @@
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 
+from scripts.precision import as_float
+
 def apply_fourier_transform(image, center_spectrum=False, apply_log=False):
     """
     Apply Fourier Transform to the image with optional centering and log scaling
@@ -12,8 +13,8 @@ def apply_fourier_transform(image, center_spectrum=False, apply_log=False):
         center_spectrum: Whether to center the spectrum (using fftshift)
         apply_log: Whether to apply log scaling to the magnitude spectrum
     """
-    # Apply 2D FFT
-    f = np.fft.fft2(image)
+    # Apply 2D FFT (complex64 from a float32 input, complex128 from float64)
+    f = np.fft.fft2(as_float(image))
     
     # Center the spectrum if requested
     if center_spectrum:
@@ -37,7 +38,9 @@ def apply_fourier_transform(image, center_spectrum=False, apply_log=False):
     else:
         f_ishift = fshift
     img_back = np.fft.ifft2(f_ishift)
-    img_back = np.abs(img_back)
+    # Round rather than truncate: the reconstruction lands within rounding
+    # error of the input, on either side of each integer
+    img_back = np.clip(np.rint(np.abs(img_back)), 0, 255)
     
     return magnitude_spectrum.astype(np.uint8), img_back.astype(np.uint8)
 
@@ -2,7 +2,9 @@ import cv2
 import numpy as np
 import os
 
-def add_noise(image, noise_type, intensity):
+from scripts.precision import as_float, float_dtype
+
+def add_noise(image, noise_type, intensity, rng=None):
     """
     Add noise to an image
     
@@ -10,22 +12,27 @@ def add_noise(image, noise_type, intensity):
         image: numpy array of the image
         noise_type: 'salt-pepper', 'gaussian', or 'scratch'
         intensity: float for noise intensity/std_dev/num_scratches
+        rng: optional numpy Generator (a fresh one is created if omitted)
     """
+    if rng is None:
+        rng = np.random.default_rng()
+
     if noise_type == "salt-pepper":
         # Add salt and pepper noise
         noise_img = image.copy()
-        # Generate random coordinates for noise
-        rng = np.random.default_rng()
-        coords = rng.random(image.shape) < intensity
-        # Randomly assign white or black
-        noise_img[coords] = rng.choice([0, 255], coords.sum())
+        # One uniform draw per pixel decides both whether it is hit and its value:
+        # below intensity/2 becomes white, between intensity/2 and intensity black
+        draws = rng.random(image.shape)
+        noise_img[draws < intensity] = 0
+        noise_img[draws < intensity / 2] = 255
         return noise_img
         
     elif noise_type == "gaussian":
         # Convert image to float for proper noise addition
-        float_img = image.astype(float)
-        # Generate Gaussian noise with mean=0 and std=intensity
-        noise = np.random.normal(0, intensity, image.shape)
+        float_img = as_float(image)
+        # Generate Gaussian noise with mean=0 and std=intensity, drawn directly
+        # in the working precision
+        noise = rng.standard_normal(image.shape, dtype=float_dtype()) * intensity
         # Add noise to image
         noisy_img = float_img + noise
         # Clip values to valid range and convert back to uint8
@@ -36,7 +43,6 @@ def add_noise(image, noise_type, intensity):
         noise_img = image.copy()
         num_scratches = int(intensity)  # Use intensity directly as number of scratches
         height, width = image.shape
-        rng = np.random.default_rng()
         
         for _ in range(num_scratches):
             # Random start and end points for scratch
@@ -0,0 +1,198 @@
+import cv2
+import numpy as np
+import inspect
+import json
+from scripts.BrightnessAdjustment import apply_brightness_adjustment
+from scripts.HistogramEqualization import apply_histogram_equalization
+from scripts.Transformations import (
+    get_rotation_matrix,
+    get_translation_matrix,
+    get_scaling_matrix,
+    get_shear_matrix,
+    apply_transformation
+)
+from scripts.noise import add_noise
+from scripts.filters import apply_min_filter, apply_max_filter
+from scripts.median_filter import apply_median_filter
+from scripts.mean_filter import apply_mean_filter
+from scripts.convolution_masks import get_default_mask, apply_convolution
+from scripts.bilateral_filter import apply_bilateral_filter
+from scripts.fourier_transform import apply_fourier_transform
+from scripts.fourier_filters import apply_fourier_filter
+from scripts.canny_edge import apply_canny_edge
+from scripts.precision import as_float
+
+# Single-image operations: each takes a grayscale uint8 image plus keyword
+# parameters (named like the router form fields) and returns the processed image.
+# The point operations and filters also accept BGR images and process every
+# channel independently.
+
+def per_channel(fn, image, *args, **params):
+    """Apply a single-channel operation to each channel of a color image"""
+    if image.ndim == 2:
+        return fn(image, *args, **params)
+    return cv2.merge([fn(channel, *args, **params) for channel in cv2.split(image)])
+
+def brightness(image, value):
+    """Shift intensities by value"""
+    return apply_brightness_adjustment(image, value)
+
+def contrast(image, factor):
+    """Stretch intensities to the full range, scaled by factor"""
+    if image.ndim == 3:
+        return per_channel(contrast, image, factor)
+    min_val = float(image.min())
+    max_val = float(image.max())
+    stretched = ((as_float(image) - min_val) * factor) / (max_val - min_val)
+    return np.clip(stretched * 255, 0, 255).astype(np.uint8)
+
+def equalize(image):
+    """Apply histogram equalization"""
+    return per_channel(apply_histogram_equalization, image)
+
+def gamma(image, gamma):
+    """Apply gamma correction"""
+    corrected = np.power(as_float(image) / 255, gamma)
+    return np.clip(corrected * 255, 0, 255).astype(np.uint8)
+
+def get_transform_matrix(image, type, angle=0.0, tx=0.0, ty=0.0, scale_x=1.0, scale_y=1.0,
+                         shear_x=0.0, shear_y=0.0):
+    """Return the 3x3 matrix for a transformation around the image center"""
+    height, width = image.shape[:2]
+    center = (width // 2, height // 2)
+
+    if type == "rotation":
+        return get_rotation_matrix(angle, center, (width, height))
+    elif type == "translation":
+        return get_translation_matrix(tx, ty)
+    elif type == "scaling":
+        return get_scaling_matrix(scale_x, scale_y, center)
+    elif type == "shearing":
+        return get_shear_matrix(shear_x, shear_y, center)
+    raise ValueError("Invalid transformation type")
+
+def transform(image, type, **params):
+    """Apply a rotation, translation, scaling or shearing"""
+    return apply_transformation(image, get_transform_matrix(image, type, **params))
+
+def noise(image, noise_type, intensity):
+    """Add salt-pepper, gaussian or scratch noise"""
+    return add_noise(image, noise_type, float(intensity))
+
+def filter_sequence(image, filter_sequence):
+    """Apply a comma separated sequence of 3x3 min/max filters"""
+    processed = image.copy()
+    for filter_type in filter_sequence.split(','):
+        if filter_type == 'min':
+            processed = apply_min_filter(processed)
+        elif filter_type == 'max':
+            processed = apply_max_filter(processed)
+    return processed
+
+def median(image, kernel_size):
+    """Apply a median filter"""
+    return apply_median_filter(image, kernel_size)
+
+def mean(image, kernel_size):
+    """Apply a mean filter"""
+    return apply_mean_filter(image, kernel_size)
+
+def get_convolution_mask(kernel_size, mask_type, custom_mask=None):
+    """Return the default mask or the parsed custom JSON mask"""
+    # Ensure kernel size is odd
+    if kernel_size % 2 == 0:
+        kernel_size += 1
+
+    if custom_mask:
+        if isinstance(custom_mask, str):
+            custom_mask = json.loads(custom_mask)
+        mask = np.array(custom_mask, dtype=np.float32)
+        if mask.shape != (kernel_size, kernel_size):
+            raise ValueError(f"Mask dimensions must be {kernel_size}x{kernel_size}")
+        return mask
+    return get_default_mask(mask_type, kernel_size)
+
+def convolution(image, kernel_size, mask_type, custom_mask=None, add_128=False):
+    """Apply a default or custom convolution mask"""
+    mask = get_convolution_mask(kernel_size, mask_type, custom_mask)
+    return apply_convolution(image, mask, add_128=add_128)
+
+def bilateral(image, d, sigma_color, sigma_space):
+    """Apply a bilateral filter"""
+    return apply_bilateral_filter(image, d, sigma_color, sigma_space)
+
+def fourier(image, center_spectrum=False, apply_log=False):
+    """Return the magnitude spectrum"""
+    magnitude_spectrum, _ = apply_fourier_transform(image, center_spectrum, apply_log)
+    return magnitude_spectrum
+
+def get_fourier_filter_params(filter_type, gaussian, radius=None, inner_radius=None,
+                              outer_radius=None, add_dc=False):
+    """Build the parameter dictionary expected by apply_fourier_filter"""
+    params = {
+        'gaussian': gaussian,
+        'add_dc': add_dc
+    }
+    if filter_type == 'band_pass':
+        params.update({
+            'inner_radius': inner_radius,
+            'outer_radius': outer_radius
+        })
+    else:
+        params['radius'] = radius
+    return params
+
+def fourier_filter(image, filter_type, **params):
+    """Return the frequency-domain filtered image"""
+    filtered, _, _ = apply_fourier_filter(
+        image, filter_type, get_fourier_filter_params(filter_type, **params)
+    )
+    return filtered
+
+def canny(image, low_threshold, high_threshold, sigma):
+    """Apply Canny edge detection"""
+    return per_channel(apply_canny_edge, image, low_threshold, high_threshold, sigma)
+
+# Registry of single-image operations, keyed by router endpoint name
+IMAGE_OPERATIONS = {
+    "brightness": brightness,
+    "contrast": contrast,
+    "equalize": equalize,
+    "gamma": gamma,
+    "transform": transform,
+    "add-noise": noise,
+    "apply-filter": filter_sequence,
+    "median-filter": median,
+    "mean-filter": mean,
+    "convolution": convolution,
+    "bilateral": bilateral,
+    "fourier": fourier,
+    "fourier-filter": fourier_filter,
+    "canny-edge": canny,
+}
+
+def get_operation(name):
+    """Look up an image operation by name"""
+    if name not in IMAGE_OPERATIONS:
+        raise ValueError(f"Unknown operation '{name}'. Choose from: {', '.join(IMAGE_OPERATIONS)}")
+    return IMAGE_OPERATIONS[name]
+
+def check_params(name, params):
+    """
+    Check parameters against an operation's signature before running it
+
+    Raises:
+        ValueError: If a required parameter is missing or one is unknown
+    """
+    parameters = list(inspect.signature(get_operation(name)).parameters.values())[1:]
+    named = [p for p in parameters if p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY)]
+    missing = [p.name for p in named if p.default is p.empty and p.name not in params]
+    if missing:
+        raise ValueError(f"{name} requires parameter{'s' if len(missing) > 1 else ''} {', '.join(missing)}")
+    if not any(p.kind == p.VAR_KEYWORD for p in parameters):
+        unknown = [key for key in params if key not in {p.name for p in named}]
+        if unknown:
+            raise ValueError(
+                f"{name} does not take {', '.join(unknown)}; "
+                f"its parameters are {', '.join(p.name for p in named) or 'none'}"
+            )
@@ -1,6 +1,5 @@
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 
 def build_gaussian_pyramid(image, levels):
@@ -68,6 +67,7 @@ def reconstruct_from_laplacian(laplacian_pyramid):
     return reconstructed
 
 def main():
+    import matplotlib.pyplot as plt
     print("\nImage Pyramids Tool")
     print("-----------------")
     
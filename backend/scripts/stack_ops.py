@@ -0,0 +1,147 @@
+import cv2
+import numpy as np
+from scripts.noise import add_noise
+from scripts.precision import as_float, float_dtype
+
+# Vectorized variants of the per-image operations for a stack of same-sized
+# grayscale images with shape (N, H, W). Each function returns exactly what
+# calling its per-image counterpart on every image in turn would return.
+# Point operations collapse to a single 256-entry LUT gather and noise and
+# FFTs are computed over the whole stack at once; where an OpenCV kernel per
+# slice is faster than any NumPy formulation it is used instead.
+
+def stack_images(images):
+    """Stack a list of same-sized 2-D images into an (N, H, W) array"""
+    shapes = {img.shape for img in images}
+    if len(shapes) != 1:
+        raise ValueError(f"All images must have the same size, got {sorted(shapes)}")
+    return np.stack(images)
+
+def _apply_lut(stack, lut):
+    """Map every pixel of the stack through a 256 entry lookup table"""
+    return lut[stack]
+
+def brightness_lut(value):
+    """Lookup table equivalent to apply_brightness_adjustment"""
+    return np.clip(np.arange(256, dtype=np.int16) + value, 0, 255).astype(np.uint8)
+
+def gamma_lut(gamma):
+    """Lookup table equivalent to gamma correction (as in the /gamma endpoint)"""
+    return np.clip(np.power(as_float(np.arange(256)) / 255, gamma) * 255, 0, 255).astype(np.uint8)
+
+def brightness_stack(stack, value):
+    """Stacked apply_brightness_adjustment"""
+    return _apply_lut(stack, brightness_lut(value))
+
+def gamma_stack(stack, gamma):
+    """Stacked gamma correction (as in the /gamma endpoint)"""
+    return _apply_lut(stack, gamma_lut(gamma))
+
+def contrast_stack(stack, factor):
+    """Stacked min-max contrast stretching (as in the /contrast endpoint)"""
+    # Per-image extrema, in the working precision like the per-image path
+    min_val = stack.min(axis=(1, 2), keepdims=True).astype(float_dtype())
+    max_val = stack.max(axis=(1, 2), keepdims=True).astype(float_dtype())
+    stretched = ((as_float(stack) - min_val) * factor) / (max_val - min_val)
+    return np.clip(stretched * 255, 0, 255).astype(np.uint8)
+
+def histograms_stack(stack):
+    """
+    Compute per-image histograms for the stack.
+
+    Counting uses cv2.calcHist per slice, which measured several times faster
+    than a single np.bincount over offset intensities; normalization and the
+    cumulative sums are then done for all images at once.
+
+    Returns:
+        (N, 256) float32 histograms and (N, 256) cumulative histograms scaled
+        to each histogram's peak, matching compute_histograms in the router
+    """
+    hist = np.stack([
+        cv2.calcHist([img], [0], None, [256], [0, 256]).ravel() for img in stack
+    ])
+    hist_norm = hist / hist.sum(axis=1, keepdims=True)
+    cum = hist_norm.cumsum(axis=1) * hist.max(axis=1, keepdims=True)
+    return hist, cum
+
+def equalize_stack(stack):
+    """Stacked cv2.equalizeHist (OpenCV's LUT kernel beats a NumPy LUT gather here)"""
+    out = np.empty_like(stack)
+    for i, img in enumerate(stack):
+        cv2.equalizeHist(img, dst=out[i])
+    return out
+
+# Complex temporaries for the whole stack quickly fall out of cache, which
+# measured slower than per-image FFTs; working in blocks of this many pixels
+# keeps each FFT pass cache-resident
+FFT_BLOCK_PIXELS = 1 << 18
+
+def fourier_transform_stack(stack, center_spectrum=False, apply_log=False):
+    """
+    Stacked apply_fourier_transform: FFTs over the last two axes, in blocks
+
+    Returns:
+        (N, H, W) uint8 magnitude spectra and reconstructed images
+    """
+    magnitude_out = np.empty(stack.shape, dtype=np.uint8)
+    recon_out = np.empty(stack.shape, dtype=np.uint8)
+    block = max(1, FFT_BLOCK_PIXELS // (stack.shape[1] * stack.shape[2]))
+
+    for start in range(0, stack.shape[0], block):
+        part = stack[start:start + block]
+        f = np.fft.fft2(as_float(part), axes=(-2, -1))
+        fshift = np.fft.fftshift(f, axes=(-2, -1)) if center_spectrum else f
+
+        magnitude = np.abs(fshift)
+        if apply_log:
+            magnitude = np.log1p(magnitude)
+
+        # Normalize each spectrum for display; cv2.normalize is cheap next to
+        # the FFT and keeps the rounding bit-identical to the per-image path
+        for i, spectrum in enumerate(magnitude):
+            magnitude_out[start + i] = cv2.normalize(spectrum, None, 0, 255, cv2.NORM_MINMAX)
+
+        f_ishift = np.fft.ifftshift(fshift, axes=(-2, -1)) if center_spectrum else fshift
+        recon = np.abs(np.fft.ifft2(f_ishift, axes=(-2, -1)))
+        recon_out[start:start + block] = np.clip(np.rint(recon), 0, 255)
+
+    return magnitude_out, recon_out
+
+def add_noise_stack(stack, noise_type, intensity, rng=None):
+    """
+    Stacked add_noise.
+
+    Salt-pepper and gaussian noise draw the random numbers for the whole stack
+    in one call; since the generator produces the same stream either way, the
+    result equals calling add_noise on each image in order with the same rng.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    if noise_type == "salt-pepper":
+        noisy = stack.copy()
+        draws = rng.random(stack.shape)
+        noisy[draws < intensity] = 0
+        noisy[draws < intensity / 2] = 255
+        return noisy
+
+    elif noise_type == "gaussian":
+        noisy = as_float(stack) + rng.standard_normal(stack.shape, dtype=float_dtype()) * intensity
+        return np.clip(noisy, 0, 255).astype(np.uint8)
+
+    elif noise_type == "scratch":
+        # Scratches are drawn line by line with cv2, so there is nothing to vectorize
+        return np.stack([add_noise(img, noise_type, intensity, rng) for img in stack])
+
+    raise ValueError("Invalid noise type. Must be 'salt-pepper', 'gaussian', or 'scratch'")
+
+# Stacked counterparts of scripts.operations, keyed by endpoint name
+STACK_OPERATIONS = {
+    "brightness": brightness_stack,
+    "contrast": contrast_stack,
+    "equalize": equalize_stack,
+    "gamma": gamma_stack,
+    "add-noise": add_noise_stack,
+    "fourier": lambda stack, center_spectrum=False, apply_log=False:
+        fourier_transform_stack(stack, center_spectrum, apply_log)[0],
+}
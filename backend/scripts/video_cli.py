@@ -0,0 +1,287 @@
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from scripts.batch_cli import IMAGE_EXTENSIONS, collect_inputs, parse_params
+from scripts.operations import IMAGE_OPERATIONS, check_params, get_operation, per_channel
+from scripts.stack_ops import brightness_lut, gamma_lut
+from utils.color import LuminancePlanes
+
+# Point operations applied to frames through one cv2.LUT call; the table is
+# built once per run instead of redoing the arithmetic on every frame
+POINT_LUTS = {
+    "brightness": brightness_lut,
+    "gamma": gamma_lut,
+}
+
+# Operations whose output is a new image (edges, a spectrum) rather than an
+# adjusted frame; with --color luma it is written as is instead of recombined
+REPLACES_FRAME = {"canny-edge", "fourier"}
+
+VIDEO_CODECS = {
+    ".avi": "MJPG",
+    ".mp4": "mp4v",
+    ".m4v": "mp4v",
+    ".mov": "mp4v",
+    ".mkv": "mp4v",
+}
+
+_DONE = object()
+
+def iter_frames(source):
+    """Yield the frames of a video file, or the images of a sequence in order"""
+    if isinstance(source, list):
+        for path in source:
+            frame = cv2.imread(path, cv2.IMREAD_COLOR)
+            if frame is None:
+                raise ValueError(f"Could not read frame {path}")
+            yield frame
+        return
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video {source}")
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield frame
+    finally:
+        capture.release()
+
+def read_ahead(frames, max_queued):
+    """
+    Run a frame generator on a reader thread, buffering at most max_queued frames
+
+    The bounded queue is the backpressure: decoding stops while the workers
+    are behind, so memory stays flat however long the input is.
+    """
+    buffer = queue.Queue(maxsize=max_queued)
+    stop = threading.Event()
+
+    def put(item):
+        # Give up when the consumer has stopped, instead of blocking forever
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def reader():
+        try:
+            for frame in frames:
+                if not put(frame):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(e)
+
+    thread = threading.Thread(target=reader, name="frame-reader", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+def process_in_order(frames, fn, executor, max_pending):
+    """Map fn over frames on the executor, yielding results in input order"""
+    pending = deque()
+    for frame in frames:
+        pending.append(executor.submit(fn, frame))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def frame_operation(operation, params, color="gray"):
+    """
+    Build the per-frame function for an operation
+
+    Args:
+        operation: Name of the operation in IMAGE_OPERATIONS
+        params: Dictionary of operation parameters
+        color: "gray" converts frames to grayscale, "luma" processes the
+            YCrCb luminance and keeps the chroma, "channels" processes every
+            BGR channel
+    """
+    if operation in POINT_LUTS:
+        lut = POINT_LUTS[operation](**params)
+
+        def apply(image):
+            # cv2.LUT maps every channel, so no per-channel split is needed
+            return cv2.LUT(image, lut)
+    else:
+        fn = get_operation(operation)
+
+        def apply(image):
+            return fn(image, **params)
+
+    if color == "gray":
+        return lambda frame: apply(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    if color == "channels":
+        return apply if operation in POINT_LUTS else lambda frame: per_channel(apply, frame)
+    if operation in REPLACES_FRAME:
+        return lambda frame: apply(LuminancePlanes(frame, "luma").luma)
+
+    def apply_luma(frame):
+        planes = LuminancePlanes(frame, "luma")
+        return planes.merge(apply(planes.luma))
+    return apply_luma
+
+class FrameWriter:
+    """Write frames to a video file, or as numbered PNGs when output is a directory"""
+
+    def __init__(self, output, fps):
+        self.output = output
+        self.fps = fps
+        self.frames = 0
+        self._video = None
+        self._is_sequence = os.path.splitext(output)[1].lower() not in VIDEO_CODECS
+        if self._is_sequence:
+            os.makedirs(output, exist_ok=True)
+
+    def write(self, frame):
+        if self._is_sequence:
+            cv2.imwrite(os.path.join(self.output, f"frame_{self.frames:06d}.png"), frame)
+        else:
+            if self._video is None:
+                # Size and channel count are only known from the first frame
+                codec = VIDEO_CODECS[os.path.splitext(self.output)[1].lower()]
+                height, width = frame.shape[:2]
+                self._video = cv2.VideoWriter(
+                    self.output, cv2.VideoWriter_fourcc(*codec), self.fps, (width, height),
+                    isColor=frame.ndim == 3
+                )
+                if not self._video.isOpened():
+                    raise ValueError(f"Could not open {self.output} for writing")
+            self._video.write(frame)
+        self.frames += 1
+
+    def close(self):
+        if self._video is not None:
+            self._video.release()
+
+def source_fps(source, default=25.0):
+    """Frame rate of a video file (default for image sequences or unknown rates)"""
+    if isinstance(source, list):
+        return default
+    capture = cv2.VideoCapture(source)
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    capture.release()
+    return fps if fps and fps > 0 else default
+
+def run_pipeline(source, output, operation, params, color="gray", workers=None, queue_size=None, fps=None):
+    """
+    Stream frames from source through an operation into output
+
+    Frames are decoded on a reader thread, processed on a thread pool (the
+    OpenCV kernels release the GIL) and written in their original order.
+    At most queue_size frames are buffered after decoding and 2 x workers
+    are in flight, so memory does not grow with the length of the input.
+
+    Args:
+        source: Video file path, or a list of image paths for a sequence
+        output: Video file path (.mp4, .avi, ...) or a directory for PNG frames
+        operation: Name of the operation in IMAGE_OPERATIONS
+        params: Dictionary of operation parameters
+        color: "gray", "luma" or "channels" (see frame_operation)
+        workers: Number of frame worker threads (default: CPU count)
+        queue_size: Decoded frames buffered ahead of the workers (default: 2 x workers)
+        fps: Output frame rate (default: the source's)
+    """
+    workers = workers or os.cpu_count() or 1
+    queue_size = queue_size or workers * 2
+    fn = frame_operation(operation, params, color)
+    fps = fps or source_fps(source)
+
+    writer = FrameWriter(output, fps)
+    stats = {"frames": 0, "pixels": 0, "sourceFps": fps}
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frame-worker") as executor:
+            frames = read_ahead(iter_frames(source), queue_size)
+            for processed in process_in_order(frames, fn, executor, workers * 2):
+                writer.write(processed)
+                stats["frames"] += 1
+                stats["pixels"] += processed.shape[0] * processed.shape[1]
+    finally:
+        writer.close()
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+def print_stats(stats):
+    seconds = max(stats["seconds"], 1e-9)
+    fps = stats["frames"] / seconds
+    print("\nVideo complete")
+    print("--------------")
+    print(f"Frames:      {stats['frames']}")
+    print(f"Elapsed:     {stats['seconds']:.2f} s")
+    print(f"Throughput:  {fps:.1f} frames/s ({fps / stats['sourceFps']:.2f}x real time), "
+          f"{stats['pixels'] / seconds / 1e6:.1f} Mpx/s")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Apply one image operation to every frame of a video or image sequence.",
+        epilog="Example: python -m scripts.video_cli canny-edge input.mp4 edges.mp4 "
+               "-p low_threshold=50 -p high_threshold=150 -p sigma=1"
+    )
+    parser.add_argument("operation", choices=sorted(IMAGE_OPERATIONS),
+                        help="operation to apply (same names as the API endpoints)")
+    parser.add_argument("input", nargs="+",
+                        help="video file, or image files / directories / glob patterns of a sequence")
+    parser.add_argument("output", help="output video file (.mp4, .avi, ...) or directory for PNG frames")
+    parser.add_argument("-p", "--param", action="append", default=[], metavar="KEY=VALUE",
+                        help="operation parameter, e.g. kernel_size=5 (repeatable)")
+    parser.add_argument("--color", choices=["gray", "luma", "channels"], default="gray",
+                        help="process grayscale frames, the luminance only, or every color channel")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="number of frame worker threads (default: CPU count)")
+    parser.add_argument("--queue", type=int, default=None,
+                        help="decoded frames buffered ahead of the workers (default: 2 x workers)")
+    parser.add_argument("--fps", type=float, default=None, help="output frame rate (default: the source's)")
+    args = parser.parse_args()
+
+    try:
+        params = parse_params(args.param)
+        check_params(args.operation, params)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # One non-image file is a video; anything else is a frame sequence
+    if len(args.input) == 1 and os.path.isfile(args.input[0]) \
+            and os.path.splitext(args.input[0])[1].lower() not in IMAGE_EXTENSIONS:
+        source = args.input[0]
+    else:
+        source = collect_inputs(args.input)
+        if not source:
+            parser.error("No input frames found")
+
+    print(f"Applying {args.operation} to {source if isinstance(source, str) else f'{len(source)} frames'}...")
+    try:
+        stats = run_pipeline(source, args.output, args.operation, params, args.color,
+                             args.workers, args.queue, args.fps)
+    except (ValueError, TypeError, cv2.error) as e:
+        # Parameter values of the wrong type only fail on the first frame
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print_stats(stats)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
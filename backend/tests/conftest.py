@@ -0,0 +1,39 @@
+import os
+import sys
+import tempfile
+
+# Keep the shared store of the tests apart from a running server's; set
+# before any module creates the store
+os.environ.setdefault("SHARED_STORE_DIR", tempfile.mkdtemp(prefix="image-processing-tests-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+import pytest  # noqa: E402
+
+@pytest.fixture(scope="session")
+def photo():
+    """Photo-like 320x240 grayscale image: smooth shading, hard-edged blobs and a little noise"""
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (8, 10), dtype=np.uint8)
+    image = cv2.resize(small, (320, 240), interpolation=cv2.INTER_CUBIC)
+    for _ in range(8):
+        center = (int(rng.integers(0, 320)), int(rng.integers(0, 240)))
+        cv2.circle(image, center, int(rng.integers(12, 50)), int(rng.integers(0, 256)), -1)
+    return np.clip(image + rng.normal(0, 6, image.shape), 0, 255).astype(np.uint8)
+
+@pytest.fixture(scope="session")
+def png(photo):
+    """The photo encoded as PNG"""
+    return cv2.imencode(".png", photo)[1].tobytes()
+
+@pytest.fixture(scope="session")
+def client():
+    """Test client of an app serving the image router"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from routers.image_processing import router
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as test_client:
+        yield test_client
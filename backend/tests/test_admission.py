@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from utils.admission import AdmissionController, Overloaded, estimate_cost
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_estimate_cost_scales_with_pixels_kernel_and_color():
+    small = estimate_cost("median-filter", 1_000_000, {"kernel_size": 3})
+    assert estimate_cost("median-filter", 4_000_000, {"kernel_size": 3}) == pytest.approx(4 * small)
+    assert estimate_cost("median-filter", 1_000_000, {"kernel_size": 15}) > small
+    assert estimate_cost("median-filter", 1_000_000, {"kernel_size": 3}, "channels") == pytest.approx(3 * small)
+    # Parameters of the wrong type fall back to the defaults
+    assert estimate_cost("median-filter", 1_000_000, {"kernel_size": "x"}) == small
+
+def test_admits_anything_when_idle():
+    async def scenario():
+        controller = AdmissionController(workers=1, worker_budget=100)
+        ticket = await controller.acquire(10_000)
+        assert controller.stats()["inFlightMs"] == 100
+        controller.release(ticket)
+        assert controller.stats()["inFlightMs"] == 0
+    run(scenario())
+
+def test_waits_for_budget_then_admits():
+    async def scenario():
+        controller = AdmissionController(workers=1, worker_budget=100, interactive_max=1000)
+        first = await controller.acquire(80)
+        waiter = asyncio.ensure_future(controller.acquire(50, shed=False))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        assert controller.stats()["waiting"] == 1
+        controller.release(first)
+        second = await asyncio.wait_for(waiter, 1)
+        controller.release(second)
+        assert controller.stats()["queued"] == 1
+    run(scenario())
+
+def test_sheds_when_the_wait_is_too_long():
+    async def scenario():
+        controller = AdmissionController(workers=1, worker_budget=100, max_wait=0.05)
+        held = await controller.acquire(100)
+        with pytest.raises(Overloaded) as error:
+            await controller.acquire(100)
+        assert error.value.retry_after >= 1
+        assert controller.stats()["shed"] == 1
+        assert controller.stats()["waiting"] == 0
+        # Background work waits instead of being shed
+        waiter = asyncio.ensure_future(controller.acquire(100, shed=False))
+        await asyncio.sleep(0.1)
+        assert not waiter.done()
+        controller.release(held)
+        controller.release(await asyncio.wait_for(waiter, 1))
+    run(scenario())
+
+def test_interactive_overtakes_queued_heavy():
+    async def scenario():
+        controller = AdmissionController(workers=1, worker_budget=1000, interactive_max=250)
+        held = await controller.acquire(1000)
+        order = []
+
+        async def request(name, cost):
+            ticket = await controller.acquire(cost, shed=False)
+            order.append(name)
+            return ticket
+
+        heavy = asyncio.ensure_future(request("heavy", 900))
+        await asyncio.sleep(0)
+        cheap = asyncio.ensure_future(request("cheap", 50))
+        await asyncio.sleep(0)
+        controller.release(held)
+        tickets = await asyncio.wait_for(asyncio.gather(cheap, heavy), 1)
+        assert order[0] == "cheap"
+        for ticket in tickets:
+            controller.release(ticket)
+    run(scenario())
+
+def test_heavy_requests_limited_to_their_share():
+    async def scenario():
+        controller = AdmissionController(workers=2, worker_budget=1000, interactive_max=250, heavy_share=0.5)
+        first = await controller.acquire(1000)
+        second = asyncio.ensure_future(controller.acquire(1000, shed=False))
+        await asyncio.sleep(0)
+        assert not second.done()
+        # Interactive requests still fit next to the heavy one
+        cheap = await asyncio.wait_for(controller.acquire(100), 1)
+        controller.release(cheap)
+        controller.release(first)
+        controller.release(await asyncio.wait_for(second, 1))
+    run(scenario())
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def scenario():
+        controller = AdmissionController(workers=1, worker_budget=100)
+        held = await controller.acquire(100)
+        waiter = asyncio.ensure_future(controller.acquire(100, shed=False))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        controller.release(held)
+        assert controller.stats()["waiting"] == 0
+        assert controller.stats()["inFlightMs"] == 0
+    run(scenario())
+
+@pytest.fixture()
+def overloaded(monkeypatch):
+    from utils.admission import admission
+
+    async def acquire(cost, shed=True):
+        raise Overloaded(3)
+    monkeypatch.setattr(admission, "acquire", acquire)
+
+def test_endpoint_sheds_with_503(client, png, overloaded):
+    response = client.post("/image/median-filter", data={"kernel_size": 13}, files={"image": ("a.png", png)})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+
+def test_profiled_requests_are_admitted(client, png, overloaded, monkeypatch):
+    from utils import profiling
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    response = client.post("/image/median-filter", data={"kernel_size": 3}, files={"image": ("a.png", png)},
+                           headers={"X-Profile": "secret"})
+    assert response.status_code == 503
+
+def test_cold_pyramid_levels_are_admitted(client, png, overloaded):
+    image_id = client.post("/image/images", files={"image": ("a.png", png)}).json()["imageId"]
+    response = client.get(f"/image/images/{image_id}/pyramid/laplacian/2")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+
+def test_batch_entries_are_admitted(client, png):
+    import io
+    import zipfile
+    from utils.admission import admission
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name in ("a.png", "b.png", "c.png"):
+            archive.writestr(name, png)
+    admitted = sum(admission.stats()["admitted"].values())
+    response = client.post("/image/batch", data={"operation": "gamma", "params": '{"gamma": 0.9}'},
+                           files={"archive": ("images.zip", buffer.getvalue())})
+    assert response.status_code == 200
+    assert sum(admission.stats()["admitted"].values()) == admitted + 3
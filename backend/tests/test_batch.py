@@ -0,0 +1,39 @@
+import io
+import json
+import time
+import zipfile
+
+import cv2
+import numpy as np
+
+def post_batch(client, entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+    response = client.post("/image/batch", data={"operation": "brightness", "params": '{"value": 10}'},
+                           files={"archive": ("images.zip", buffer.getvalue())})
+    assert response.status_code == 200
+    return zipfile.ZipFile(io.BytesIO(response.content))
+
+def test_results_and_manifest_follow_archive_order(client, png, photo, monkeypatch):
+    import routers.image_processing as image_processing
+    process = image_processing.process_batch_entry
+    flipped = cv2.imencode(".png", photo[:, ::-1])[1].tobytes()
+
+    def slow_first(data, *args):
+        # The first entry finishes last
+        if data == png:
+            time.sleep(0.2)
+        return process(data, *args)
+
+    monkeypatch.setattr(image_processing, "process_batch_entry", slow_first)
+    results = post_batch(client, [("x/a.png", png), ("y/a.jpg", flipped), ("bad.png", b"not an image" * 10)])
+    manifest = json.loads(results.read("manifest.json"))["entries"]
+    assert [(entry["source"], entry["name"]) for entry in manifest] == [
+        ("x/a.png", "a.png"), ("y/a.jpg", "a_1.png"), ("bad.png", "bad.png")
+    ]
+    assert manifest[0]["error"] is None and manifest[2]["error"]
+    first = cv2.imdecode(np.frombuffer(results.read("a.png"), np.uint8), cv2.IMREAD_GRAYSCALE)
+    np.testing.assert_array_equal(first, cv2.add(photo, 10))
+    assert "bad.png" not in results.namelist()
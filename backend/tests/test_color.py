@@ -0,0 +1,70 @@
+import base64
+
+import cv2
+import numpy as np
+import pytest
+
+from scripts import operations as image_ops
+from utils.color import LuminancePlanes, luminance
+
+@pytest.fixture(scope="module")
+def bgr(photo):
+    # Chroma that varies independently of the luminance
+    return cv2.merge([photo, np.ascontiguousarray(photo[::-1]), np.ascontiguousarray(photo[:, ::-1])])
+
+@pytest.fixture(scope="module")
+def bgr_png(bgr):
+    return cv2.imencode(".png", bgr)[1].tobytes()
+
+def decode(data_url):
+    data = base64.b64decode(data_url.split(",", 1)[1])
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+
+@pytest.mark.parametrize("mode, space", [("luma", cv2.COLOR_BGR2YCrCb), ("lab", cv2.COLOR_BGR2Lab)])
+def test_luminance_planes_replace_only_the_luminance(bgr, mode, space):
+    planes = LuminancePlanes(bgr, mode)
+    np.testing.assert_array_equal(planes.luma, cv2.cvtColor(bgr, space)[:, :, 0])
+    # Converting back to BGR rounds; 8-bit Lab also loses saturated colors
+    assert np.abs(planes.merge(planes.luma).astype(int) - bgr).mean() < 1
+    luma = (planes.luma // 2 + 64).astype(np.uint8)
+    merged = planes.merge(luma)
+    # Pixels whose new color left the BGR gamut are clipped; the rest keep the new luminance
+    inside = ((merged > 0) & (merged < 255)).all(axis=2)
+    assert np.abs(cv2.cvtColor(merged, space)[:, :, 0].astype(int) - luma)[inside].max() <= 3
+
+def test_luminance_of_gray_is_the_image(photo, bgr):
+    assert luminance(photo) is photo
+    np.testing.assert_array_equal(luminance(bgr), cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY))
+
+@pytest.mark.parametrize("operation, params", [
+    ("brightness", {"value": 30}),
+    ("gamma", {"gamma": 0.5}),
+    ("median", {"kernel_size": 5}),
+])
+def test_color_operations_process_every_channel(bgr, operation, params):
+    fn = getattr(image_ops, operation)
+    expected = cv2.merge([fn(np.ascontiguousarray(channel), **params) for channel in cv2.split(bgr)])
+    np.testing.assert_array_equal(fn(bgr, **params), expected)
+
+def test_channels_mode_matches_per_channel_processing(client, bgr, bgr_png):
+    response = client.post("/image/gamma?color=channels", data={"gamma": 0.5}, files={"image": ("a.png", bgr_png)})
+    assert response.status_code == 200
+    np.testing.assert_array_equal(decode(response.json()["processedImage"]), image_ops.gamma(bgr, 0.5))
+
+def test_luma_mode_keeps_the_chroma(client, bgr, bgr_png):
+    response = client.post("/image/gamma?color=luma", data={"gamma": 0.5}, files={"image": ("a.png", bgr_png)})
+    assert response.status_code == 200
+    processed = decode(response.json()["processedImage"])
+    assert processed.shape == bgr.shape
+    expected = LuminancePlanes(bgr, "luma")
+    expected = expected.merge(image_ops.gamma(expected.luma, 0.5))
+    np.testing.assert_array_equal(processed, expected)
+
+def test_gray_mode_decodes_to_grayscale(client, bgr_png):
+    response = client.post("/image/gamma", data={"gamma": 0.5}, files={"image": ("a.png", bgr_png)})
+    assert decode(response.json()["processedImage"]).ndim == 2
+
+@pytest.mark.parametrize("path, query", [("fourier", "color=luma"), ("gamma", "color=hsv")])
+def test_unsupported_color_requests_rejected(client, bgr_png, path, query):
+    response = client.post(f"/image/{path}?{query}", data={"gamma": 0.5}, files={"image": ("a.png", bgr_png)})
+    assert response.status_code == 400
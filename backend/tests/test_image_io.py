@@ -0,0 +1,46 @@
+import io
+
+import pytest
+from PIL import Image
+
+from utils.image_io import (
+    PixelBudgetExceeded, UnreadableImageSize, check_pixel_budget, decode_image_bytes, read_image_size
+)
+
+def encode(photo, format):
+    buffer = io.BytesIO()
+    Image.fromarray(photo).save(buffer, format=format)
+    return buffer.getvalue()
+
+@pytest.mark.parametrize("format", ["PNG", "JPEG", "GIF", "BMP", "TIFF", "WEBP"])
+def test_size_is_read_from_header(photo, format):
+    assert tuple(read_image_size(encode(photo, format))) == (320, 240)
+
+def test_budget_rejects_large_images(png):
+    check_pixel_budget(png, max_pixels=320 * 240)
+    with pytest.raises(PixelBudgetExceeded, match="320x240"):
+        check_pixel_budget(png, max_pixels=320 * 240 - 1)
+
+def test_decompression_bomb_is_over_budget(photo, monkeypatch):
+    tiff = encode(photo, "TIFF")
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+    assert read_image_size(tiff) is None
+    with pytest.raises(PixelBudgetExceeded) as raised:
+        check_pixel_budget(tiff, max_pixels=10 ** 9)
+    assert raised.value.status_code == 413
+    with pytest.raises(PixelBudgetExceeded):
+        decode_image_bytes(tiff, max_pixels=10 ** 9)
+
+def test_unreadable_size_is_refused():
+    with pytest.raises(UnreadableImageSize) as raised:
+        check_pixel_budget(b"not an image" * 10)
+    assert raised.value.status_code == 400
+
+def test_upload_fails_closed(client, photo, monkeypatch):
+    def upload(data):
+        return client.post("/image/images", files={"image": ("a.tif", data, "image/tiff")})
+
+    tiff = encode(photo, "TIFF")
+    assert upload(b"not an image" * 10).status_code == 400
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+    assert upload(tiff).status_code == 413
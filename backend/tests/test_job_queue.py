@@ -0,0 +1,173 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi.responses import JSONResponse
+
+from utils.job_queue import JobQueue, JobQueueFull, StoredJob
+from utils.metrics import current_timer
+from utils.shared_store import SharedStore
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def finish(queue, *jobs):
+    for job in jobs:
+        while not job.done:
+            await job.wait(job.version, 1)
+    await queue.stop()
+
+def test_runs_jobs_by_priority():
+    async def scenario():
+        queue = JobQueue(workers=1)
+        started = []
+
+        def work(name):
+            async def fn():
+                started.append(name)
+                return b"{}"
+            return fn
+
+        jobs = [queue.submit("test", work(name), priority) for name, priority in [("a", 0), ("b", 0), ("c", 5)]]
+        # Nothing has run yet: "c" and "a" start before "b"
+        assert [queue.position(job) for job in jobs] == [1, 2, 0]
+        await finish(queue, *jobs)
+        assert started == ["c", "a", "b"]
+    run(scenario())
+
+def test_rejects_jobs_beyond_the_limit():
+    async def scenario():
+        queue = JobQueue(workers=1, max_jobs=2)
+        release = asyncio.Event()
+
+        async def fn():
+            await release.wait()
+            return b"{}"
+
+        jobs = [queue.submit("test", fn), queue.submit("test", fn)]
+        with pytest.raises(JobQueueFull):
+            queue.submit("test", fn)
+        release.set()
+        await finish(queue, *jobs)
+        assert queue.stats()["completed"] == 2
+    run(scenario())
+
+def test_error_responses_fail_the_job():
+    async def scenario():
+        queue = JobQueue(workers=1)
+
+        async def fn():
+            return JSONResponse(status_code=400, content={"error": "bad parameter"})
+
+        job = queue.submit("test", fn)
+        await finish(queue, job)
+        assert job.status == "failed" and job.error == "bad parameter" and job.status_code == 400
+    run(scenario())
+
+def test_expired_jobs_are_forgotten():
+    async def scenario():
+        queue = JobQueue(workers=1, ttl=0)
+
+        async def fn():
+            return b"{}"
+
+        job = queue.submit("test", fn)
+        await finish(queue, job)
+        await asyncio.sleep(0.01)
+        assert queue.get(job.id) is None
+        assert queue.stats()["expired"] == 1
+    run(scenario())
+
+def test_job_result_matches_the_endpoint(client, png):
+    params = {"d": 9, "sigma_color": 75, "sigma_space": 75}
+    expected = client.post("/image/median-filter", data={"kernel_size": 5}, files={"image": ("a.png", png)}).content
+    response = client.post("/image/jobs/median-filter", data={"params": json.dumps({"kernel_size": 5})},
+                           files={"images": ("a.png", png)})
+    assert response.status_code == 202
+    status_url = response.headers["Location"]
+    deadline = time.monotonic() + 10
+    while client.get(status_url).json()["status"] not in ("done", "failed"):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert client.get(response.json()["resultUrl"]).content == expected
+    assert client.post("/image/jobs/nope", files={"images": ("a.png", png)}).status_code == 404
+    assert client.post("/image/jobs/bilateral", data={"params": json.dumps(params)}).status_code == 400
+    assert client.get("/image/jobs/" + "0" * 32).status_code == 404
+
+def test_caps_the_bytes_held_by_pending_jobs():
+    async def scenario():
+        queue = JobQueue(workers=1, max_bytes=100)
+        release = asyncio.Event()
+
+        async def fn():
+            await release.wait()
+            return b"{}"
+
+        job = queue.submit("test", fn, size=80)
+        with pytest.raises(JobQueueFull):
+            queue.submit("test", fn, size=30)
+        release.set()
+        await finish(queue, job)
+        assert queue.stats()["bytes"] == 0
+        # A job larger than the limit is accepted when nothing else is held
+        big = queue.submit("test", fn, size=500)
+        await finish(queue, big)
+    run(scenario())
+
+def test_other_workers_follow_jobs_through_the_store(tmp_path):
+    async def scenario():
+        store = SharedStore(directory=str(tmp_path))
+        owner = JobQueue(workers=1, store=store)
+        other = JobQueue(workers=1, store=store)
+
+        release = asyncio.Event()
+
+        async def fn():
+            await release.wait()
+            return b'{"ok": true}'
+
+        job = owner.submit("test", fn)
+        # Job state is written to the store in the background
+        seen = None
+        while seen is None:
+            await asyncio.sleep(0.01)
+            seen = other.get(job.id)
+        assert isinstance(seen, StoredJob) and seen.status in ("queued", "running")
+        release.set()
+        await finish(owner, job)
+        while not seen.done:
+            await seen.wait(seen.version, 1)
+        assert seen.status == "done" and seen.progress == 1.0
+        assert other.get(job.id).result == b'{"ok": true}'
+        assert other.get("0" * 32) is None
+        # Expired results are not served by other workers either
+        assert JobQueue(ttl=0, store=store).get(job.id) is None
+    run(scenario())
+
+def test_progress_is_published_at_most_once_a_second(tmp_path):
+    async def scenario():
+        store = SharedStore(directory=str(tmp_path))
+        queue = JobQueue(workers=1, store=store)
+        written = []
+        put_bytes = store.put_bytes
+
+        def record_write(key, data):
+            written.append(key)
+            put_bytes(key, data)
+
+        store.put_bytes = record_write
+
+        async def fn():
+            timer = current_timer.get()
+            for stage in ("decode", "process", "hist", "encode", "json"):
+                timer.begin(stage)
+                await asyncio.sleep(0.01)
+            return b'{"ok": true}'
+
+        job = queue.submit("test", fn)
+        await finish(queue, job)
+        # queued, running and done, with no write per stage in between
+        assert len(written) <= 4
+        assert JobQueue(store=store).get(job.id).status == "done"
+    run(scenario())
@@ -0,0 +1,19 @@
+from utils.metrics import render_counter, render_gauge
+
+def test_totals_render_as_counters():
+    assert render_counter("admission_shed", "Requests shed", 3) == [
+        "# HELP admission_shed_total Requests shed", "# TYPE admission_shed_total counter", "admission_shed_total 3"
+    ]
+    assert render_gauge("queue_depth", "Waiting jobs", {(("pool", "a"),): 2})[1:] == [
+        "# TYPE queue_depth gauge", 'queue_depth{pool="a"} 2'
+    ]
+
+def test_metrics_endpoint_types(client):
+    text = client.get("/image/metrics").text
+    types = dict(line.split()[2:4] for line in text.splitlines() if line.startswith("# TYPE"))
+    for name in ("result_cache_hits", "result_cache_misses", "admission_shed", "admission_admitted"):
+        assert types[f"{name}_total"] == "counter"
+        assert name not in types
+    assert types["result_cache_hit_ratio"] == "gauge"
+    # Every counter follows the naming convention
+    assert all(name.endswith("_total") for name, kind in types.items() if kind == "counter")
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_image
+from scripts import operations as image_ops
+from scripts.fourier_filters import apply_fourier_filter
+from scripts.fourier_transform import apply_fourier_transform
+from scripts.precision import as_float, complex_dtype, float_dtype, precision
+
+CONTENTS = ["photo", "noise", "gradient", "checker"]
+
+def both_precisions(fn):
+    """Outputs of fn() under float64 and float32"""
+    outputs = []
+    for name in ("float64", "float32"):
+        with precision(name):
+            outputs.append(fn())
+    return outputs
+
+def test_precision_selects_dtypes():
+    with precision("float64"):
+        assert float_dtype() == np.float64 and complex_dtype() == np.complex128
+        with precision("float32"):
+            assert as_float(np.zeros(2, np.uint8)).dtype == np.float32
+        assert float_dtype() == np.float64
+    with pytest.raises(ValueError):
+        with precision("float16"):
+            pass
+
+@pytest.mark.parametrize("content", CONTENTS)
+def test_fourier_reconstruction_returns_the_input(content):
+    img = make_image((200, 150), content)
+    for _, reconstructed in both_precisions(lambda: apply_fourier_transform(img, True, True)):
+        np.testing.assert_array_equal(reconstructed, img)
+
+@pytest.mark.parametrize("content", CONTENTS)
+def test_fourier_spectrum_off_by_at_most_one(content):
+    img = make_image((200, 150), content)
+    (reference, _), (result, _) = both_precisions(lambda: apply_fourier_transform(img, True, True))
+    diff = np.abs(reference.astype(int) - result)
+    assert diff.max() <= 1
+    assert np.count_nonzero(diff) <= 0.001 * diff.size
+
+@pytest.mark.parametrize("content", CONTENTS)
+def test_fourier_filter_off_by_at_most_one(content):
+    img = make_image((200, 150), content)
+    params = {"radius": 30, "gaussian": True, "add_dc": False}
+    reference, result = both_precisions(lambda: apply_fourier_filter(img, "low_pass", params))
+    for ref, out in zip(reference, result):
+        diff = np.abs(ref.astype(int) - out)
+        assert diff.max() <= 1
+        assert np.count_nonzero(diff) <= 0.001 * diff.size
+
+@pytest.mark.parametrize("content", CONTENTS)
+@pytest.mark.parametrize("operation, params", [
+    ("contrast", {"factor": 1.2}),
+    ("gamma", {"gamma": 0.45}),
+    ("gamma", {"gamma": 2.2}),
+])
+def test_point_operations_identical(content, operation, params):
+    img = make_image((200, 150), content)
+    reference, result = both_precisions(lambda: image_ops.get_operation(operation)(img, **params))
+    np.testing.assert_array_equal(result, reference)
@@ -0,0 +1,26 @@
+import pytest
+
+@pytest.fixture
+def token(monkeypatch, tmp_path):
+    from utils import profiling
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiling.profile_store, "directory", str(tmp_path))
+    return {"X-Profile": "secret"}
+
+def test_profiles_need_the_token(client, png, token):
+    response = client.post("/image/gamma", data={"gamma": 0.6}, files={"image": ("a.png", png)}, headers=token)
+    profile_id = response.headers["X-Profile-Id"]
+
+    listed = client.get("/image/profiles", headers=token)
+    assert listed.status_code == 200
+    assert profile_id in [profile["id"] for profile in listed.json()["profiles"]]
+    assert client.get(f"/image/profiles/{profile_id}", headers=token).status_code == 200
+
+    for headers in ({}, {"X-Profile": "wrong"}):
+        assert client.get("/image/profiles", headers=headers).status_code == 403
+        assert client.get(f"/image/profiles/{profile_id}", headers=headers).status_code == 403
+
+def test_profiles_are_closed_without_a_configured_token(client, monkeypatch):
+    from utils import profiling
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "")
+    assert client.get("/image/profiles", headers={"X-Profile": ""}).status_code == 403
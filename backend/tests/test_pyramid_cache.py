@@ -0,0 +1,69 @@
+import cv2
+import numpy as np
+import pytest
+
+from scripts.pyramids import build_gaussian_pyramid, build_laplacian_pyramid, reconstruct_from_laplacian
+from utils.pyramid_cache import PyramidCache, default_levels, level_size, max_levels
+from utils.shared_store import SharedStore
+
+IMAGE_ID = "ab" * 32
+
+@pytest.fixture()
+def cache(tmp_path, photo):
+    store = SharedStore(directory=str(tmp_path))
+    store.put_array(IMAGE_ID, photo)
+    return PyramidCache(store)
+
+def decode(data):
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+
+def test_level_sizes_round_odd_sizes_up():
+    assert level_size(320, 240, 0) == (320, 240)
+    assert level_size(5, 3, 1) == (3, 2)
+    assert max_levels(320, 240) == 9
+    assert min(level_size(320, 240, default_levels(320, 240) - 1)) >= 8
+    assert default_levels(4, 4) == 1
+
+def test_levels_match_the_full_pyramid(cache, photo):
+    levels = 5
+    gaussian = build_gaussian_pyramid(photo, levels)
+    laplacian, display = build_laplacian_pyramid(gaussian)
+    for level in range(levels):
+        np.testing.assert_array_equal(cache.gaussian(IMAGE_ID, level), gaussian[level])
+        np.testing.assert_array_equal(cache.laplacian(IMAGE_ID, level, levels - 1), laplacian[level])
+        np.testing.assert_array_equal(decode(cache.png(IMAGE_ID, "laplacian", level, levels - 1)), display[level])
+    np.testing.assert_array_equal(cache.reconstructed(IMAGE_ID, levels - 1), reconstruct_from_laplacian(laplacian))
+
+def test_levels_are_built_and_encoded_once(cache):
+    first = cache.png(IMAGE_ID, "gaussian", 3)
+    # Levels 1 to 3 were built on the way
+    assert cache.stats() == {"built": 3, "encoded": 1, "encodedHits": 0}
+    assert cache.png(IMAGE_ID, "gaussian", 3) == first
+    cache.gaussian(IMAGE_ID, 2)
+    assert cache.stats() == {"built": 3, "encoded": 1, "encodedHits": 1}
+    # Another cache over the same store, as in another worker, reuses them
+    other = PyramidCache(cache.store)
+    assert other.png(IMAGE_ID, "gaussian", 3) == first
+    assert other.stats()["built"] == 0
+
+def test_missing_image_gives_none(cache):
+    assert cache.gaussian("cd" * 32, 2) is None
+    assert cache.png("cd" * 32, "laplacian", 0, 3) is None
+
+def test_endpoints_serve_levels_of_an_uploaded_image(client, png, photo):
+    image_id = client.post("/image/images", files={"image": ("a.png", png)}).json()["imageId"]
+    pyramid = client.get(f"/image/images/{image_id}/pyramid?levels=4").json()
+    assert [entry["width"] for entry in pyramid["levels"]] == [320, 160, 80, 40]
+    # The last Laplacian level is the Gaussian level
+    assert pyramid["levels"][3]["laplacian"] == pyramid["levels"][3]["gaussian"]
+
+    response = client.get(pyramid["levels"][2]["gaussian"])
+    assert response.status_code == 200 and response.headers["content-type"] == "image/png"
+    np.testing.assert_array_equal(decode(response.content), build_gaussian_pyramid(photo, 3)[2])
+    again = client.get(pyramid["levels"][2]["gaussian"], headers={"If-None-Match": response.headers["ETag"]})
+    assert again.status_code == 304
+
+    assert client.get(f"/image/images/{image_id}/pyramid?levels=99").status_code == 400
+    assert client.get(f"/image/images/{image_id}/pyramid/sepia/0").status_code == 404
+    assert client.get(f"/image/images/{image_id}/pyramid/gaussian/99").status_code == 404
+    assert client.get(f"/image/images/{'cd' * 32}/pyramid").status_code == 404
@@ -0,0 +1,63 @@
+from utils.result_cache import ResultCache, etag_matches, make_cache_key
+
+def test_cache_key_depends_on_operation_images_and_params():
+    key = make_cache_key("gamma", [b"a"], {"gamma": 0.5})
+    assert len(key) == 64
+    assert key == make_cache_key("gamma", [b"a"], {"gamma": 0.5})
+    assert key != make_cache_key("brightness", [b"a"], {"gamma": 0.5})
+    assert key != make_cache_key("gamma", [b"b"], {"gamma": 0.5})
+    assert key != make_cache_key("gamma", [b"a"], {"gamma": 0.6})
+    # Upload boundaries are part of the key
+    assert make_cache_key("2pointer", [b"ab", b"c"], {}) != make_cache_key("2pointer", [b"a", b"bc"], {})
+    # Parameter order is not
+    assert make_cache_key("x", [], {"a": 1, "b": 2}) == make_cache_key("x", [], {"b": 2, "a": 1})
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+def test_evicts_least_recently_used_by_entries():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    assert cache.get("a") == b"1"
+    cache.put("c", b"3")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1" and cache.get("c") == b"3"
+    assert cache.stats()["evictions"] == 1
+
+def test_evicts_by_bytes_and_skips_oversized_values():
+    cache = ResultCache(max_entries=10, max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"5678")
+    cache.put("c", b"90ab")
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 8
+    cache.put("big", b"x" * 11)
+    assert cache.get("big") is None
+    assert cache.get("b") == b"5678"
+
+def test_replacing_a_value_updates_the_size():
+    cache = ResultCache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("a", b"12")
+    assert cache.stats()["bytes"] == 2
+
+def test_endpoint_caches_and_answers_conditional_requests(client, png):
+    from utils.result_cache import result_cache
+    request = {"data": {"gamma": 0.7}, "files": {"image": ("a.png", png)}}
+    first = client.post("/image/gamma", **request)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    hits = result_cache.stats()["hits"]
+    second = client.post("/image/gamma", **request)
+    assert second.content == first.content
+    assert result_cache.stats()["hits"] == hits + 1
+    not_modified = client.post("/image/gamma", headers={"If-None-Match": etag}, **request)
+    assert not_modified.status_code == 304
+    other = client.post("/image/gamma", data={"gamma": 0.8}, files={"image": ("a.png", png)})
+    assert other.headers["ETag"] != etag
@@ -0,0 +1,65 @@
+import base64
+
+import cv2
+import numpy as np
+import pytest
+
+from utils.roi import parse_roi, roi_bounds
+
+ROI = (70, 50, 96, 80)
+
+def decode(data_url):
+    data = base64.b64decode(data_url.split(",", 1)[1])
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+
+def post(client, path, png, params, query=""):
+    response = client.post(f"/image/{path}{query}", data=params, files={"image": ("a.png", png, "image/png")})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+@pytest.mark.parametrize("path, params", [
+    ("brightness", {"value": 20}),
+    ("gamma", {"gamma": 0.5}),
+    ("median-filter", {"kernel_size": 4}),
+    ("mean-filter", {"kernel_size": 7}),
+    ("convolution", {"kernel_size": 5, "mask_type": "sharpen"}),
+    ("bilateral", {"d": 9, "sigma_color": 75, "sigma_space": 75}),
+    ("bilateral", {"d": 0, "sigma_color": 75, "sigma_space": 5}),
+    ("apply-filter", {"filter_sequence": "min,max,min"}),
+])
+def test_roi_matches_crop_of_full_image(client, png, path, params):
+    x, y, width, height = ROI
+    full = post(client, path, png, params)
+    part = post(client, path, png, params, "?roi=%d,%d,%d,%d" % ROI)
+    expected = decode(full["processedImage"])[y:y + height, x:x + width]
+    np.testing.assert_array_equal(decode(part["processedImage"]), expected)
+    assert part["roi"] == {"x": x, "y": y, "width": width, "height": height, "imageWidth": 320, "imageHeight": 240}
+    if "processedHistogram" in part:
+        np.testing.assert_array_equal(part["processedHistogram"], np.bincount(expected.ravel(), minlength=256))
+
+def test_roi_canny_is_close_to_crop(client, png):
+    # Hysteresis can follow edges beyond any halo, so only near-equality holds
+    x, y, width, height = ROI
+    params = {"low_threshold": 50, "high_threshold": 150, "sigma": 1.4}
+    full = decode(post(client, "canny-edge", png, params)["processedImage"])[y:y + height, x:x + width]
+    part = decode(post(client, "canny-edge", png, params, "?roi=%d,%d,%d,%d" % ROI)["processedImage"])
+    assert np.count_nonzero(full != part) <= 0.01 * full.size
+
+def test_roi_clipped_to_image(client, png):
+    part = post(client, "brightness", png, {"value": 20}, "?roi=300,200,100,100")
+    assert decode(part["processedImage"]).shape == (40, 20)
+
+@pytest.mark.parametrize("query", ["roi=1,2,3", "roi=0,0,0,5", "roi=5000,5000,10,10", "roi=0,0,10,10&max_side=100"])
+def test_invalid_roi_rejected(client, png, query):
+    response = client.post(f"/image/median-filter?{query}", data={"kernel_size": 3}, files={"image": ("a.png", png)})
+    assert response.status_code == 400
+
+def test_global_operation_rejects_roi(client, png):
+    response = client.post("/image/equalize?roi=0,0,10,10", files={"image": ("a.png", png)})
+    assert response.status_code == 400
+
+def test_roi_bounds_adds_clipped_halo():
+    assert parse_roi(" 10, 20,30 ,40") == (10, 20, 30, 40)
+    assert roi_bounds((10, 20, 30, 40), 15, 100, 50) == ((10, 20, 40, 50), (0, 5, 55, 50))
+    with pytest.raises(ValueError):
+        roi_bounds((100, 0, 5, 5), 0, 100, 50)
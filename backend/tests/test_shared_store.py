@@ -0,0 +1,63 @@
+import sqlite3
+
+import cv2
+import numpy as np
+import pytest
+
+from utils.result_cache import ResultCache, make_cache_key
+from utils.shared_store import EntryTooLarge, SharedStore
+
+def key(name):
+    return make_cache_key("test", [name.encode()], {})
+
+@pytest.fixture
+def store(tmp_path):
+    return SharedStore(directory=str(tmp_path), max_bytes=1000)
+
+def test_entries_are_seen_by_other_workers(store):
+    store.put_bytes(key("a"), b"body")
+    array = np.arange(12, dtype=np.float32).reshape(3, 4)
+    store.put_array(key("b"), array)
+    other = SharedStore(directory=store.directory, max_bytes=1000)
+    assert other.get_bytes(key("a")) == b"body"
+    np.testing.assert_array_equal(other.get_array(key("b")), array)
+    assert other.array_info(key("b")) == {"shape": [3, 4], "dtype": "<f4"}
+    assert other.get_bytes(key("missing")) is None
+
+def test_evicts_least_recently_used(store):
+    store.put_bytes(key("a"), b"x" * 400)
+    store.put_bytes(key("b"), b"x" * 400)
+    store.put_bytes(key("c"), b"x" * 400)
+    assert store.get_bytes(key("a")) is None
+    assert store.stats()["bytes"] == 800
+
+def test_entry_larger_than_the_store_is_reported(store):
+    with pytest.raises(EntryTooLarge):
+        store.put_bytes(key("a"), b"x" * 1001)
+    assert store.get_bytes(key("a")) is None
+
+def test_shared_store_serves_other_workers(store):
+    ResultCache(shared=store).put(key("a"), b"body")
+    other = ResultCache(shared=store)
+    assert other.get(key("a"), shared=False) is None
+    assert other.get(key("a")) == b"body"
+    assert other.stats()["sharedHits"] == 1
+
+@pytest.mark.parametrize("error", [EntryTooLarge(2000, 1000), OSError("disk full"), sqlite3.OperationalError("locked")])
+def test_failed_shared_write_is_counted(store, monkeypatch, error):
+    def fail(key, data):
+        raise error
+
+    monkeypatch.setattr(store, "put_bytes", fail)
+    cache = ResultCache(shared=store)
+    cache.put(key("a"), b"body")
+    assert cache.get(key("a")) == b"body"
+    assert cache.stats()["sharedFailures"] == 1
+
+def test_upload_larger_than_the_store_is_refused(client, photo, monkeypatch):
+    from utils.shared_store import shared_store
+    monkeypatch.setattr(shared_store, "max_bytes", 1000)
+    # An image no other test uploads, so it is not stored already
+    png = cv2.imencode(".png", photo[::-1])[1].tobytes()
+    response = client.post("/image/images", files={"image": ("a.png", png, "image/png")})
+    assert response.status_code == 507
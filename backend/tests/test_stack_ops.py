@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+import pytest
+
+from scripts import operations as image_ops
+from scripts import stack_ops
+from scripts.fourier_transform import apply_fourier_transform
+from scripts.noise import add_noise
+from scripts.precision import PRECISIONS, precision
+
+@pytest.fixture(scope="module")
+def stack():
+    rng = np.random.default_rng(0)
+    yy, xx = np.indices((64, 96))
+    return stack_ops.stack_images([
+        cv2.resize(rng.integers(0, 256, (8, 12), dtype=np.uint8), (96, 64), interpolation=cv2.INTER_CUBIC),
+        rng.integers(0, 256, (64, 96), dtype=np.uint8),
+        ((xx + yy) * 255 // (96 + 64)).astype(np.uint8),
+        ((xx // 16 + yy // 16) % 2 * 255).astype(np.uint8),
+    ])
+
+CASES = [
+    ("brightness", {"value": 40}),
+    ("brightness", {"value": -70}),
+    ("contrast", {"factor": 1.5}),
+    ("equalize", {}),
+    ("gamma", {"gamma": 0.45}),
+    ("gamma", {"gamma": 2.2}),
+    ("fourier", {"center_spectrum": True, "apply_log": True}),
+    ("fourier", {}),
+]
+
+@pytest.mark.parametrize("name_precision", PRECISIONS)
+@pytest.mark.parametrize("operation, params", CASES)
+def test_stack_matches_per_image(stack, operation, params, name_precision):
+    with precision(name_precision):
+        expected = np.stack([image_ops.get_operation(operation)(img, **params) for img in stack])
+        result = stack_ops.STACK_OPERATIONS[operation](stack, **params)
+    np.testing.assert_array_equal(result, expected)
+
+@pytest.mark.parametrize("name_precision", PRECISIONS)
+def test_fourier_stack_reconstruction_matches_per_image(stack, name_precision):
+    with precision(name_precision):
+        magnitudes, reconstructed = stack_ops.fourier_transform_stack(stack, True, True)
+        for i, img in enumerate(stack):
+            magnitude, image_back = apply_fourier_transform(img, True, True)
+            np.testing.assert_array_equal(magnitudes[i], magnitude)
+            np.testing.assert_array_equal(reconstructed[i], image_back)
+
+@pytest.mark.parametrize("noise_type, intensity", [("salt-pepper", 0.1), ("gaussian", 25)])
+def test_noise_stack_matches_per_image_with_same_rng(stack, noise_type, intensity):
+    result = stack_ops.add_noise_stack(stack, noise_type, intensity, np.random.default_rng(7))
+    rng = np.random.default_rng(7)
+    expected = np.stack([add_noise(img, noise_type, intensity, rng) for img in stack])
+    np.testing.assert_array_equal(result, expected)
+
+def test_histograms_stack_matches_per_image(stack):
+    from routers.image_processing import compute_histograms
+    hist, cum = stack_ops.histograms_stack(stack)
+    for i, img in enumerate(stack):
+        expected_hist, expected_cum = compute_histograms(img)
+        np.testing.assert_allclose(hist[i], expected_hist)
+        np.testing.assert_allclose(cum[i], expected_cum, rtol=1e-6)
+
+def test_stack_images_rejects_mixed_sizes():
+    with pytest.raises(ValueError):
+        stack_ops.stack_images([np.zeros((4, 4), np.uint8), np.zeros((4, 5), np.uint8)])
@@ -0,0 +1,62 @@
+import cv2
+import numpy as np
+import pytest
+
+from scripts import operations as image_ops
+from utils.shared_store import SharedStore
+from utils.tiles import TILE_SIZE, max_zoom, parse_op_spec
+
+def decode(data):
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+
+@pytest.fixture(scope="module")
+def image_id(client, png):
+    response = client.post("/image/images", files={"image": ("a.png", png, "image/png")})
+    assert response.status_code == 200
+    return response.json()["imageId"]
+
+def test_parse_op_spec():
+    assert parse_op_spec("median-filter;kernel_size=5") == ("median-filter", {"kernel_size": 5})
+    assert parse_op_spec("original") == ("original", {})
+    with pytest.raises(ValueError):
+        parse_op_spec("fourier")
+    with pytest.raises(ValueError):
+        parse_op_spec("median-filter;kernel_size")
+
+def test_tile_grid_is_described(client, image_id):
+    info = client.get(f"/image/tiles/{image_id}/original").json()
+    assert info["maxZoom"] == max_zoom(320, 240) == 9
+    assert info["levels"][-1] == {"zoom": 9, "width": 320, "height": 240, "columns": 2, "rows": 1}
+    assert info["levels"][0]["width"] == 1
+
+@pytest.mark.parametrize("spec, operation, params", [
+    ("median-filter;kernel_size=5", "median-filter", {"kernel_size": 5}),
+    ("bilateral;d=9;sigma_color=75;sigma_space=75", "bilateral", {"d": 9, "sigma_color": 75, "sigma_space": 75}),
+])
+def test_tiles_match_the_processed_image(client, image_id, photo, spec, operation, params):
+    expected = image_ops.get_operation(operation)(photo, **params)
+    for column in range(2):
+        response = client.get(f"/image/tiles/{image_id}/{spec}/9/{column}/0.png")
+        assert response.status_code == 200
+        tile = expected[:TILE_SIZE, column * TILE_SIZE:(column + 1) * TILE_SIZE]
+        np.testing.assert_array_equal(decode(response.content), tile)
+
+def test_zoomed_out_tile_is_cut_from_the_pyramid(client, image_id, photo):
+    response = client.get(f"/image/tiles/{image_id}/original/8/0/0.png")
+    np.testing.assert_array_equal(decode(response.content), cv2.pyrDown(photo)[:TILE_SIZE, :TILE_SIZE])
+
+def test_missing_tiles(client, image_id):
+    assert client.get(f"/image/tiles/{image_id}/original/10/0/0.png").status_code == 404
+    assert client.get(f"/image/tiles/{image_id}/original/9/2/0.png").status_code == 404
+    assert client.get(f"/image/tiles/{'0' * 64}/original/0/0/0.png").status_code == 404
+
+def test_view_is_read_only_and_outlives_eviction(tmp_path, photo):
+    store = SharedStore(directory=str(tmp_path), max_bytes=photo.nbytes)
+    key = "cd" * 32
+    store.put_array(key, photo)
+    view = store.view_array(key)
+    assert isinstance(view, np.memmap) and not view.flags.writeable
+    # Evicted by a newer entry while the view is held
+    store.put_array("ef" * 32, photo)
+    assert store.view_array(key) is None
+    np.testing.assert_array_equal(view[10:20, 30:40], photo[10:20, 30:40])
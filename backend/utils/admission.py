@@ -0,0 +1,260 @@
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+
+from utils.worker_pool import MAX_WORKERS
+
+# Estimated worker milliseconds per megapixel of each operation, including
+# decode, histograms and PNG encode (measured on 1-4 MP photos on one core).
+# Operations whose cost grows with a kernel add a per-megapixel term below.
+MS_PER_MEGAPIXEL = {
+    "brightness": 33,
+    "contrast": 35,
+    "compute-histogram": 13,
+    "equalize": 34,
+    "gamma": 38,
+    "2pointer": 1000,  # per-pixel Python loop
+    "transform": 32,
+    "add-noise": 60,
+    "apply-filter": 30,
+    "median-filter": 30,
+    "mean-filter": 32,
+    "convolution": 35,
+    "bilateral": 35,
+    "fourier": 110,
+    "fourier-filter": 160,
+    "pyramids": 80,
+    "canny-edge": 20,
+}
+
+# Extra cost in "luma"/"lab" (one conversion each way) and "channels" (three planes)
+COLOR_COST_FACTOR = {"gray": 1.0, "luma": 1.2, "lab": 1.3, "channels": 3.0}
+
+def _int_param(params, name, default):
+    try:
+        return int(params.get(name) or default)
+    except (TypeError, ValueError):
+        return default
+
+def kernel_ms_per_megapixel(operation, params):
+    """Parameter-dependent cost per megapixel (kernel area, filter count, ...)"""
+    if operation == "bilateral":
+        d = _int_param(params, "d", 0)
+        if d <= 0:
+            # OpenCV derives the diameter from sigma_space
+            d = 2 * round(float(params.get("sigma_space") or 0) * 1.5) + 1
+        return 0.25 * d * d
+    if operation == "median-filter":
+        return 3 * _int_param(params, "kernel_size", 3)
+    if operation == "mean-filter":
+        return 0.06 * _int_param(params, "kernel_size", 3) ** 2
+    if operation == "convolution":
+        return 0.1 * _int_param(params, "kernel_size", 3) ** 2
+    if operation == "apply-filter":
+        return 2 * len(str(params.get("filter_sequence", "")).split(","))
+    if operation == "canny-edge":
+        sigma = float(params.get("sigma") or 1)
+        return 0.01 * (2 * round(3 * sigma) + 1) ** 2
+    return 0
+
+def estimate_cost(operation, pixels, params, color="gray"):
+    """
+    Estimate the worker time of an operation, in milliseconds
+
+    Args:
+        operation: Name of the router operation
+        pixels: Pixel count of the (largest) input as it will be decoded
+        params: Operation parameters
+        color: Color mode of the request
+    """
+    per_megapixel = MS_PER_MEGAPIXEL.get(operation, 50) + kernel_ms_per_megapixel(operation, params)
+    if operation in ("fourier", "fourier-filter"):
+        # n log n: the table is for about one megapixel
+        per_megapixel *= max(1.0, math.log2(max(pixels, 2)) / 20)
+    return per_megapixel * pixels / 1e6 * COLOR_COST_FACTOR.get(color, 1.0)
+
+class Overloaded(Exception):
+    """Raised when a request is shed; retry_after is the suggested wait in seconds"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Server is over capacity, retry in {retry_after} s")
+        self.retry_after = retry_after
+
+class Ticket:
+    """A request waiting for, or holding, part of the admission budget"""
+
+    def __init__(self, cost, charge, heavy, tag):
+        self.cost = cost
+        self.charge = charge
+        self.heavy = heavy
+        self.tag = tag
+        self.admitted = None
+        self.future = None
+
+class AdmissionController:
+    """
+    Admit work against a budget of estimated worker time in flight.
+
+    Each worker may have worker_budget milliseconds of estimated work in
+    flight; a single request is charged at most one worker's budget, and
+    anything is admitted when nothing else runs. Requests estimated above
+    interactive_max are heavy: together they may hold at most heavy_share of
+    the budget, so cheap interactive requests always find room.
+
+    Waiting requests are served by weighted fair queueing on their cost:
+    each class advances its own virtual finish time by cost / weight, and
+    the smallest finish time goes next. Cheap requests therefore overtake
+    queued heavy ones, while heavy ones still progress at their weight's
+    share. A request whose estimated wait exceeds max_wait is shed with
+    Overloaded instead of queueing. Estimates are corrected continuously by
+    the ratio of measured to estimated time. Must be used from one event loop.
+    """
+
+    def __init__(self, workers=MAX_WORKERS, worker_budget=1000, interactive_max=250,
+                 heavy_share=0.5, max_wait=10, weights=None):
+        self.workers = workers
+        self.worker_budget = worker_budget
+        self.capacity = workers * worker_budget
+        self.interactive_max = interactive_max
+        self.heavy_share = heavy_share
+        self.max_wait = max_wait
+        self.weights = weights or {"interactive": 4, "heavy": 1}
+        self.correction = 1.0
+        self._in_flight = 0.0
+        self._heavy_in_flight = 0.0
+        self._running_cost = 0.0
+        self._waiting = []
+        self._order = itertools.count()
+        self._virtual_time = 0.0
+        self._finish = {"interactive": 0.0, "heavy": 0.0}
+        self.admitted = {"interactive": 0, "heavy": 0}
+        self.queued = 0
+        self.shed = 0
+
+    def _fits(self, ticket):
+        if self._in_flight == 0:
+            return True
+        if self._in_flight + ticket.charge > self.capacity:
+            return False
+        if ticket.heavy and self._heavy_in_flight > 0:
+            return self._heavy_in_flight + ticket.charge <= self.capacity * self.heavy_share
+        return True
+
+    def estimated_wait(self, ahead=0.0):
+        """Seconds until work in flight plus ahead estimated milliseconds has drained"""
+        return (self._running_cost + ahead) * self.correction / self.workers / 1000
+
+    def _admit(self, ticket):
+        ticket.admitted = time.perf_counter()
+        self._in_flight += ticket.charge
+        self._running_cost += ticket.cost
+        if ticket.heavy:
+            self._heavy_in_flight += ticket.charge
+        self._virtual_time = max(self._virtual_time, ticket.tag)
+        self.admitted["heavy" if ticket.heavy else "interactive"] += 1
+
+    def _dispatch(self):
+        # Admit waiters in finish-time order; a heavy waiter blocked only by
+        # the heavy share lets the interactive waiters behind it through
+        for _, _, ticket in sorted(self._waiting):
+            if ticket.future.done():
+                continue
+            if self._fits(ticket):
+                self._admit(ticket)
+                ticket.future.set_result(None)
+            elif not (ticket.heavy and self._in_flight + ticket.charge <= self.capacity):
+                break
+        self._waiting = [entry for entry in self._waiting if not entry[2].future.done()]
+        heapq.heapify(self._waiting)
+
+    async def acquire(self, cost, shed=True):
+        """
+        Wait until a request of this estimated cost (ms) is admitted
+
+        Args:
+            shed: Raise Overloaded when the wait would be too long (queued
+                background jobs pass False and wait as long as it takes)
+
+        Returns:
+            Ticket to pass to release()
+        """
+        heavy = cost > self.interactive_max
+        name = "heavy" if heavy else "interactive"
+        previous_finish = self._finish[name]
+        tag = max(self._virtual_time, previous_finish) + cost / self.weights[name]
+        ticket = Ticket(cost, min(cost, self.worker_budget), heavy, tag)
+        ticket.future = asyncio.get_running_loop().create_future()
+        self._finish[name] = tag
+        heapq.heappush(self._waiting, (tag, next(self._order), ticket))
+        self._dispatch()
+        if ticket.future.done():
+            return ticket
+
+        if shed:
+            ahead = sum(other.cost for other_tag, _, other in self._waiting if other_tag < tag)
+            wait = self.estimated_wait(ahead)
+            if wait > self.max_wait:
+                self._withdraw(ticket)
+                self._finish[name] = previous_finish
+                self.shed += 1
+                raise Overloaded(max(1, math.ceil(wait)))
+
+        self.queued += 1
+        try:
+            if shed:
+                await asyncio.wait_for(asyncio.shield(ticket.future), self.max_wait)
+            else:
+                await ticket.future
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if ticket.future.done() and not ticket.future.cancelled():
+                if isinstance(e, asyncio.TimeoutError):
+                    # Admitted as the timeout fired
+                    return ticket
+                # Admitted just as the waiter went away; give the budget back
+                self.release(ticket)
+                raise
+            self._withdraw(ticket)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.shed += 1
+            raise Overloaded(max(1, math.ceil(self.estimated_wait())))
+        return ticket
+
+    def _withdraw(self, ticket):
+        ticket.future.cancel()
+        self._dispatch()
+
+    def release(self, ticket):
+        """Return an admitted request's budget and update the cost correction"""
+        elapsed = time.perf_counter() - ticket.admitted
+        self._in_flight = max(0.0, self._in_flight - ticket.charge)
+        self._running_cost = max(0.0, self._running_cost - ticket.cost)
+        if ticket.heavy:
+            self._heavy_in_flight = max(0.0, self._heavy_in_flight - ticket.charge)
+        if ticket.cost >= 1:
+            ratio = min(10.0, max(0.1, elapsed * 1000 / ticket.cost))
+            self.correction = 0.9 * self.correction + 0.1 * ratio
+        self._dispatch()
+
+    def stats(self):
+        return {
+            "capacityMs": self.capacity,
+            "inFlightMs": round(self._in_flight, 1),
+            "heavyInFlightMs": round(self._heavy_in_flight, 1),
+            "waiting": len(self._waiting),
+            "admitted": dict(self.admitted),
+            "queued": self.queued,
+            "shed": self.shed,
+            "costCorrection": round(self.correction, 3)
+        }
+
+# Budget shared by the image endpoints and the job queue of this process
+admission = AdmissionController(
+    worker_budget=float(os.environ.get("ADMISSION_WORKER_BUDGET_MS", 1000)),
+    interactive_max=float(os.environ.get("ADMISSION_INTERACTIVE_MAX_MS", 250)),
+    heavy_share=float(os.environ.get("ADMISSION_HEAVY_SHARE", 0.5)),
+    max_wait=float(os.environ.get("ADMISSION_MAX_WAIT_SECONDS", 10))
+)
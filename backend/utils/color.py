@@ -0,0 +1,43 @@
+import cv2
+
+# How color uploads are processed: "gray" decodes to grayscale as before;
+# "luma" and "lab" run the operation on the luminance channel of YCrCb or
+# Lab and keep the chroma untouched; "channels" runs it on every BGR channel
+COLOR_MODES = ("gray", "luma", "lab", "channels")
+
+# Operations that only depend on intensities, so luminance-only processing
+# gives the expected result
+COLOR_OPERATIONS = {
+    "brightness", "contrast", "equalize", "gamma",
+    "median-filter", "mean-filter", "bilateral", "canny-edge",
+}
+
+# (to color space, back to BGR) conversions; luminance is channel 0 in both
+_CONVERSIONS = {
+    "luma": (cv2.COLOR_BGR2YCrCb, cv2.COLOR_YCrCb2BGR),
+    "lab": (cv2.COLOR_BGR2Lab, cv2.COLOR_Lab2BGR),
+}
+
+class LuminancePlanes:
+    """
+    A BGR image converted once to YCrCb or Lab, split into luminance and chroma
+
+    Everything stays uint8: OpenCV converts 8-bit images with fixed-point
+    arithmetic, so the only extra work over a grayscale request is one
+    conversion each way, not a float copy of the image.
+    """
+
+    def __init__(self, image, mode):
+        to_space, self._to_bgr = _CONVERSIONS[mode]
+        self._converted = cv2.cvtColor(image, to_space)
+        self.luma = cv2.extractChannel(self._converted, 0)
+
+    def merge(self, luma):
+        """Return the BGR image with its luminance replaced (same size and uint8 only)"""
+        converted = self._converted.copy()
+        cv2.insertChannel(luma, converted, 0)
+        return cv2.cvtColor(converted, self._to_bgr)
+
+def luminance(image):
+    """Grayscale view of an image for histograms (color images are converted)"""
+    return image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
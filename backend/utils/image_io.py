@@ -0,0 +1,298 @@
+import io
+import mmap
+import os
+import random
+import struct
+import threading
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from utils.metrics import IMAGE_BUDGET
+
+# Largest image (in pixels) decoded at full resolution. Larger uploads are
+# rejected, or with IMAGE_OVER_BUDGET=downscale decoded at reduced size.
+MAX_PIXELS = int(os.environ.get("IMAGE_MAX_PIXELS", 50_000_000))
+OVER_BUDGET = os.environ.get("IMAGE_OVER_BUDGET", "reject")
+
+# Uploads at least this large are decoded from a read-only memory map of
+# their spooled file instead of being read into a bytes object (Starlette
+# spools uploads above 1 MB to disk)
+MMAP_MIN_BYTES = int(os.environ.get("UPLOAD_MMAP_MIN_BYTES", 1024 * 1024))
+
+# Fraction of operations run under tracemalloc to measure their peak memory.
+# tracemalloc hooks every allocation in the process and slows all threads
+# while a trace runs, so sampling is opt-in.
+MEMORY_TRACE_SAMPLE_RATE = float(os.environ.get("MEMORY_TRACE_SAMPLE_RATE", 0))
+
+# Reduced decoding modes by downscale factor; OpenCV decodes JPEGs at these
+# scales in the DCT domain (libjpeg scaled IDCT, the same mechanism as
+# Pillow's draft mode), so no full-size buffer is ever allocated. Other
+# formats are decoded at full size and then reduced, so only JPEGs may
+# exceed the pixel budget under the downscale policy.
+REDUCED_MODES = {
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+REDUCED_COLOR_MODES = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# Approximate peak bytes allocated per input pixel by each router operation,
+# including decode and the response histograms (measured with tracemalloc on
+# 1024x1024 photos; OpenCV-internal buffers are not visible to tracemalloc)
+BYTES_PER_PIXEL = {
+    "brightness": 5,
+    "contrast": 25,
+    "compute-histogram": 7,
+    "equalize": 5,
+    "gamma": 25,
+    "2pointer": 8,
+    "transform": 4,
+    "add-noise": 34,
+    "apply-filter": 4,
+    "median-filter": 4,
+    "mean-filter": 4,
+    "convolution": 4,
+    "bilateral": 4,
+    "fourier": 89,
+    "fourier-filter": 116,
+    "pyramids": 10,
+    "canny-edge": 19,
+}
+
+class PixelBudgetExceeded(ValueError):
+    """Raised when an image is larger than the configured pixel budget"""
+
+    status_code = 413
+
+    def __init__(self, width, height, max_pixels):
+        if width is None:
+            # Pillow refused to report the size of a decompression bomb
+            message = f"Image is above the limit of {max_pixels} pixels"
+        else:
+            message = (
+                f"Image is {width}x{height} ({width * height} pixels), "
+                f"above the limit of {max_pixels} pixels"
+            )
+        super().__init__(message)
+        self.width = width
+        self.height = height
+
+class UnreadableImageSize(PixelBudgetExceeded):
+    """Raised when an image's size cannot be read, so it cannot be checked against the budget"""
+
+    status_code = 400
+
+    def __init__(self):
+        ValueError.__init__(self, "Unrecognized image format; its size cannot be checked before decoding")
+        self.width = None
+        self.height = None
+
+def _jpeg_size(data):
+    offset = 2
+    while offset + 9 < len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            offset += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + struct.unpack(">H", data[offset + 2:offset + 4])[0]
+    return None
+
+def read_image_size(data):
+    """
+    Read (width, height) from an encoded image's header without decoding it
+
+    PNG, JPEG, GIF and BMP headers are parsed directly; other formats are
+    identified by Pillow, which also reads only the header.
+
+    Returns:
+        (width, height), or None if the format is not recognized
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+    if data[:2] == b"\xff\xd8":
+        return _jpeg_size(data)
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        return struct.unpack("<HH", data[6:10])
+    if data[:2] == b"BM" and len(data) >= 26:
+        width, height = struct.unpack("<ii", data[18:26])
+        return abs(width), abs(height)
+    # Pillow is only needed for uncommon formats, so import it on first use
+    from PIL import Image
+    try:
+        return _pillow_size(data)
+    except Image.DecompressionBombError:
+        return None
+
+def _pillow_size(data):
+    from PIL import Image
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            return img.size
+    except Image.DecompressionBombError:
+        raise
+    except Exception:
+        return None
+
+def is_jpeg(data):
+    """Whether encoded image bytes are a JPEG, the only format decoded at reduced size"""
+    return data[:2] == b"\xff\xd8"
+
+def check_pixel_budget(data, max_pixels=None, policy=None):
+    """
+    Raise PixelBudgetExceeded if an encoded image cannot be decoded within budget
+
+    With the downscale policy only JPEGs too large even at 1/8 scale fail;
+    other formats are decoded at full size first, so they keep the budget.
+    The check fails closed: images Pillow refuses as decompression bombs
+    (above twice PIL.Image.MAX_IMAGE_PIXELS) are over budget, and images
+    whose size cannot be read at all are refused.
+
+    Raises:
+        PixelBudgetExceeded: the image is over budget
+        UnreadableImageSize: the image's header is not recognized
+    """
+    max_pixels = max_pixels or MAX_PIXELS
+    policy = policy or OVER_BUDGET
+    size = read_image_size(data)
+    if size is None:
+        from PIL import Image
+        try:
+            _pillow_size(data)
+        except Image.DecompressionBombError:
+            raise PixelBudgetExceeded(None, None, max_pixels) from None
+        raise UnreadableImageSize()
+    width, height = size
+    limit = max_pixels * 64 if policy == "downscale" and is_jpeg(data) else max_pixels
+    if width * height > limit:
+        raise PixelBudgetExceeded(width, height, max_pixels)
+
+def reduction_factor(width, height, max_pixels, max_side=None):
+    """
+    Pick the reduced decoding factor (1, 2, 4 or 8) for an image
+
+    The factor is the smallest that fits the pixel budget, raised to the
+    largest that still leaves at least max_side pixels on the long side.
+    """
+    factor = next((f for f in (1, *REDUCED_MODES) if width * height <= max_pixels * f * f), 8)
+    if max_side:
+        for f in REDUCED_MODES:
+            if f > factor and max(width, height) / f >= max_side:
+                factor = f
+    return factor
+
+def decode_image_bytes(data, max_pixels=None, policy=None, max_side=None, color=False):
+    """
+    Decode image bytes to grayscale (or BGR with color), enforcing the pixel budget
+
+    Over-budget images raise PixelBudgetExceeded, or with the downscale
+    policy JPEGs are decoded at the smallest reduction of 2, 4 or 8 that
+    fits and then resized to exactly fit the budget. When max_side is given, the
+    image is decoded at the coarsest reduction that keeps at least max_side
+    pixels on its long side and resized to exactly max_side. Asking for a
+    reduced size opts in to downscaling oversized images.
+
+    Returns:
+        uint8 array (H, W) or with color (H, W, 3), or None if the data is
+        not a valid image
+    """
+    max_pixels = max_pixels or MAX_PIXELS
+    policy = "downscale" if max_side else (policy or OVER_BUDGET)
+    check_pixel_budget(data, max_pixels, policy)
+    nparr = np.frombuffer(data, np.uint8)
+    full_mode = cv2.IMREAD_COLOR if color else cv2.IMREAD_GRAYSCALE
+
+    size = read_image_size(data)
+    if size is None:
+        return cv2.imdecode(nparr, full_mode)
+    width, height = size
+    if width * height <= max_pixels and (not max_side or max(width, height) <= max_side):
+        return cv2.imdecode(nparr, full_mode)
+
+    if width * height > max_pixels:
+        IMAGE_BUDGET.inc(action="downscaled")
+    factor = reduction_factor(width, height, max_pixels, max_side)
+    reduced_modes = REDUCED_COLOR_MODES if color else REDUCED_MODES
+    image = cv2.imdecode(nparr, reduced_modes[factor] if factor > 1 else full_mode)
+    if image is None:
+        return None
+
+    pixels = image.shape[0] * image.shape[1]
+    scale = min(1.0, (max_pixels / pixels) ** 0.5)
+    if max_side:
+        scale = min(scale, max_side / max(image.shape[:2]))
+    if scale < 1.0:
+        new_size = (max(1, int(image.shape[1] * scale)), max(1, int(image.shape[0] * scale)))
+        image = cv2.resize(image, new_size, interpolation=cv2.INTER_AREA)
+    return image
+
+def map_file(fileobj):
+    """
+    Memory-map an open file read-only
+
+    The mapping is backed by the page cache rather than process memory, so
+    the kernel can drop its pages under pressure and concurrent requests do
+    not each hold a private copy of the compressed upload. It stays valid
+    after the file itself is closed.
+
+    Returns:
+        mmap object usable wherever image bytes are (slicing, len, buffer
+        protocol), or empty bytes for an empty file
+    """
+    fileobj.flush()
+    if os.fstat(fileobj.fileno()).st_size == 0:
+        return b""
+    return mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+
+def release_upload(data):
+    """Unmap a memory-mapped upload once it is decoded (no-op for bytes)"""
+    if isinstance(data, mmap.mmap):
+        try:
+            data.close()
+        except BufferError:
+            # Still exported to an array; it is unmapped when that is freed
+            pass
+
+def estimate_peak_bytes(operation, pixels):
+    """Estimate the peak memory an operation allocates for an image of this many pixels"""
+    return BYTES_PER_PIXEL.get(operation, 8) * pixels
+
+# tracemalloc is process-wide, so at most one operation is measured at a time
+_trace_lock = threading.Lock()
+
+def traced_call(fn, *args):
+    """
+    Call fn(*args), measuring its peak traced memory on a sample of calls
+
+    The peak is process-wide, so allocations of operations running
+    concurrently on other threads are included: an upper bound.
+
+    Returns:
+        (result of fn, peak bytes or None when this call was not measured)
+    """
+    if random.random() >= MEMORY_TRACE_SAMPLE_RATE or not _trace_lock.acquire(blocking=False):
+        return fn(*args), None
+    try:
+        tracemalloc.start()
+        try:
+            result = fn(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return result, peak
+    finally:
+        _trace_lock.release()
@@ -0,0 +1,468 @@
+import asyncio
+import contextvars
+import hashlib
+import itertools
+import json
+import os
+import secrets
+import sqlite3
+import time
+
+from fastapi.responses import Response
+
+from utils.metrics import StageTimer, current_timer
+from utils.shared_store import shared_store
+from utils.worker_pool import MAX_WORKERS
+
+# Progress reported when a stage of a job starts. Operations give no finer
+# signal than their stages, so "process" spans most of the range.
+STAGE_PROGRESS = {
+    "read": 0.0,
+    "load": 0.05,
+    "decode": 0.05,
+    "color": 0.15,
+    "pyramid": 0.2,
+    "process": 0.2,
+    "hist": 0.75,
+    "encode": 0.8,
+    "spill": 0.9,
+    "base64": 0.9,
+    "json": 0.95,
+}
+
+# Seconds between reads of the shared store while following a job of another worker
+JOB_POLL_SECONDS = 0.5
+
+# Least seconds between the progress updates of a job written to the shared
+# store; status changes are written at once
+JOB_PUBLISH_SECONDS = 1.0
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue holds its maximum number of jobs or bytes"""
+
+def job_store_key(job_id, part):
+    """Shared store key of a job's "status" record or "result" body"""
+    return hashlib.sha256(f"job:{part}:{job_id}".encode()).hexdigest()
+
+def read_job_record(store, job_id):
+    """Return the status record a worker published for a job, or None"""
+    data = store.get_bytes(job_store_key(job_id, "status"))
+    return json.loads(data) if data is not None else None
+
+class JobTimer(StageTimer):
+    """Stage timer of a job that reports every stage start as job progress"""
+
+    def __init__(self, job):
+        super().__init__()
+        self._job = job
+
+    def begin(self, name):
+        self._job.report(name, STAGE_PROGRESS.get(name))
+
+class Job:
+    """
+    One submitted operation: its state, progress and, once finished, its result
+
+    State changes happen on the event loop; progress reported from worker
+    threads is handed to the loop, so waiters are woken from one thread only.
+    on_change(job) is called after every change.
+    """
+
+    def __init__(self, operation, fn, priority, context, loop, size=0, on_change=None):
+        self.id = secrets.token_hex(16)
+        self.operation = operation
+        self.priority = priority
+        self.size = size
+        self.status = "queued"
+        self.progress = 0.0
+        self.stage = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.status_code = None
+        self.media_type = None
+        self.result = None
+        self.error = None
+        self.timer = JobTimer(self)
+        self.version = 0
+        self.order = None
+        self._fn = fn
+        self._loop = loop
+        self._on_change = on_change
+        self._changed = asyncio.Event()
+        # The job runs in the submitting request's context, with its own timer
+        self.context = context
+        self.context.run(current_timer.set, self.timer)
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def _notify(self):
+        self.version += 1
+        self._changed.set()
+        self._changed = asyncio.Event()
+        if self._on_change is not None:
+            self._on_change(self)
+
+    def report(self, stage, progress):
+        """Record the stage a running job reached (callable from any thread)"""
+        if progress is None or progress <= self.progress:
+            return
+        self.stage = stage
+        self.progress = progress
+        self._loop.call_soon_threadsafe(self._notify)
+
+    def _start(self):
+        self.status = "running"
+        self.started = time.time()
+        # Request timings of a job start when it leaves the queue
+        self.timer.started = time.perf_counter()
+        self._notify()
+
+    def _finish(self, result):
+        if isinstance(result, Response):
+            self.status_code = result.status_code
+            self.media_type = result.media_type
+            self.result = result.body
+        else:
+            self.status_code = 200
+            self.media_type = "application/json"
+            self.result = result
+        if self.status_code >= 400:
+            self.status = "failed"
+            try:
+                self.error = json.loads(self.result).get("error")
+            except (ValueError, AttributeError):
+                self.error = f"Failed with status {self.status_code}"
+        else:
+            self.status = "done"
+            self.progress = 1.0
+        self.finished = time.time()
+        # The operation holds the uploaded images; only the result is kept
+        self._fn = None
+        self.size = 0
+        self._notify()
+
+    def record(self, position=0):
+        """Status of the job as published to the shared store"""
+        return {
+            "id": self.id,
+            "operation": self.operation,
+            "priority": self.priority,
+            "status": self.status,
+            "progress": self.progress,
+            "stage": self.stage,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "statusCode": self.status_code,
+            "mediaType": self.media_type,
+            "error": self.error,
+            "version": self.version,
+            "position": position
+        }
+
+    async def wait(self, version, timeout):
+        """Wait until the job changes after version, or until timeout seconds pass"""
+        if self.version != version:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+class StoredJob:
+    """
+    Read-only view of a job queued on another worker process
+
+    Built from the status record the owning worker publishes to the shared
+    store; the result body is read from the store on access. Changes are
+    not signalled across processes, so wait() polls the store.
+    """
+
+    def __init__(self, store, record):
+        self._store = store
+        self._load(record)
+
+    def _load(self, record):
+        self.id = record["id"]
+        self.operation = record["operation"]
+        self.priority = record["priority"]
+        self.status = record["status"]
+        self.progress = record["progress"]
+        self.stage = record["stage"]
+        self.created = record["created"]
+        self.started = record["started"]
+        self.finished = record["finished"]
+        self.status_code = record["statusCode"]
+        self.media_type = record["mediaType"]
+        self.error = record["error"]
+        self.version = record["version"]
+        self.position = record["position"]
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    @property
+    def result(self):
+        """Result body, or None if the store evicted it"""
+        return self._store.get_bytes(job_store_key(self.id, "result"))
+
+    async def wait(self, version, timeout):
+        """Wait until the job changes after version, or until timeout seconds pass"""
+        deadline = time.monotonic() + timeout
+        while self.version == version and time.monotonic() < deadline:
+            await asyncio.sleep(min(JOB_POLL_SECONDS, deadline - time.monotonic()))
+            record = read_job_record(self._store, self.id)
+            if record is None:
+                # Evicted from the store; end the job for its followers
+                self.status = "failed"
+                self.error = "Job not found or its result expired"
+                self.version += 1
+                return
+            self._load(record)
+
+class JobQueue:
+    """
+    In-process priority queue of operations, drained onto the worker pool.
+
+    As many dispatchers as the pool has workers take the highest priority
+    job (first submitted among equals) whenever one of them is free, so a
+    long queue never floods the pool and urgent jobs skip ahead of waiting
+    ones. Finished jobs keep their result for ttl seconds. At most max_jobs
+    jobs holding at most max_bytes of uploads may be queued or running.
+
+    With a shared store, every change of a job is published to it, so any
+    worker process can report the job and serve its result. Must be used
+    from one event loop.
+    """
+
+    def __init__(self, workers=MAX_WORKERS, max_jobs=1000, max_bytes=1024 * 1024 * 1024,
+                 ttl=600, store=None):
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.store = store
+        self._jobs = {}
+        self._queue = None
+        self._tasks = []
+        self._loop = None
+        self._order = itertools.count()
+        self._publishing = {}
+        self._writes = set()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+
+    def start(self):
+        """Start the dispatchers on the running event loop (no-op if they are already running)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and all(not task.done() for task in self._tasks):
+            return
+        self._loop = loop
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [loop.create_task(self._dispatch()) for _ in range(self.workers)]
+        # Jobs queued on a previous loop can no longer run there
+        for job in self._jobs.values():
+            if job.status == "queued":
+                self._queue.put_nowait((-job.priority, job.order, job))
+
+    async def stop(self):
+        """Cancel the dispatchers and wait for job state being written to the shared store"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        while self._writes:
+            await asyncio.wait(list(self._writes))
+        for state in self._publishing.values():
+            if state["timer"] is not None:
+                state["timer"].cancel()
+        self._publishing.clear()
+        self._tasks = []
+        self._loop = None
+
+    def submit(self, operation, fn, priority=0, size=0):
+        """
+        Queue a job and return it
+
+        Args:
+            operation: Name of the operation, for status and metrics
+            fn: Zero-argument coroutine function returning the JSON body
+                bytes, or an error Response
+            priority: Higher runs first
+            size: Bytes of uploads fn holds until the job finishes
+
+        Raises:
+            JobQueueFull: If max_jobs jobs are queued or running, or their
+                uploads would exceed max_bytes
+        """
+        self.start()
+        self._expire()
+        pending = [job for job in self._jobs.values() if not job.done]
+        if len(pending) >= self.max_jobs:
+            raise JobQueueFull(f"The job queue is full ({self.max_jobs} jobs)")
+        held = sum(job.size for job in pending)
+        # A single job larger than the limit still runs when it is alone
+        if held and held + size > self.max_bytes:
+            raise JobQueueFull(f"The job queue is full ({self.max_bytes} bytes of uploads)")
+        job = Job(operation, fn, priority, contextvars.copy_context(), self._loop, size, self._publish)
+        job.order = next(self._order)
+        self._jobs[job.id] = job
+        self._queue.put_nowait((-priority, job.order, job))
+        self.submitted += 1
+        self._publish(job)
+        return job
+
+    def _publish(self, job):
+        """
+        Write a job's status, and its result once finished, to the shared store
+
+        A status change is written at once, progress at most every
+        JOB_PUBLISH_SECONDS (the latest progress is written when the interval
+        ends). Writes run in a thread, one at a time per job, so the event
+        loop never waits on the store and records land in order.
+        """
+        if self.store is None:
+            return
+        state = self._publishing.setdefault(job.id, {"status": None, "at": 0.0, "timer": None, "writing": False, "dirty": False})
+        if state["writing"]:
+            # Written again with the latest state once the write in flight ends
+            state["dirty"] = True
+            return
+        delay = state["at"] + JOB_PUBLISH_SECONDS - time.monotonic()
+        if job.status != state["status"] or delay <= 0:
+            if state["timer"] is not None:
+                state["timer"].cancel()
+            self._write(job, state)
+        elif state["timer"] is None:
+            state["timer"] = self._loop.call_later(delay, self._write, job, state)
+
+    def _write(self, job, state):
+        state.update(status=job.status, at=time.monotonic(), timer=None, writing=True, dirty=False)
+        record = json.dumps(job.record(self.position(job))).encode()
+        task = self._loop.create_task(
+            asyncio.to_thread(self._store_job, job.id, record, job.result if job.done else None)
+        )
+        self._writes.add(task)
+        task.add_done_callback(lambda _: self._written(job, state, task))
+
+    def _written(self, job, state, task):
+        self._writes.discard(task)
+        state["writing"] = False
+        if state["dirty"]:
+            self._publish(job)
+        elif job.done:
+            # A finished job never changes again
+            self._publishing.pop(job.id, None)
+
+    def _store_job(self, job_id, record, result):
+        if result is not None:
+            try:
+                self.store.put_bytes(job_store_key(job_id, "result"), result)
+            except (OSError, sqlite3.Error) as e:
+                # Other workers then report the result as expired
+                print(f"Failed to publish the result of job {job_id}: {str(e)}")
+        try:
+            self.store.put_bytes(job_store_key(job_id, "status"), record)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Failed to publish job {job_id}: {str(e)}")
+
+    def get(self, job_id):
+        """
+        Return a job by ID, or None if it is unknown or its result expired
+
+        Jobs of other worker processes are returned as a StoredJob.
+        """
+        self._expire()
+        job = self._jobs.get(job_id)
+        if job is not None or self.store is None:
+            return job
+        record = read_job_record(self.store, job_id)
+        if record is None or (record["finished"] and record["finished"] < time.time() - self.ttl):
+            return None
+        return StoredJob(self.store, record)
+
+    def position(self, job):
+        """
+        Number of queued jobs that will start before a queued job
+
+        For a job of another worker, the position when it last changed.
+        """
+        if job.id not in self._jobs:
+            return job.position
+        if job.status != "queued":
+            return 0
+        rank = (-job.priority, job.order)
+        return sum(
+            1 for other in self._jobs.values()
+            if other.status == "queued" and (-other.priority, other.order) < rank
+        )
+
+    async def _dispatch(self):
+        while True:
+            _, _, job = await self._queue.get()
+            if job.status != "queued":
+                continue
+            job._start()
+            try:
+                # A task created inside the job's context runs in (a copy of) it
+                result = await job.context.run(asyncio.ensure_future, job._fn())
+            except Exception as e:
+                print(f"Job {job.id} ({job.operation}) failed: {str(e)}")
+                result = Response(
+                    content=json.dumps({"error": f"Failed to process image: {str(e)}"}),
+                    status_code=500, media_type="application/json"
+                )
+            job._finish(result)
+            if job.status == "done":
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done and job.finished < cutoff]:
+            del self._jobs[job_id]
+            self.expired += 1
+
+    def stats(self):
+        self._expire()
+        statuses = [job.status for job in self._jobs.values()]
+        return {
+            "workers": self.workers,
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running"),
+            "finished": statuses.count("done") + statuses.count("failed"),
+            "maxJobs": self.max_jobs,
+            "bytes": sum(job.size for job in self._jobs.values()),
+            "maxBytes": self.max_bytes,
+            "shared": self.store is not None,
+            "ttlSeconds": self.ttl,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "expired": self.expired,
+            "dispatchersRunning": any(not task.done() for task in self._tasks)
+        }
+
+# Job state goes through the cross-process store when several workers serve
+# the app, so a job can be followed and fetched from any of them
+SHARED_JOBS = os.environ.get(
+    "SHARED_JOB_STATE", "1" if int(os.environ.get("WEB_CONCURRENCY", 1)) > 1 else "0"
+) == "1"
+
+# Jobs submitted through /image/jobs
+job_queue = JobQueue(
+    max_jobs=int(os.environ.get("JOB_QUEUE_MAX", 1000)),
+    max_bytes=int(os.environ.get("JOB_QUEUE_MAX_BYTES", 1024 * 1024 * 1024)),
+    ttl=float(os.environ.get("JOB_RESULT_TTL_SECONDS", 600)),
+    store=shared_store if SHARED_JOBS else None
+)
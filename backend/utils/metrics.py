@@ -0,0 +1,188 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Request stages in the order they normally happen; "process" is the time
+# spent in the operation itself, excluding the nested stages it calls
+STAGES = ["read", "queue", "load", "decode", "color", "pyramid", "process", "hist", "encode", "spill", "base64", "json"]
+
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PIXEL_BUCKETS = (65536, 262144, 1048576, 4194304, 16777216, 67108864, 268435456)
+BYTE_BUCKETS = (16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+MEMORY_BUCKETS = tuple(1 << shift for shift in range(20, 36, 2))
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{str(value)}"' for key, value in labels)
+    return "{" + pairs + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels, in Prometheus layout"""
+
+    def __init__(self, name, help, buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts, then sum and count
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = key + (("le", _format_value(float(bound))),)
+                    lines.append(f"{self.name}_bucket{_format_labels(labels)} {cumulative}")
+                labels = key + (("le", "+Inf"),)
+                lines.append(f"{self.name}_bucket{_format_labels(labels)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+def render_gauge(name, help, samples, kind="gauge"):
+    """
+    Render a gauge computed at scrape time
+
+    Args:
+        samples: A number, or a dictionary of {label dict as tuple pairs: value}
+        kind: Prometheus metric type
+    """
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    if not isinstance(samples, dict):
+        samples = {(): samples}
+    for key, value in samples.items():
+        lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+    return lines
+
+def render_counter(name, help, samples):
+    """Render a monotonic total kept elsewhere (name without the _total suffix) as a counter"""
+    return render_gauge(f"{name}_total", help, samples, kind="counter")
+
+# Metrics recorded by the image router
+REQUEST_SECONDS = Histogram("image_request_seconds", "Total time spent handling an image request")
+STAGE_SECONDS = Histogram("image_stage_seconds", "Time spent in each stage of an image request")
+REQUESTS = Counter("image_requests_total", "Image requests by operation, status and cache outcome")
+IMAGE_PIXELS = Histogram("image_input_pixels", "Pixel count of decoded input images", PIXEL_BUCKETS)
+UPLOAD_BYTES = Histogram("image_upload_bytes", "Size of uploaded image files", BYTE_BUCKETS)
+PEAK_MEMORY = Histogram("image_peak_memory_bytes", "Peak memory traced while decoding and processing (sampled)",
+                        MEMORY_BUCKETS)
+ESTIMATED_MEMORY = Histogram("image_estimated_memory_bytes", "Estimated peak memory of each operation",
+                             MEMORY_BUCKETS)
+IMAGE_BUDGET = Counter("image_pixel_budget_total", "Images over the pixel budget by action taken")
+
+METRICS = [REQUEST_SECONDS, STAGE_SECONDS, REQUESTS, IMAGE_PIXELS, UPLOAD_BYTES,
+           PEAK_MEMORY, ESTIMATED_MEMORY, IMAGE_BUDGET]
+
+class StageTimer:
+    """
+    Collects the duration of each stage of one request.
+
+    Stages nest: time spent in an inner stage is subtracted from the stage
+    that encloses it, so the durations add up to the instrumented time.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.cache = "miss"
+        self._children = []
+
+    def begin(self, name):
+        """Called when a stage starts; subclasses use it to report progress"""
+
+    def add(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Format the stage durations as a Server-Timing header value (milliseconds)"""
+        names = [name for name in STAGES if name in self.durations]
+        names += [name for name in self.durations if name not in STAGES]
+        entries = [f"{name};dur={self.durations[name] * 1e3:.2f}" for name in names]
+        entries.append(f"total;dur={self.elapsed() * 1e3:.2f}")
+        return ", ".join(entries)
+
+# Timer of the request being handled; worker pool jobs run in a copy of the
+# caller's context, so stages inside them are attributed to the same request
+current_timer = contextvars.ContextVar("current_timer", default=None)
+
+@contextmanager
+def stage(name):
+    """Time a block as the given stage of the current request (no-op outside one)"""
+    timer = current_timer.get()
+    if timer is None:
+        yield
+        return
+    timer.begin(name)
+    timer._children.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = timer._children.pop()
+        timer.add(name, elapsed - nested)
+        if timer._children:
+            timer._children[-1] += elapsed
+
+def observe_request(operation, timer, status):
+    """Record a finished request's stage and total durations"""
+    for name, seconds in timer.durations.items():
+        STAGE_SECONDS.observe(seconds, operation=operation, stage=name)
+    REQUEST_SECONDS.observe(timer.elapsed(), operation=operation)
+    REQUESTS.inc(operation=operation, status=status, cache=timer.cache)
+
+def render_metrics(*gauges):
+    """Render every registered metric plus the given gauge line groups as Prometheus text"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    for group in gauges:
+        lines.extend(group)
+    return "\n".join(lines) + "\n"
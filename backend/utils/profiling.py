@@ -0,0 +1,146 @@
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+
+# Requests whose X-Profile header carries PROFILE_TOKEN are profiled. A
+# profiled request bypasses the caches and writes files, so the header is
+# ignored unless a token is configured. PROFILE_SAMPLE_RATE additionally
+# profiles a random fraction of requests.
+PROFILE_HEADER = "x-profile"
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.0))
+
+_PROFILE_ID = re.compile(r"^[0-9]{8}-[0-9]{9}-[0-9a-f]{8}$")
+
+def profile_authorized(headers):
+    """Whether the X-Profile header carries the configured token (never without one)"""
+    token = headers.get(PROFILE_HEADER)
+    return bool(PROFILE_TOKEN and token and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode()))
+
+def profile_requested(headers):
+    """Decide whether a request with these headers should run under the profiler"""
+    if profile_authorized(headers):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+class ProfileStore:
+    """
+    Directory of saved profiles, keeping only the most recent ones.
+
+    Each profile is stored as <id>.prof (pstats data, loadable by snakeviz,
+    flameprof or gprof2dot for call-tree and flame-graph views), <id>.txt
+    (a readable call tree summary) and <id>.json (request metadata).
+    """
+
+    def __init__(self, directory="profiles", keep=20):
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def new_id(self):
+        # Timestamp to the millisecond first, so IDs sort by creation time
+        now = datetime.now()
+        return f"{now.strftime('%Y%m%d-%H%M%S')}{now.microsecond // 1000:03d}-{uuid.uuid4().hex[:8]}"
+
+    def path(self, profile_id, kind):
+        """Return the file path of a profile artifact (None for malformed IDs)"""
+        if not _PROFILE_ID.match(profile_id) or kind not in ("prof", "txt", "json"):
+            return None
+        return os.path.join(self.directory, f"{profile_id}.{kind}")
+
+    def _names(self):
+        # The directory is created by the first save
+        try:
+            return os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+
+    def save(self, profile_id, profiler, meta):
+        """Write the artifacts of a finished profile and prune old ones"""
+        os.makedirs(self.directory, exist_ok=True)
+        stats_text = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stats_text)
+        stats.sort_stats("cumulative").print_stats(50)
+        stats.print_callees(20)
+
+        header = "".join(f"{key}: {value}\n" for key, value in meta.items())
+        with open(self.path(profile_id, "txt"), "w") as f:
+            f.write(header + "\n" + stats_text.getvalue())
+        with open(self.path(profile_id, "json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        # Written last: a profile is listed once its .prof file exists
+        profiler.dump_stats(self.path(profile_id, "prof"))
+        self.prune()
+
+    def list(self):
+        """Return metadata of the stored profiles, newest first"""
+        profiles = []
+        for name in sorted(self._names(), reverse=True):
+            profile_id, ext = os.path.splitext(name)
+            if ext != ".prof":
+                continue
+            try:
+                with open(self.path(profile_id, "json")) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = {}
+            profiles.append({"id": profile_id, **meta})
+        return profiles
+
+    def prune(self):
+        """Delete all but the newest `keep` profiles"""
+        with self._lock:
+            ids = sorted(
+                {os.path.splitext(name)[0] for name in self._names()
+                 if _PROFILE_ID.match(os.path.splitext(name)[0])},
+                reverse=True
+            )
+            for profile_id in ids[self.keep:]:
+                for kind in ("prof", "txt", "json"):
+                    try:
+                        os.remove(self.path(profile_id, kind))
+                    except FileNotFoundError:
+                        pass
+
+profile_store = ProfileStore(
+    directory=os.environ.get("PROFILE_DIR", "profiles"),
+    keep=int(os.environ.get("PROFILE_KEEP", 20))
+)
+
+# Only one profiler can be active at a time, so concurrent profile requests
+# run unprofiled rather than queueing behind each other
+_profiler_lock = threading.Lock()
+
+def profile_call(meta, fn, *args):
+    """
+    Run fn(*args) under cProfile in the current thread and save the profile
+
+    Returns:
+        (result of fn, profile ID or None if another profile was running)
+    """
+    if not _profiler_lock.acquire(blocking=False):
+        return fn(*args), None
+    try:
+        profile_id = profile_store.new_id()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            result = fn(*args)
+        finally:
+            profiler.disable()
+        meta = {**meta, "created": datetime.now().isoformat(timespec="seconds"),
+                "seconds": round(time.perf_counter() - start, 6)}
+        profile_store.save(profile_id, profiler, meta)
+        return result, profile_id
+    finally:
+        _profiler_lock.release()
@@ -0,0 +1,176 @@
+import hashlib
+import threading
+
+import cv2
+
+from utils.metrics import stage
+from utils.shared_store import EntryTooLarge, shared_store
+
+# Images served for each pyramid level: Gaussian levels, Laplacian levels
+# (displayed with +128) and the reconstruction starting from a level
+KINDS = ("gaussian", "laplacian", "reconstructed")
+
+# Smallest side of the last level listed when no level count is requested
+MIN_LEVEL_SIDE = 8
+
+def level_size(width, height, level):
+    """(width, height) of a pyramid level; cv2.pyrDown rounds odd sizes up"""
+    for _ in range(level):
+        width, height = (width + 1) // 2, (height + 1) // 2
+    return width, height
+
+def max_levels(width, height):
+    """Number of levels until the image is one pixel on its shorter side"""
+    levels = 1
+    while min(width, height) > 1:
+        width, height = level_size(width, height, 1)
+        levels += 1
+    return levels
+
+def default_levels(width, height):
+    """Number of levels whose shorter side is at least MIN_LEVEL_SIDE (at least 1)"""
+    levels = 1
+    while min(level_size(width, height, levels)) >= MIN_LEVEL_SIDE:
+        levels += 1
+    return levels
+
+class PyramidCache:
+    """
+    Pyramid levels of stored images, built and PNG-encoded on first access.
+
+    Levels are derived from the decoded image held in the shared store under
+    its image ID and are stored back in it under derived keys, so every
+    worker process reuses them and they are evicted with the rest of the
+    store. Each Gaussian level is built from the previous one, so asking for
+    a deep level only runs the pyrDown steps that are missing. Other
+    features that need a downscaled copy of a stored image can use
+    gaussian() directly.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self.built = 0
+        self.encoded = 0
+        self.encoded_hits = 0
+
+    def key(self, image_id, kind, level, encoded=False):
+        """Shared store key of a level array, or of its PNG with encoded"""
+        name = f"{image_id}:pyramid:{kind}:{level}:{'png' if encoded else 'array'}"
+        return hashlib.sha256(name.encode()).hexdigest()
+
+    def _save(self, put, key, value):
+        # A level larger than the whole store is rebuilt on every access instead
+        try:
+            put(key, value)
+        except EntryTooLarge:
+            pass
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def gaussian(self, image_id, level, view=False):
+        """
+        Return Gaussian level (0 is the stored image), or None if the image was evicted
+
+        With view, a level already in the store is returned as a read-only
+        memory map, for callers that only read a small region of it.
+        """
+        get = self.store.view_array if view else self.store.get_array
+        if level == 0:
+            return get(image_id)
+        key = self.key(image_id, "gaussian", level)
+        image = get(key)
+        if image is not None:
+            return image
+        parent = self.gaussian(image_id, level - 1, view)
+        if parent is None:
+            return None
+        with stage("pyramid"):
+            image = cv2.pyrDown(parent)
+        self._save(self.store.put_array, key, image)
+        self._count("built")
+        return image
+
+    def laplacian(self, image_id, level, last):
+        """
+        Return Laplacian level (the saturated difference, without the +128
+        display offset), or None if the image was evicted
+
+        The last level of a pyramid is its Gaussian level.
+        """
+        if level == last:
+            return self.gaussian(image_id, level)
+        key = self.key(image_id, "laplacian", level)
+        image = self.store.get_array(key)
+        if image is not None:
+            return image
+        current = self.gaussian(image_id, level)
+        smaller = self.gaussian(image_id, level + 1)
+        if current is None or smaller is None:
+            return None
+        with stage("pyramid"):
+            expanded = cv2.pyrUp(smaller, dstsize=(current.shape[1], current.shape[0]))
+            image = cv2.subtract(current, expanded)
+        self._save(self.store.put_array, key, image)
+        self._count("built")
+        return image
+
+    def reconstructed(self, image_id, top):
+        """Rebuild level 0 from Gaussian level top and the Laplacian levels below it"""
+        image = self.gaussian(image_id, top)
+        for level in range(top - 1, -1, -1):
+            laplacian = self.laplacian(image_id, level, top)
+            if image is None or laplacian is None:
+                return None
+            with stage("pyramid"):
+                expanded = cv2.pyrUp(image, dstsize=(laplacian.shape[1], laplacian.shape[0]))
+                image = cv2.add(expanded, laplacian)
+        return image
+
+    def png(self, image_id, kind, level, last=None):
+        """
+        Return a level encoded as PNG, encoding it on first access
+
+        Args:
+            kind: One of KINDS
+            level: Pyramid level; for reconstructed, the level it starts from
+            last: Last level of the pyramid (laplacian only; its last level
+                is the Gaussian level)
+
+        Returns:
+            PNG bytes, or None if the image was evicted
+        """
+        if kind == "laplacian" and level == last:
+            kind = "gaussian"
+        key = self.key(image_id, kind, level, encoded=True)
+        data = self.store.get_bytes(key)
+        if data is not None:
+            self._count("encoded_hits")
+            return data
+
+        if kind == "gaussian":
+            image = self.gaussian(image_id, level)
+        elif kind == "laplacian":
+            image = self.laplacian(image_id, level, last)
+            if image is not None:
+                # Same display offset as the /pyramids response
+                image = cv2.add(image, 128)
+        else:
+            image = self.reconstructed(image_id, level)
+        if image is None:
+            return None
+        with stage("encode"):
+            _, buf = cv2.imencode('.png', image)
+        data = buf.tobytes()
+        self._save(self.store.put_bytes, key, data)
+        self._count("encoded")
+        return data
+
+    def stats(self):
+        with self._lock:
+            return {"built": self.built, "encoded": self.encoded, "encodedHits": self.encoded_hits}
+
+# Pyramids of the images uploaded to /images, shared by every worker process
+pyramid_cache = PyramidCache(shared_store)
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from utils.shared_store import shared_store
+
+def make_cache_key(operation, contents, params):
+    """
+    Build a content-addressed cache key for an operation request
+
+    Args:
+        operation: Name of the router operation
+        contents: List of raw uploaded image bytes
+        params: Dictionary of operation parameters
+    """
+    digest = hashlib.sha256()
+    digest.update(operation.encode('utf-8'))
+    for data in contents:
+        # Hash each image separately so the boundaries between uploads count
+        digest.update(hashlib.sha256(data).digest())
+    canonical = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+    digest.update(canonical.encode('utf-8'))
+    return digest.hexdigest()
+
+def etag_matches(if_none_match, etag):
+    """Check whether an If-None-Match header value matches the given ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == '*' or candidate == etag:
+            return True
+    return False
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of encoded responses bounded by entry count and bytes
+
+    With a shared store, local misses fall back to the store and every new
+    value is also written to it, so results computed by one worker process
+    are served by all of them.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=256 * 1024 * 1024, shared=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shared_failures = 0
+
+    def get(self, key, shared=True):
+        """
+        Return the cached value for key (marking it recently used) or None
+
+        With shared=False only this process's entries are looked up and a
+        miss is not counted, so callers can skip the shared store's blocking
+        lookup when the value is held locally.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            if not shared and self.shared is not None:
+                return None
+
+        value = self.shared.get_bytes(key) if self.shared is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.shared_hits += 1
+        self._store_local(key, value)
+        return value
+
+    def put(self, key, value):
+        """
+        Store value under key, evicting least recently used entries if needed
+
+        A failed write to the shared store is counted and the value is still
+        kept locally.
+        """
+        if self.shared is not None:
+            try:
+                self.shared.put_bytes(key, value)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Failed to share cached result {key}: {str(e)}")
+                with self._lock:
+                    self.shared_failures += 1
+        self._store_local(key, value)
+
+    def _store_local(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = value
+            self._size += len(value)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """Return a snapshot of the cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "maxEntries": self.max_entries,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "sharedHits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "sharedFailures": self.shared_failures,
+                "hitRate": self.hits / lookups if lookups else 0.0
+            }
+
+# Results go through the cross-process store when several workers serve the
+# app (uvicorn reads WEB_CONCURRENCY as its worker count)
+SHARED_RESULTS = os.environ.get(
+    "SHARED_RESULT_CACHE", "1" if int(os.environ.get("WEB_CONCURRENCY", 1)) > 1 else "0"
+) == "1"
+
+# Shared cache used by the image router
+result_cache = ResultCache(
+    max_entries=int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", 256)),
+    max_bytes=int(os.environ.get("RESULT_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+    shared=shared_store if SHARED_RESULTS else None
+)
@@ -0,0 +1,79 @@
+import re
+
+# Extra margin for Canny: hysteresis follows weak edges across the image, so
+# no finite halo is exact; beyond 64 pixels a different result is rare
+CANNY_HYSTERESIS_MARGIN = 64
+
+_ROI = re.compile(r"^\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*$")
+
+def _odd(size):
+    return size + 1 if size % 2 == 0 else size
+
+def _kernel_halo(params):
+    # Even kernel sizes are rounded up to odd by the operations
+    return _odd(int(params.get("kernel_size") or 1)) // 2
+
+def _bilateral_halo(params):
+    d = int(params.get("d") or 0)
+    if d <= 0:
+        # OpenCV derives the radius from sigma_space
+        return round(float(params.get("sigma_space") or 0) * 1.5)
+    return d // 2
+
+def _filter_sequence_halo(params):
+    # Each min/max filter is 3x3
+    return len(str(params.get("filter_sequence") or "").split(","))
+
+def _canny_halo(params):
+    # Gaussian blur radius, Sobel and non-maximum suppression, hysteresis margin
+    return round(3 * float(params.get("sigma") or 1)) + 2 + CANNY_HYSTERESIS_MARGIN
+
+# Operations that can process a region of interest, with the halo (pixels of
+# context on each side) they need so the processed patch matches the same
+# region of the fully processed image. Global operations (contrast,
+# equalize, Fourier, ...) depend on the whole frame and are not listed.
+ROI_HALOS = {
+    "brightness": lambda params: 0,
+    "gamma": lambda params: 0,
+    "compute-histogram": lambda params: 0,
+    "median-filter": _kernel_halo,
+    "mean-filter": _kernel_halo,
+    "convolution": _kernel_halo,
+    "bilateral": _bilateral_halo,
+    "apply-filter": _filter_sequence_halo,
+    "canny-edge": _canny_halo,
+}
+
+def parse_roi(text):
+    """
+    Parse an "x,y,w,h" region of interest
+
+    Raises:
+        ValueError: If it is not four non-negative integers with a positive size
+    """
+    match = _ROI.match(text)
+    if match is None:
+        raise ValueError("roi must be x,y,w,h in pixels")
+    x, y, width, height = (int(value) for value in match.groups())
+    if width == 0 or height == 0:
+        raise ValueError("roi width and height must be positive")
+    return x, y, width, height
+
+def roi_bounds(roi, halo, width, height):
+    """
+    Clip a region of interest to an image and grow it by a halo
+
+    Returns:
+        ((x0, y0, x1, y1) of the clipped region, (x0, y0, x1, y1) of the
+        patch to process: the region plus halo, clipped to the image)
+
+    Raises:
+        ValueError: If the region lies outside the image
+    """
+    x, y, roi_width, roi_height = roi
+    x0, y0 = min(x, width), min(y, height)
+    x1, y1 = min(x + roi_width, width), min(y + roi_height, height)
+    if x0 >= x1 or y0 >= y1:
+        raise ValueError(f"roi is outside the {width}x{height} image")
+    patch = (max(0, x0 - halo), max(0, y0 - halo), min(width, x1 + halo), min(height, y1 + halo))
+    return (x0, y0, x1, y1), patch
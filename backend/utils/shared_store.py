@@ -0,0 +1,211 @@
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+_KEY = re.compile(r"^[0-9a-f]{64}$")
+
+def default_directory():
+    """Shared-memory filesystem when available, so entries live in RAM shared by all workers"""
+    user = os.getuid() if hasattr(os, "getuid") else "user"
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, f"image-processing-{user}")
+
+class EntryTooLarge(OSError):
+    """Raised when an entry is larger than the whole store, so it cannot be kept"""
+
+    def __init__(self, size, max_bytes):
+        super().__init__(f"Entry of {size} bytes is larger than the shared store ({max_bytes} bytes)")
+        self.size = size
+
+class SharedStore:
+    """
+    Cross-process LRU store for encoded results and decoded images.
+
+    Every entry is a file in a shared-memory directory (tmpfs: /dev/shm on
+    Linux), so all worker processes on the host see the same entries and the
+    kernel handles allocation within the arena. A SQLite index in the same
+    directory records each entry's size, metadata and last use; writers take
+    the database lock to insert and evict least recently used entries until
+    the total fits max_bytes. Files are written to a temporary name and
+    renamed into place, so readers never see partial entries.
+    """
+
+    def __init__(self, directory=None, max_bytes=1024 * 1024 * 1024):
+        self.directory = directory or default_directory()
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, kind TEXT NOT NULL, size INTEGER NOT NULL,"
+                " meta TEXT, last_used REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+
+    def _connect(self):
+        # SQLite connections cannot be shared across threads; keep one per thread
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"), timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=OFF")
+            self._local.db = db
+        return db
+
+    def _path(self, key, kind):
+        if not _KEY.match(key):
+            raise ValueError(f"Invalid store key: {key!r}")
+        return os.path.join(self.directory, f"{key}.{kind}")
+
+    def _count(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _put(self, key, kind, data, meta=None):
+        size = len(data) if isinstance(data, bytes) else data.nbytes
+        if size > self.max_bytes:
+            raise EntryTooLarge(size, self.max_bytes)
+        path = self._path(key, kind)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data if isinstance(data, bytes) else memoryview(data).cast("B"))
+        os.replace(tmp, path)
+
+        db = self._connect()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(
+                "INSERT OR REPLACE INTO entries (key, kind, size, meta, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, size, json.dumps(meta) if meta else None, time.time())
+            )
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            while total > self.max_bytes:
+                oldest = db.execute(
+                    "SELECT key, kind, size FROM entries ORDER BY last_used LIMIT 16"
+                ).fetchall()
+                for old_key, old_kind, old_size in oldest:
+                    if total <= self.max_bytes:
+                        break
+                    db.execute("DELETE FROM entries WHERE key = ?", (old_key,))
+                    try:
+                        os.remove(self._path(old_key, old_kind))
+                    except FileNotFoundError:
+                        pass
+                    total -= old_size
+
+    def _lookup(self, key, kind):
+        """Return (path, meta) for a live entry, marking it recently used, or None"""
+        if not _KEY.match(key):
+            return None
+        db = self._connect()
+        row = db.execute("SELECT meta, last_used FROM entries WHERE key = ? AND kind = ?", (key, kind)).fetchone()
+        if row is None:
+            self._count(False)
+            return None
+        now = time.time()
+        if now - row[1] > 1.0:
+            # Refresh the LRU position at most once a second per entry
+            with db:
+                db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+        self._count(True)
+        return self._path(key, kind), json.loads(row[0]) if row[0] else None
+
+    def put_bytes(self, key, data):
+        """
+        Store an encoded result
+
+        Raises:
+            EntryTooLarge: If data is larger than max_bytes
+        """
+        self._put(key, "bin", data)
+
+    def get_bytes(self, key):
+        """Return a stored encoded result, or None"""
+        found = self._lookup(key, "bin")
+        if found is None:
+            return None
+        try:
+            with open(found[0], "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            # Evicted by another worker between the lookup and the read
+            return None
+
+    def put_array(self, key, array):
+        """
+        Store a decoded image (any contiguous NumPy array)
+
+        Raises:
+            EntryTooLarge: If the array is larger than max_bytes
+        """
+        array = np.ascontiguousarray(array)
+        self._put(key, "npy", array, {"shape": list(array.shape), "dtype": array.dtype.str})
+
+    def get_array(self, key):
+        """Return a private copy of a stored array, or None"""
+        found = self._lookup(key, "npy")
+        if found is None:
+            return None
+        path, meta = found
+        try:
+            return np.fromfile(path, dtype=np.dtype(meta["dtype"])).reshape(meta["shape"])
+        except FileNotFoundError:
+            return None
+
+    def view_array(self, key):
+        """
+        Return a read-only memory-mapped view of a stored array, or None
+
+        Only the pages that are read are touched, so a caller slicing a
+        small region of a large image never copies the rest of it. The map
+        stays valid if the entry is evicted or replaced while it is in use.
+        """
+        found = self._lookup(key, "npy")
+        if found is None:
+            return None
+        path, meta = found
+        try:
+            return np.memmap(path, dtype=np.dtype(meta["dtype"]), mode="r", shape=tuple(meta["shape"]))
+        except FileNotFoundError:
+            return None
+
+    def array_info(self, key):
+        """Return the shape and dtype of a stored array without reading it, or None"""
+        found = self._lookup(key, "npy")
+        return None if found is None else found[1]
+
+    def stats(self):
+        """Return the entry count and size shared by all workers plus this worker's hit counts"""
+        entries, total = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "directory": self.directory,
+                "entries": entries,
+                "bytes": total,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0
+            }
+
+# Store shared by every worker process on this host
+shared_store = SharedStore(
+    directory=os.environ.get("SHARED_STORE_DIR") or None,
+    max_bytes=int(os.environ.get("SHARED_STORE_MAX_BYTES", 1024 * 1024 * 1024))
+)
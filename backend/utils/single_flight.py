@@ -0,0 +1,62 @@
+import asyncio
+
+class _Call:
+    """An in-progress computation and the number of requests waiting on it"""
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into a single computation.
+
+    The first caller for a key starts the work as an independent task; callers
+    arriving while it runs wait on the same task and share its result (or
+    exception). The task is shielded so a disconnecting client does not cancel
+    the computation for everyone else. Must be used from one event loop.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.executions = 0
+        self.deduplicated = 0
+        self.peak_waiters = 0
+
+    async def do(self, key, fn):
+        """
+        Return the result of fn() for key, sharing it with concurrent callers
+
+        Args:
+            key: Hashable identity of the computation
+            fn: Zero-argument coroutine function performing the work
+        """
+        call = self._calls.get(key)
+        if call is None:
+            task = asyncio.ensure_future(fn())
+            call = _Call(task)
+            self._calls[key] = call
+            self.executions += 1
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.deduplicated += 1
+
+        call.waiters += 1
+        self.peak_waiters = max(self.peak_waiters, call.waiters)
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+
+    def stats(self):
+        """Return a snapshot of in-flight work and waiter counters"""
+        return {
+            "inFlight": len(self._calls),
+            "waiters": sum(call.waiters for call in self._calls.values()),
+            "executions": self.executions,
+            "deduplicated": self.deduplicated,
+            "peakWaiters": self.peak_waiters
+        }
+
+# Shared single-flight group used by the image router
+single_flight = SingleFlight()
@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+_NAME = re.compile(r"^[0-9a-f]{32}\.[a-z0-9]{1,8}$")
+
+class SpillStore:
+    """
+    Size-bounded on-disk store for large results served by reference.
+
+    Entries are content-addressed files in one directory, written to a
+    temporary name and renamed into place so readers never see partial
+    files. A file's modification time is its last use: reads refresh it, and
+    a background asyncio janitor periodically removes entries unused for
+    longer than ttl and then the least recently used ones until the total
+    fits max_bytes. All state lives on disk, so every worker process sharing
+    the directory sees and evicts the same entries.
+
+    Uploads that must outlive a request are spooled under spool/ in the same
+    directory and removed by their owner; the janitor only clears leftovers
+    older than ttl.
+    """
+
+    def __init__(self, directory="temp", max_bytes=2 * 1024 * 1024 * 1024, ttl=3600, interval=60):
+        self.directory = directory
+        self.spool_directory = os.path.join(directory, "spool")
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._task = None
+        self._wake = None
+        self._loop = None
+        self.evictions = 0
+        self.sweeps = 0
+
+    def _ensure_directories(self):
+        os.makedirs(self.spool_directory, exist_ok=True)
+
+    def path(self, name):
+        """Return the path of a stored entry, marking it recently used, or None"""
+        if not _NAME.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        try:
+            if time.time() - os.stat(path).st_mtime > 1.0:
+                # Refresh the LRU position at most once a second per entry
+                os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, data, suffix=".png"):
+        """Store bytes and return the entry name; identical data shares one entry"""
+        self._ensure_directories()
+        name = hashlib.sha256(data).hexdigest()[:32] + suffix
+        if self.path(name) is not None:
+            return name
+        path = os.path.join(self.directory, name)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+        with self._lock:
+            self._bytes += len(data)
+            over = self._bytes > self.max_bytes
+        if over and self._loop is not None:
+            # Writers run on worker threads; wake the janitor on its own loop
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return name
+
+    def spool(self, fileobj, suffix=".upload"):
+        """Copy a file object to a new spool file and return its path; the caller removes it"""
+        self._ensure_directories()
+        with tempfile.NamedTemporaryFile(delete=False, dir=self.spool_directory, suffix=suffix) as tmp:
+            fileobj.seek(0)
+            shutil.copyfileobj(fileobj, tmp)
+            return tmp.name
+
+    def media_type(self, name):
+        return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+    def sweep(self):
+        """
+        Evict expired entries, then least recently used ones until under max_bytes
+
+        Blocking; the janitor runs it on a thread.
+
+        Returns:
+            Number of files removed
+        """
+        self._ensure_directories()
+        now = time.time()
+        removed = 0
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                # Temporary files of writes that never completed
+                stale = entry.name.endswith(".tmp") and now - stat.st_mtime > self.interval
+                if stale or (_NAME.match(entry.name) and now - stat.st_mtime > self.ttl):
+                    removed += self._remove(entry.path)
+                elif _NAME.match(entry.name):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            removed += self._remove(path)
+            total -= size
+
+        with os.scandir(self.spool_directory) as scan:
+            for entry in scan:
+                if entry.is_file() and now - entry.stat().st_mtime > self.ttl:
+                    removed += self._remove(entry.path)
+
+        with self._lock:
+            self._bytes = total
+            self.evictions += removed
+            self.sweeps += 1
+        return removed
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return 1
+        except FileNotFoundError:
+            # Already evicted by another worker
+            return 0
+
+    async def _janitor(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                print(f"Spill store sweep failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self):
+        """Start the janitor on the running event loop (no-op if it is already running)"""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._wake = asyncio.Event()
+        self._task = loop.create_task(self._janitor())
+
+    async def stop(self):
+        """Cancel the janitor"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._loop = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "ttlSeconds": self.ttl,
+                "evictions": self.evictions,
+                "sweeps": self.sweeps,
+                "janitorRunning": self._task is not None and not self._task.done()
+            }
+
+# Store for results returned by reference and for spooled uploads
+spill_store = SpillStore(
+    directory=os.environ.get("SPILL_DIR", "temp"),
+    max_bytes=int(os.environ.get("SPILL_MAX_BYTES", 2 * 1024 * 1024 * 1024)),
+    ttl=float(os.environ.get("SPILL_TTL_SECONDS", 3600)),
+    interval=float(os.environ.get("SPILL_JANITOR_INTERVAL", 60))
+)
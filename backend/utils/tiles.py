@@ -0,0 +1,110 @@
+import json
+import math
+import os
+
+import cv2
+import numpy as np
+
+from scripts import operations as image_ops
+from utils.metrics import stage
+from utils.pyramid_cache import level_size, pyramid_cache
+from utils.result_cache import ResultCache, make_cache_key
+from utils.roi import ROI_HALOS, roi_bounds
+from utils.shared_store import shared_store
+
+# Side of a square tile in pixels (edge tiles are smaller)
+TILE_SIZE = int(os.environ.get("TILE_SIZE", 256))
+
+# Operation spec serving the stored image itself
+ORIGINAL = "original"
+
+# Operations a tile can show: the region-of-interest operations that return an image
+TILE_OPERATIONS = [name for name in ROI_HALOS if name != "compute-histogram"]
+
+def parse_op_spec(spec):
+    """
+    Parse a tile operation spec: an operation name followed by ;name=value
+    parameters, e.g. "median-filter;kernel_size=5". Values are decoded as
+    JSON when possible, like the batch CLI's -p options.
+
+    Returns:
+        (operation, params)
+
+    Raises:
+        ValueError: If the operation cannot be tiled or a parameter is malformed
+    """
+    operation, *items = spec.split(";")
+    if operation != ORIGINAL and operation not in TILE_OPERATIONS:
+        raise ValueError(
+            f"Tiles support {ORIGINAL}, {', '.join(TILE_OPERATIONS)}; not {operation}"
+        )
+    params = {}
+    for item in items:
+        if "=" not in item:
+            raise ValueError(f"Parameter '{item}' must be name=value")
+        name, value = item.split("=", 1)
+        try:
+            params[name] = json.loads(value)
+        except json.JSONDecodeError:
+            params[name] = value
+    return operation, params
+
+def max_zoom(width, height):
+    """Zoom level at full resolution; each level below halves the image (Deep Zoom numbering)"""
+    return (max(width, height) - 1).bit_length()
+
+def zoom_size(width, height, zoom):
+    """(width, height) of the image at a zoom level"""
+    return level_size(width, height, max_zoom(width, height) - zoom)
+
+def tile_grid(width, height):
+    """(columns, rows) of tiles covering an image of this size"""
+    return math.ceil(width / TILE_SIZE), math.ceil(height / TILE_SIZE)
+
+def tile_key(image_id, operation, params, zoom, column, row):
+    """Content-addressed key of a tile; the stored image never changes under its ID"""
+    return make_cache_key(f"tile:{operation}", [], {
+        "imageId": image_id, "params": params, "size": TILE_SIZE,
+        "zoom": zoom, "column": column, "row": row
+    })
+
+def render_tile(image_id, operation, params, zoom, column, row):
+    """
+    Compute one processed tile of a stored image as PNG
+
+    The tile is cut from the pyramid level of its zoom, grown by the halo
+    the operation needs and processed, so only the pixels around the tile
+    are ever touched. Zoomed-out tiles therefore apply the operation to the
+    downscaled image, which previews it at that scale.
+
+    Returns:
+        PNG bytes, or None if the image was evicted
+    """
+    info = shared_store.array_info(image_id)
+    if info is None:
+        return None
+    height, width = info["shape"][:2]
+    # Only the pages under the patch are read from the stored level
+    source = pyramid_cache.gaussian(image_id, max_zoom(width, height) - zoom, view=True)
+    if source is None:
+        return None
+
+    height, width = source.shape[:2]
+    region = (column * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+    halo = 0 if operation == ORIGINAL else ROI_HALOS[operation](params)
+    (x0, y0, x1, y1), (px0, py0, px1, py1) = roi_bounds(region, halo, width, height)
+    patch = np.array(source[py0:py1, px0:px1])
+    if operation != ORIGINAL:
+        with stage("process"):
+            patch = image_ops.get_operation(operation)(patch, **params)
+    tile = patch[y0 - py0:y1 - py0, x0 - px0:x1 - px0]
+    with stage("encode"):
+        _, buf = cv2.imencode('.png', tile)
+    return buf.tobytes()
+
+# Encoded tiles of this process; a viewer revisits the same few hundred tiles
+# while panning, so a bounded LRU keeps them without touching the shared store
+tile_cache = ResultCache(
+    max_entries=int(os.environ.get("TILE_CACHE_MAX_ENTRIES", 4096)),
+    max_bytes=int(os.environ.get("TILE_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+)
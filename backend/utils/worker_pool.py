@@ -0,0 +1,49 @@
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# OpenCV and NumPy release the GIL in their heavy kernels, so a thread pool
+# keeps CPU-bound image work off the event loop without pickling images.
+# Every uvicorn worker process (WEB_CONCURRENCY) has its own pool, so by
+# default the cores are split between them; this also sizes the admission budget.
+MAX_WORKERS = int(os.environ.get(
+    "IMAGE_WORKERS", max(1, (os.cpu_count() or 1) // int(os.environ.get("WEB_CONCURRENCY", 1))))
+)
+
+executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="image-worker")
+
+_lock = threading.Lock()
+_queued = 0
+_running = 0
+
+def _track(fn, *args):
+    global _queued, _running
+    with _lock:
+        _queued -= 1
+        _running += 1
+    try:
+        return fn(*args)
+    finally:
+        with _lock:
+            _running -= 1
+
+async def run_in_pool(fn, *args):
+    """Run a blocking function on the image worker pool and await its result"""
+    global _queued
+    with _lock:
+        _queued += 1
+    loop = asyncio.get_running_loop()
+    # Run in a copy of the caller's context so per-request state follows the job
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, context.run, _track, fn, *args)
+
+def pool_stats():
+    """Return the number of queued and running jobs on the worker pool"""
+    with _lock:
+        return {
+            "workers": MAX_WORKERS,
+            "queued": _queued,
+            "running": _running
+        }
@@ -1,16 +1,28 @@
 import React from 'react';
 
+const TYPED_ARRAYS = { uint32: Uint32Array, int32: Int32Array, float32: Float32Array };
+
+// Histograms arrive as number arrays, or with ?arrays=base64 as
+// { dtype, length, data } where data is a base64 little-endian typed array
+export function decodeArray(value) {
+  if (!value || Array.isArray(value) || ArrayBuffer.isView(value)) return value;
+  const bytes = Uint8Array.from(atob(value.data), (c) => c.charCodeAt(0));
+  // Typed arrays use the platform byte order, which is little-endian in browsers
+  return new TYPED_ARRAYS[value.dtype](bytes.buffer, 0, value.length);
+}
+
 export default function HistogramChart({ data = [], title, color = 'blue' }) {
-  if (!data || data.length === 0) return null;
+  const values = decodeArray(data);
+  if (!values || values.length === 0) return null;
   
-  const maxValue = Math.max(...data);
+  const maxValue = Math.max(...values);
   
   return (
     <div className="w-full bg-white p-4 rounded-lg shadow-md">
       <h3 className="text-sm font-medium text-gray-700 mb-2">{title}</h3>
       <div className="relative h-40 bg-gray-50 rounded border border-gray-200">
         <div className="absolute inset-0 flex items-end">
-          {data.map((value, index) => {
+          {Array.from(values, (value, index) => {
             const height = (value / maxValue) * 100;
             return (
               <div
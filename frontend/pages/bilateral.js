@@ -1,6 +1,9 @@
 import { useState } from 'react';
 import HistogramChart from '../components/HistogramChart';
 
+// The backend serves the bilateral filter at /image/bilateral (python main.py listens on port 8000)
+const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
+
 function ImageWithHistograms({ imageUrl, histogramData, title }) {
   if (!imageUrl) return null;
 
@@ -69,7 +72,7 @@ export default function BilateralPage() {
     formData.append('sigma_space', sigmaSpace);
 
     try {
-      const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/image/bilateral`, {
+      const response = await fetch(`${API_URL}/image/bilateral?arrays=base64`, {
         method: 'POST',
         body: formData,
       });